@@ -0,0 +1,5 @@
+"""
+Pruebas de carga y de rendimiento de la API y del servicio de inferencia.
+
+Ver `benchmarks.loadtest` para la ejecución y la comparación con una línea base.
+"""
@@ -0,0 +1,171 @@
+"""
+Comparación de rendimiento y de resultados entre los backends del modelo.
+
+Ejecuta los mismos textos, en lotes del mismo tamaño, con cada backend de
+`inference.backends` y muestra los textos por segundo, la latencia media por
+lote y la concordancia de etiquetas y la diferencia máxima de probabilidad
+respecto al backend torch.
+
+Con `--tiny` se usa un modelo RoBERTa pequeño construido y entrenado localmente
+en unos segundos (sin descargar nada), útil para comprobar el flujo sin conexión;
+las cifras de rendimiento solo son representativas con el modelo real.
+
+Uso (desde la raíz del repositorio):
+
+    PYTHONPATH=src python -m benchmarks.backends --texts 512 --batch-size 16
+    PYTHONPATH=src python -m benchmarks.backends --tiny
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+TINY_VOCABULARY = (
+    "la el una película historia final actores guion director es fue me no muy "
+    "buena mala genial aburrida larga corta gustó encantó odié increíble horrible "
+    "correcta normal obra maestra desastre lenta divertida triste"
+).split()
+# Palabras con las que se entrena el modelo pequeño para que sus predicciones no sean aleatorias
+_POSITIVE_WORDS = {"buena", "genial", "gustó", "encantó", "increíble", "maestra", "divertida"}
+_NEGATIVE_WORDS = {"mala", "aburrida", "odié", "horrible", "desastre", "lenta", "triste"}
+
+
+def tiny_label(text: str) -> int:
+    """Etiqueta (0 = NEG, 1 = NEU, 2 = POS) que aprende el modelo pequeño."""
+    words = text.split()
+    balance = sum(w in _POSITIVE_WORDS for w in words) - sum(w in _NEGATIVE_WORDS for w in words)
+    return 2 if balance > 0 else 0 if balance < 0 else 1
+
+
+def build_tiny_model(directory: str, seed: int = 0, train_steps: int = 150) -> str:
+    """
+    Construye y guarda un clasificador RoBERTa pequeño con tokenizador propio.
+
+    El modelo se entrena unos pocos pasos con una regla de palabras positivas y
+    negativas: con pesos puramente aleatorios todas las probabilidades son casi
+    iguales y cualquier diferencia numérica cambiaría la etiqueta.
+
+    Args:
+        directory (str): Carpeta donde se guardan el modelo y el tokenizador
+        seed (int): Semilla de los pesos y de los textos de entrenamiento
+        train_steps (int): Pasos de entrenamiento
+
+    Returns:
+        str: La carpeta del modelo (utilizable como nombre de modelo)
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaForSequenceClassification
+
+    vocabulary = {"<pad>": 0, "<s>": 1, "</s>": 2, "<unk>": 3}
+    for word in TINY_VOCABULARY:
+        vocabulary.setdefault(word, len(vocabulary))
+    backend = Tokenizer(models.WordLevel(vocabulary, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>", special_tokens=[("<s>", 1), ("</s>", 2)]
+    )
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, pad_token="<pad>", bos_token="<s>", eos_token="</s>",
+        unk_token="<unk>", model_max_length=128
+    )
+
+    config = RobertaConfig(
+        vocab_size=len(vocabulary), hidden_size=64, num_hidden_layers=2, num_attention_heads=4,
+        intermediate_size=128, max_position_embeddings=160, pad_token_id=0, num_labels=3,
+        id2label={0: "NEG", 1: "NEU", 2: "POS"}, label2id={"NEG": 0, "NEU": 1, "POS": 2}
+    )
+    torch.manual_seed(seed)
+    model = RobertaForSequenceClassification(config)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=3e-3)
+    rng = random.Random(seed)
+    model.train()
+    for _ in range(train_steps):
+        texts = sample_texts(32, rng.random())
+        batch = tokenizer(texts, padding=True, return_tensors="pt")
+        labels = torch.tensor([tiny_label(text) for text in texts])
+        loss = model(**batch, labels=labels).loss
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    tokenizer.save_pretrained(directory)
+    model.eval().save_pretrained(directory)
+    return directory
+
+
+def sample_texts(count: int, seed: float = 0) -> List[str]:
+    """Genera textos de longitud variable con el vocabulario del modelo pequeño."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(TINY_VOCABULARY, k=rng.randint(3, 40))) for _ in range(count)]
+
+
+def run_backend(backend, texts: List[str], batch_size: int) -> Dict[str, Any]:
+    """
+    Pasa todos los textos por el backend en lotes de `batch_size`.
+
+    Returns:
+        dict: Predicciones, textos por segundo y milisegundos por lote
+    """
+    backend(texts[:batch_size])  # calentamiento
+    predictions = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        predictions.extend(backend(texts[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+    batches = -(-len(texts) // batch_size)
+    return {
+        "predictions": predictions,
+        "texts_per_second": len(texts) / elapsed,
+        "ms_per_batch": elapsed * 1000 / batches
+    }
+
+
+def parity(reference: List[Dict[str, Any]], candidate: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Compara las predicciones de un backend con las de referencia.
+
+    Returns:
+        dict: Proporción de etiquetas iguales y diferencia máxima de probabilidad
+            entre las predicciones con la misma etiqueta
+    """
+    same = [(r, c) for r, c in zip(reference, candidate) if r["label"] == c["label"]]
+    return {
+        "agreement": len(same) / len(reference) if reference else 1.0,
+        "max_score_diff": max((abs(r["score"] - c["score"]) for r, c in same), default=0.0)
+    }
+
+
+def main(args: argparse.Namespace):
+    from inference.backends import BACKENDS, load_backend
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model = build_tiny_model(os.path.join(workdir, "tiny")) if args.tiny else args.model
+        texts = sample_texts(args.texts, args.seed)
+        results = {}
+        for name in args.backends or BACKENDS:
+            backend = load_backend(name, model, cache_dir=os.path.join(workdir, "onnx"))
+            results[name] = run_backend(backend, texts, args.batch_size)
+
+    reference = results.get("torch")
+    print(f"{'backend':<12}{'textos/s':>12}{'ms/lote':>10}{'acuerdo':>10}{'Δ score':>10}")
+    for name, result in results.items():
+        check = parity(reference["predictions"], result["predictions"]) if reference else None
+        print(
+            f"{name:<12}{result['texts_per_second']:>12.1f}{result['ms_per_batch']:>10.2f}"
+            + (f"{check['agreement']:>10.1%}{check['max_score_diff']:>10.4f}" if check else "")
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el rendimiento de los backends del modelo de sentimiento")
+    parser.add_argument("--model", default=os.getenv("INFERENCE_MODEL", "pysentimiento/robertuito-sentiment-analysis"))
+    parser.add_argument("--tiny", action="store_true", help="Usa un modelo pequeño construido localmente")
+    parser.add_argument("--backends", nargs="+", help="Backends a comparar (por defecto todos)")
+    parser.add_argument("--texts", type=int, default=512, help="Textos a procesar")
+    parser.add_argument("--batch-size", type=int, default=16, help="Textos por lote")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de los textos")
+    main(parser.parse_args())
@@ -0,0 +1,149 @@
+"""
+Efecto de agrupar los textos por longitud en el micro-batching.
+
+Construye un corpus de longitudes muy variadas con los comentarios cortos de
+`data/comments.json` y reseñas largas sintéticas (varios párrafos formados con
+esos mismos comentarios), y lo procesa con el micro-batcher del servicio de
+inferencia en dos configuraciones:
+
+- `sin cubetas`: lotes de hasta 16 textos en orden de llegada, rellenados hasta
+  el texto más largo del lote (el comportamiento anterior).
+- `cubetas`: textos agrupados por longitud y lotes limitados por tokens.
+
+Para cada una muestra los textos por segundo, la latencia p50/p95 de cada texto
+y la proporción de tokens de relleno que pasan por el modelo.
+
+Uso (desde la raíz del repositorio):
+
+    PYTHONPATH=src python -m benchmarks.bucketing --tiny
+    PYTHONPATH=src python -m benchmarks.bucketing --backend onnx-int8 --texts 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.backends import build_tiny_model
+from benchmarks.loadtest import ROOT_DIR, percentile
+
+COMMENTS_FILE = os.path.join(ROOT_DIR, "data", "comments.json")
+
+# Configuraciones comparadas: nombre -> argumentos del MicroBatcher
+CONFIGURATIONS = {
+    "sin cubetas": {"max_batch_size": 16},
+    "cubetas": {"max_batch_size": 64, "max_batch_tokens": 2048, "bucket_boundaries": [16, 32, 64]}
+}
+
+
+def build_corpus(count: int, long_ratio: float, seed: int = 0) -> List[str]:
+    """
+    Mezcla comentarios cortos reales con reseñas largas sintéticas.
+
+    Args:
+        count (int): Número de textos
+        long_ratio (float): Proporción de reseñas largas
+        seed (int): Semilla
+
+    Returns:
+        List[str]: Textos en orden aleatorio
+    """
+    with open(COMMENTS_FILE, encoding="utf-8") as f:
+        comments = [text for texts in json.load(f).values() for text in texts]
+    rng = random.Random(seed)
+
+    def long_review() -> str:
+        paragraphs = [" ".join(rng.choices(comments, k=rng.randint(3, 8))) for _ in range(rng.randint(2, 5))]
+        return "\n\n".join(paragraphs)
+
+    return [long_review() if rng.random() < long_ratio else rng.choice(comments) for _ in range(count)]
+
+
+async def run_configuration(backend, texts: List[str], concurrency: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Procesa todos los textos con `concurrency` clientes que envían un texto cada vez.
+
+    Returns:
+        dict: Textos por segundo, latencias y proporción de relleno
+    """
+    from inference.batching import MicroBatcher
+
+    tokens = {"real": 0, "padding": 0}
+
+    def predict(batch):
+        real = sum(len(ids) for ids in batch)
+        tokens["real"] += real
+        tokens["padding"] += len(batch) * max(len(ids) for ids in batch) - real
+        return backend.predict_encoded(batch)
+
+    batcher = MicroBatcher(predict, max_wait_ms=10, encode_fn=backend.encode, **options)
+    await batcher.start()
+    latencies: List[float] = []
+    pending = iter(texts)
+
+    async def client():
+        for text in pending:
+            start = time.perf_counter()
+            await batcher.submit(text)
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(client() for _ in range(min(concurrency, len(texts)))))  # calentamiento
+        pending = iter(texts)
+        tokens.update(real=0, padding=0)
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await batcher.stop()
+
+    latencies.sort()
+    return {
+        "texts_per_second": len(texts) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "padding_ratio": tokens["padding"] / (tokens["real"] + tokens["padding"])
+    }
+
+
+def main(args: argparse.Namespace):
+    from inference.backends import load_backend
+
+    texts = build_corpus(args.texts, args.long_ratio, args.seed)
+    with tempfile.TemporaryDirectory(prefix="bucketing-") as workdir:
+        model = build_tiny_model(os.path.join(workdir, "tiny")) if args.tiny else args.model
+        backend = load_backend(args.backend, model, cache_dir=os.path.join(workdir, "onnx"))
+        lengths = sorted(len(ids) for ids in backend.encode(texts))
+        print(
+            f"{len(texts)} textos; tokens por texto: p50 {percentile(lengths, 50)}, "
+            f"p95 {percentile(lengths, 95)}, máximo {lengths[-1]}"
+        )
+        results = {
+            name: asyncio.run(run_configuration(backend, texts, args.concurrency, options))
+            for name, options in CONFIGURATIONS.items()
+        }
+
+    baseline = results["sin cubetas"]["texts_per_second"]
+    print(f"{'configuración':<14}{'textos/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'relleno':>10}{'aceleración':>13}")
+    for name, result in results.items():
+        print(
+            f"{name:<14}{result['texts_per_second']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['padding_ratio']:>10.1%}{result['texts_per_second'] / baseline:>12.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el micro-batching con y sin cubetas por longitud")
+    parser.add_argument("--model", default=os.getenv("INFERENCE_MODEL", "pysentimiento/robertuito-sentiment-analysis"))
+    parser.add_argument("--tiny", action="store_true", help="Usa un modelo pequeño construido localmente")
+    parser.add_argument("--backend", default="torch", help="Backend del modelo (torch, onnx, onnx-int8)")
+    parser.add_argument("--texts", type=int, default=1000, help="Textos del corpus")
+    parser.add_argument("--long-ratio", type=float, default=0.2, help="Proporción de reseñas largas")
+    parser.add_argument("--concurrency", type=int, default=64, help="Clientes concurrentes")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
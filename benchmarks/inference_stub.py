@@ -0,0 +1,72 @@
+"""
+Sustituto del servicio de inferencia para las pruebas de carga.
+
+Implementa los mismos endpoints que `inference.inference_service` sin cargar
+ningún modelo: la etiqueta se deriva de un hash del texto (siempre la misma para
+el mismo texto) y se puede simular el coste del modelo con `STUB_LATENCY_MS`
+por petición y `STUB_LATENCY_PER_TEXT_MS` por texto.
+
+    uvicorn benchmarks.inference_stub:app --port 8001
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Any, List
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+STUB_LATENCY_PER_TEXT_MS = float(os.getenv("STUB_LATENCY_PER_TEXT_MS", "0"))
+
+LABELS = ("positive", "negative", "neutral")
+
+
+class PredictionRequest(BaseModel):
+    text: str
+
+
+class BatchPredictionRequest(BaseModel):
+    texts: List[str]
+
+
+def stub_prediction(text: str) -> dict[str, Any]:
+    """Predicción determinista a partir del hash del texto."""
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return {"label": LABELS[digest[0] % len(LABELS)], "score": round(0.5 + digest[1] / 512, 4)}
+
+
+async def simulate_model(texts: int):
+    delay = STUB_LATENCY_MS + STUB_LATENCY_PER_TEXT_MS * texts
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+
+app = FastAPI(title="Servicio de inferencia simulado")
+
+
+@app.post("/predict")
+async def predict(data: PredictionRequest) -> dict[str, Any]:
+    await simulate_model(1)
+    return stub_prediction(data.text)
+
+
+@app.post("/predict_batch")
+async def predict_batch(data: BatchPredictionRequest) -> dict[str, Any]:
+    await simulate_model(len(data.texts))
+    return {"predictions": [stub_prediction(text) for text in data.texts]}
+
+
+@app.get("/health")
+async def health() -> dict[str, Any]:
+    return {"status": "ok", "model_loaded": True, "ready": True}
+
+
+@app.get("/livez")
+async def livez() -> dict[str, Any]:
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz() -> dict[str, Any]:
+    return {"status": "ready", "ready": True, "phases": {}}
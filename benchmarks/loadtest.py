@@ -0,0 +1,468 @@
+"""
+Prueba de carga reproducible de la API y del servicio de inferencia.
+
+Sin `--base-url` la prueba monta su propio entorno: crea una base de datos
+SQLite temporal con datos sintéticos (`db.synthetic`), arranca el servicio de
+inferencia simulado (`benchmarks.inference_stub`, salvo que se indique
+`--inference-url`) y la API apuntando a ambos. Después lanza `--concurrency`
+clientes que durante `--duration` segundos eligen operaciones según la mezcla
+`--mix` (con la misma semilla se repite la misma secuencia) y mide la latencia
+de cada una.
+
+El resultado se muestra por operación (peticiones, errores, peticiones por
+segundo y percentiles p50/p95/p99) y se puede guardar como línea base en JSON.
+Con `--compare` se compara con una línea base y el proceso termina con código 1
+si algún percentil empeora más de `--threshold` (por defecto un 20 %), para que
+los cambios de rendimiento se revisen como cualquier otro cambio.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.loadtest --duration 30 --concurrency 32 --save benchmarks/baselines/local.json
+    python -m benchmarks.loadtest --duration 30 --concurrency 32 --compare benchmarks/baselines/local.json
+
+    # Solo el servicio de inferencia (real o simulado) ya arrancado
+    python -m benchmarks.loadtest --service inference --inference-url http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+# Contraseña y nombres de los usuarios creados por db.synthetic
+SYNTHETIC_PASSWORD = "password123"
+SEARCH_TERMS = ("night", "river", "dark", "star", "city", "lost", "dream", "shadow", "empire", "storm")
+COMMENT_TEXTS = (
+    "Una obra maestra, la volvería a ver",
+    "Aburrida y demasiado larga",
+    "Correcta, sin más",
+    "El final me dejó sin palabras",
+    "Los actores están fatal"
+)
+
+# Mezclas por defecto: operación -> peso relativo
+DEFAULT_MIXES = {
+    "api": {"browse": 35, "movie": 15, "search": 15, "comments": 20, "login": 5, "comment": 10},
+    "inference": {"predict": 80, "predict_batch": 20}
+}
+# Percentiles que se comparan con la línea base
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    Interpreta una mezcla "operación=peso,operación=peso".
+
+    Raises:
+        ValueError: Si una operación no existe o un peso no es positivo
+    """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Operación desconocida: {name}")
+        mix[name] = float(weight or 1)
+        if mix[name] <= 0:
+            raise ValueError(f"El peso de {name} debe ser positivo")
+    return mix
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil por el método del rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(-(-p * len(sorted_values) // 100)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, bool]]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Resume las muestras de cada operación.
+
+    Args:
+        samples (dict): Operación -> lista de (latencia en segundos, éxito)
+        elapsed (float): Duración de la fase de medida en segundos
+
+    Returns:
+        dict: Operación -> requests, errors, rps y percentiles en milisegundos
+    """
+    summary = {}
+    for name, values in sorted(samples.items()):
+        latencies = sorted(latency * 1000 for latency, ok in values if ok)
+        summary[name] = {
+            "requests": len(values),
+            "errors": sum(1 for _, ok in values if not ok),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0
+        }
+    return summary
+
+
+def compare(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+    min_delta_ms: float = 1.0
+) -> List[str]:
+    """
+    Compara los resultados con una línea base.
+
+    Un percentil se considera una regresión si supera al de la línea base en más
+    de `threshold` (proporción) y en más de `min_delta_ms` milisegundos, para no
+    fallar por el ruido de latencias de muy pocos milisegundos. También es una
+    regresión que aparezcan errores en una operación que no los tenía.
+
+    Returns:
+        List[str]: Descripción de cada regresión (vacía si no hay ninguna)
+    """
+    regressions = []
+    for name, before in sorted(baseline.items()):
+        after = current.get(name)
+        if after is None:
+            continue
+        for key in COMPARED_PERCENTILES:
+            limit = before[key] * (1 + threshold)
+            if after[key] > limit and after[key] - before[key] > min_delta_ms:
+                regressions.append(
+                    f"{name} {key}: {before[key]:.2f} -> {after[key]:.2f} ms "
+                    f"(+{(after[key] / before[key] - 1) * 100 if before[key] else float('inf'):.0f}%)"
+                )
+        if after["errors"] and not before["errors"]:
+            regressions.append(f"{name}: {after['errors']} errores (la línea base no tenía)")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# Operaciones
+# ---------------------------------------------------------------------------
+
+class Context:
+    """Estado compartido por los clientes: URLs, tamaño de los datos y tokens."""
+
+    def __init__(self, api: Optional[httpx.AsyncClient], inference: Optional[httpx.AsyncClient], movies: int, users: int):
+        self.api = api
+        self.inference = inference
+        self.movies = max(movies, 1)
+        self.users = max(users, 1)
+        self.tokens: Dict[int, str] = {}
+
+    def popular_movie(self, rng: random.Random) -> int:
+        # Mismo sesgo que db.synthetic: las primeras películas son las más comentadas
+        return min(int(self.movies * rng.random() ** 2) + 1, self.movies)
+
+    def random_user(self, rng: random.Random) -> int:
+        return rng.randint(1, self.users)
+
+
+async def op_browse(ctx: Context, rng: random.Random) -> bool:
+    response = await ctx.api.get("/movies", params={"limit": 20})
+    cursor = response.headers.get("x-next-cursor")
+    if response.status_code == 200 and cursor and rng.random() < 0.5:
+        response = await ctx.api.get("/movies", params={"limit": 20, "cursor": cursor})
+    return response.status_code == 200
+
+
+async def op_movie(ctx: Context, rng: random.Random) -> bool:
+    response = await ctx.api.get(f"/movies/{ctx.popular_movie(rng)}")
+    return response.status_code == 200
+
+
+async def op_search(ctx: Context, rng: random.Random) -> bool:
+    response = await ctx.api.get("/movies/search", params={"title": rng.choice(SEARCH_TERMS)})
+    return response.status_code == 200
+
+
+async def op_comments(ctx: Context, rng: random.Random) -> bool:
+    response = await ctx.api.get(f"/movies/{ctx.popular_movie(rng)}/comments", params={"limit": 20})
+    return response.status_code == 200
+
+
+async def login(ctx: Context, user: int) -> Optional[str]:
+    response = await ctx.api.post("/login", json={"username": f"user{user:07d}", "password": SYNTHETIC_PASSWORD})
+    if response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def op_login(ctx: Context, rng: random.Random) -> bool:
+    return await login(ctx, ctx.random_user(rng)) is not None
+
+
+async def op_comment(ctx: Context, rng: random.Random) -> bool:
+    # Pocos autores distintos: cada uno inicia sesión una vez y reutiliza su token
+    user = rng.randint(1, min(ctx.users, 16))
+    if user not in ctx.tokens:
+        token = await login(ctx, user)
+        if token is None:
+            return False
+        ctx.tokens[user] = token
+    response = await ctx.api.post(
+        f"/movies/{ctx.popular_movie(rng)}/comments",
+        json={"user_id": user, "text": rng.choice(COMMENT_TEXTS)},
+        headers={"Authorization": f"Bearer {ctx.tokens[user]}"}
+    )
+    return response.status_code in (201, 202)
+
+
+async def op_predict(ctx: Context, rng: random.Random) -> bool:
+    text = f"{rng.choice(COMMENT_TEXTS)} #{rng.randint(1, 1000)}"
+    response = await ctx.inference.post("/predict", json={"text": text})
+    return response.status_code == 200
+
+
+async def op_predict_batch(ctx: Context, rng: random.Random) -> bool:
+    texts = [f"{rng.choice(COMMENT_TEXTS)} #{rng.randint(1, 1000)}" for _ in range(16)]
+    response = await ctx.inference.post("/predict_batch", json={"texts": texts})
+    return response.status_code == 200
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "browse": op_browse,
+    "movie": op_movie,
+    "search": op_search,
+    "comments": op_comments,
+    "login": op_login,
+    "comment": op_comment,
+    "predict": op_predict,
+    "predict_batch": op_predict_batch
+}
+
+
+async def drive(ctx: Context, mix: Dict[str, float], concurrency: int, duration: float, warmup: float, seed: int):
+    """
+    Lanza `concurrency` clientes que ejecutan operaciones según la mezcla.
+
+    Las operaciones que terminan durante el calentamiento no se cuentan.
+
+    Returns:
+        tuple: Muestras por operación y duración real de la fase de medida
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[Tuple[float, bool]]] = {name: [] for name in names}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    async def client(number: int):
+        rng = random.Random(seed * 1000 + number)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = rng.choices(names, weights)[0]
+            began = time.perf_counter()
+            try:
+                ok = await SCENARIOS[name](ctx, rng)
+            except httpx.HTTPError:
+                ok = False
+            finished = time.perf_counter()
+            if began >= measure_from:
+                samples[name].append((finished - began, ok))
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return samples, time.perf_counter() - measure_from
+
+
+# ---------------------------------------------------------------------------
+# Entorno local
+# ---------------------------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servicio no respondió a tiempo: {url}")
+
+
+@contextmanager
+def local_services(args: argparse.Namespace) -> Iterator[Tuple[str, str]]:
+    """
+    Crea la base de datos sintética y arranca el servicio de inferencia simulado
+    (si no se indica uno) y la API.
+
+    Yields:
+        tuple: URL de la API y URL del servicio de inferencia
+    """
+    processes: List[subprocess.Popen] = []
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        env = {
+            **os.environ,
+            "PYTHONPATH": SRC_DIR,
+            "DB_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'loadtest.db')}",
+            "ENVIRONMENT": "prod",
+            "LOG_FILE": os.path.join(workdir, "movies.log")
+        }
+        print(f"Generando datos: {args.movies} películas, {args.users} usuarios, {args.comments} comentarios")
+        subprocess.run(
+            [sys.executable, "-m", "db.synthetic", "--movies", str(args.movies), "--users", str(args.users),
+             "--comments", str(args.comments), "--seed", str(args.seed)],
+            cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL
+        )
+        try:
+            inference_url = args.inference_url
+            if not inference_url:
+                port = free_port()
+                inference_url = f"http://127.0.0.1:{port}"
+                processes.append(subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "benchmarks.inference_stub:app",
+                     "--port", str(port), "--log-level", "warning"],
+                    cwd=ROOT_DIR, env={**os.environ, "PYTHONPATH": ROOT_DIR}
+                ))
+                wait_until_up(f"{inference_url}/health")
+            inference = httpx.URL(inference_url)
+            port = free_port()
+            api_url = f"http://127.0.0.1:{port}"
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+                 "--workers", str(args.workers)],
+                cwd=ROOT_DIR,
+                env={**env, "INFERENCE_HOST": inference.host, "INFERENCE_PORT": str(inference.port or 80)}
+            ))
+            wait_until_up(f"{api_url}/")
+            yield api_url, inference_url
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(summary: Dict[str, Dict[str, Any]]):
+    header = f"{'operación':<15}{'peticiones':>11}{'errores':>9}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in summary.items():
+        print(
+            f"{name:<15}{row['requests']:>11}{row['errors']:>9}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}"
+        )
+
+
+async def run(args: argparse.Namespace, api_url: Optional[str], inference_url: Optional[str]) -> Dict[str, Any]:
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIXES[args.service]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    api = httpx.AsyncClient(base_url=api_url, limits=limits, timeout=timeout) if api_url else None
+    inference = httpx.AsyncClient(base_url=inference_url, limits=limits, timeout=timeout) if inference_url else None
+    try:
+        ctx = Context(api, inference, args.movies, args.users)
+        samples, elapsed = await drive(ctx, mix, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        for client in (api, inference):
+            if client is not None:
+                await client.aclose()
+    return {
+        "config": {
+            "service": args.service,
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "dataset": {"movies": args.movies, "users": args.users, "comments": args.comments},
+            "workers": args.workers
+        },
+        "environment": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "results": summarize(samples, elapsed)
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    if args.service == "inference":
+        if not args.inference_url:
+            raise SystemExit("--service inference necesita --inference-url")
+        report = asyncio.run(run(args, None, args.inference_url))
+    elif args.base_url:
+        report = asyncio.run(run(args, args.base_url, None))
+    else:
+        with local_services(args) as (api_url, inference_url):
+            report = asyncio.run(run(args, api_url, inference_url))
+
+    print_report(report["results"])
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline["results"], args.threshold)
+        if regressions:
+            print(f"Regresiones respecto a {args.compare} (umbral {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"Sin regresiones respecto a {args.compare} (umbral {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API y del servicio de inferencia")
+    parser.add_argument("--service", choices=sorted(DEFAULT_MIXES), default="api", help="Servicio a medir")
+    parser.add_argument("--base-url", help="API ya arrancada (por defecto se arranca una local con datos sintéticos)")
+    parser.add_argument("--inference-url", help="Servicio de inferencia (por defecto se arranca el simulado)")
+    parser.add_argument("--mix", help="Mezcla de operaciones, p. ej. 'browse=50,comments=30,comment=20'")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=20, help="Segundos de medida")
+    parser.add_argument("--warmup", type=float, default=3, help="Segundos de calentamiento que no se miden")
+    parser.add_argument("--timeout", type=float, default=30, help="Tiempo máximo por petición (s)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos y de la secuencia de operaciones")
+    parser.add_argument("--movies", type=int, default=2000, help="Películas sintéticas")
+    parser.add_argument("--users", type=int, default=200, help="Usuarios sintéticos")
+    parser.add_argument("--comments", type=int, default=20000, help="Comentarios sintéticos")
+    parser.add_argument("--workers", type=int, default=1, help="Procesos de la API local")
+    parser.add_argument("--save", help="Guarda el resultado como línea base en este fichero JSON")
+    parser.add_argument("--compare", help="Línea base JSON con la que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Empeoramiento máximo admitido (0.2 = 20 %%)")
+    sys.exit(main(parser.parse_args()))
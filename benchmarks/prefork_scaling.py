@@ -0,0 +1,185 @@
+"""
+Escalado del servicio de inferencia multiproceso con el número de workers.
+
+Arranca `inference.prefork` con cada número de workers indicado, lo satura con
+peticiones `/predict` de textos distintos (la caché de predicciones se desactiva
+para que todas lleguen al modelo) y muestra los textos por segundo, la latencia
+p50/p95, la memoria total de los procesos y la aceleración respecto a la primera
+configuración.
+
+La aceleración está limitada por los núcleos de la máquina: con N núcleos no cabe
+esperar más de N con N workers, y el número de hilos intra-op de cada worker se
+reparte entre los núcleos disponibles.
+
+Uso (desde la raíz del repositorio):
+
+    PYTHONPATH=src python -m benchmarks.prefork_scaling --workers 1 2 4 --tiny
+    PYTHONPATH=src python -m benchmarks.prefork_scaling --workers 1 2 4 8 --backend onnx-int8
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.backends import TINY_VOCABULARY, build_tiny_model
+from benchmarks.loadtest import ROOT_DIR, SRC_DIR, free_port, percentile
+
+
+def wait_until_ready(url: str, timeout: float = 300):
+    """Espera a que el servicio tenga el modelo cargado y calentado."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"El servicio no estuvo listo a tiempo: {url}")
+
+
+def process_tree_pss(pid: int) -> Optional[int]:
+    """
+    Memoria proporcional (PSS) del proceso y sus hijos en bytes.
+
+    Se usa PSS y no RSS porque las páginas compartidas copy-on-write con el
+    proceso principal se contarían una vez por worker. Solo disponible en Linux.
+    """
+    def children(parent: int) -> List[int]:
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children") as f:
+                return [int(child) for child in f.read().split()]
+        except OSError:
+            return []
+
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children(current))
+        try:
+            with open(f"/proc/{current}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            return None
+    return total
+
+
+async def drive(url: str, concurrency: int, duration: float, warmup: float, seed: int) -> Dict[str, Any]:
+    """
+    Envía peticiones `/predict` con textos distintos desde `concurrency` clientes.
+
+    Returns:
+        dict: Textos por segundo, latencias y errores de la fase de medida
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    measuring = False
+
+    async def client(number: int):
+        nonlocal errors, counter
+        rng = random.Random(seed * 1000 + number)
+        async with httpx.AsyncClient(base_url=url, timeout=60) as http:
+            while not stop.is_set():
+                counter += 1
+                words = rng.choices(TINY_VOCABULARY, k=rng.randint(5, 30))
+                text = " ".join(words + [str(counter)])
+                start = time.perf_counter()
+                try:
+                    ok = (await http.post("/predict", json={"text": text})).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if measuring:
+                    latencies.append(time.perf_counter() - start)
+                    errors += not ok
+
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(client(i)) for i in range(concurrency)]
+    await asyncio.sleep(warmup)
+    measuring = True
+    start = time.perf_counter()
+    await asyncio.sleep(duration)
+    measuring = False
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+    return {
+        "texts_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "errors": errors
+    }
+
+
+def run_workers(workers: int, model: str, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """Arranca el servicio con `workers` workers, mide su rendimiento y lo detiene."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        # En Docker `utils` es la carpeta inference/utils; aquí se usa la de src
+        "PYTHONPATH": os.pathsep.join([ROOT_DIR, SRC_DIR]),
+        "INFERENCE_MODEL": model,
+        "INFERENCE_BACKEND": args.backend,
+        "INFERENCE_ONNX_DIR": os.path.join(workdir, "onnx"),
+        "INFERENCE_CACHE_MAX_ENTRIES": "0",
+        "ENVIRONMENT": "prod",
+        "LOG_FILE": os.path.join(workdir, "inference.log")
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "inference.prefork", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--cpu-affinity", args.cpu_affinity],
+        cwd=ROOT_DIR, env=env
+    )
+    try:
+        wait_until_ready(url)
+        result = asyncio.run(drive(url, args.concurrency, args.duration, args.warmup, args.seed))
+        result["memory_mb"] = (process_tree_pss(process.pid) or 0) / 2 ** 20
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(args: argparse.Namespace):
+    print(f"Núcleos disponibles: {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}")
+    with tempfile.TemporaryDirectory(prefix="prefork-") as workdir:
+        model = build_tiny_model(os.path.join(workdir, "tiny")) if args.tiny else args.model
+        results = {workers: run_workers(workers, model, args, workdir) for workers in args.workers}
+
+    baseline = results[args.workers[0]]["texts_per_second"]
+    print(f"{'workers':>8}{'textos/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'PSS MB':>10}{'errores':>9}{'aceleración':>13}")
+    for workers, result in results.items():
+        print(
+            f"{workers:>8}{result['texts_per_second']:>12.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['memory_mb']:>10.0f}{result['errors']:>9}{result['texts_per_second'] / baseline:>12.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide el escalado del servicio de inferencia con el número de workers")
+    parser.add_argument("--model", default=os.getenv("INFERENCE_MODEL", "pysentimiento/robertuito-sentiment-analysis"))
+    parser.add_argument("--tiny", action="store_true", help="Usa un modelo pequeño construido localmente")
+    parser.add_argument("--backend", default="torch", help="Backend del modelo (torch, onnx, onnx-int8)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Números de workers a probar")
+    parser.add_argument("--cpu-affinity", default="auto", help="'auto', 'none' o p. ej. '0-3;4-7'")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes concurrentes")
+    parser.add_argument("--duration", type=float, default=20, help="Segundos de medida por configuración")
+    parser.add_argument("--warmup", type=float, default=3, help="Segundos de calentamiento por configuración")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
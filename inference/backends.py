@@ -0,0 +1,231 @@
+"""
+Backends de ejecución del modelo de sentimiento.
+
+Todos los backends se llaman igual que el `pipeline` de transformers: reciben una
+lista de textos y devuelven, en el mismo orden, un diccionario con la etiqueta
+original del modelo ('POS', 'NEG', 'NEU') y su probabilidad.
+
+Además, la tokenización y la pasada del modelo se pueden hacer por separado:
+`encode` convierte los textos en identificadores de tokens (sin relleno) y
+`predict_encoded` rellena cada lote solo hasta su secuencia más larga. El
+micro-batcher lo usa para agrupar los textos por longitud antes de pasarlos al
+modelo (ver inference.batching).
+
+- `torch`: `pipeline` de transformers en fp32 (CPU o GPU).
+- `onnx`: el modelo exportado a ONNX y servido con ONNX Runtime en CPU.
+- `onnx-int8`: como `onnx`, con cuantización dinámica int8 de los pesos. Suele
+  multiplicar el rendimiento en CPU a cambio de una pequeña pérdida de precisión
+  en las probabilidades.
+
+La exportación y la cuantización se hacen la primera vez y se guardan en
+`INFERENCE_ONNX_DIR`; los arranques siguientes cargan directamente el fichero.
+onnx y onnxruntime solo se importan si se elige un backend ONNX.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+import numpy as np
+from utils import get_logger
+
+logger = get_logger("backends")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Longitud máxima (en tokens) de los textos que se pasan al modelo
+MAX_LENGTH = int(os.getenv("INFERENCE_MAX_LENGTH", "128"))
+# Carpeta donde se guardan los modelos exportados a ONNX
+ONNX_DIR = os.getenv("INFERENCE_ONNX_DIR", os.path.join("models", "onnx"))
+# Hilos de ONNX Runtime dentro de una pasada (0 = los que elija ONNX Runtime)
+ONNX_THREADS = int(os.getenv("INFERENCE_ONNX_THREADS", "0"))
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def pad_batch(batch: List[List[int]], pad_token_id: int, padding_side: str = "right"):
+    """
+    Rellena un lote de secuencias de tokens hasta la más larga del lote.
+
+    Returns:
+        tuple: Matrices de identificadores y de máscara de atención (int64)
+    """
+    width = max(len(ids) for ids in batch)
+    input_ids = np.full((len(batch), width), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+    for row, ids in enumerate(batch):
+        start = width - len(ids) if padding_side == "left" else 0
+        input_ids[row, start:start + len(ids)] = ids
+        attention_mask[row, start:start + len(ids)] = 1
+    return input_ids, attention_mask
+
+
+def top_labels(probabilities: np.ndarray, id2label: Dict[int, str]) -> List[Dict[str, Any]]:
+    """Etiqueta más probable de cada fila y su probabilidad."""
+    best = probabilities.argmax(axis=-1)
+    return [
+        {"label": id2label[int(index)], "score": float(row[index])}
+        for row, index in zip(probabilities, best)
+    ]
+
+
+def encode_texts(tokenizer, texts: List[str]) -> List[List[int]]:
+    """Tokeniza los textos sin relleno, truncados a MAX_LENGTH tokens."""
+    return tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]
+
+
+class TorchBackend:
+    """Pipeline de transformers sobre PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model: str, device: int = -1):
+        """
+        Args:
+            model (str): Nombre del modelo en Hugging Face o carpeta local
+            device (int): -1 para CPU, índice de la GPU en otro caso
+        """
+        from transformers import pipeline
+        self.pipeline = pipeline("text-classification", model=model, device=device)
+        self.tokenizer = self.pipeline.tokenizer
+        self.id2label = {int(i): label for i, label in self.pipeline.model.config.id2label.items()}
+
+    def encode(self, texts: List[str]) -> List[List[int]]:
+        return encode_texts(self.tokenizer, texts)
+
+    def predict_encoded(self, batch: List[List[int]]) -> List[Dict[str, Any]]:
+        import torch
+
+        input_ids, attention_mask = pad_batch(batch, self.tokenizer.pad_token_id, self.tokenizer.padding_side)
+        device = self.pipeline.device
+        with torch.inference_mode():
+            logits = self.pipeline.model(
+                input_ids=torch.from_numpy(input_ids).to(device),
+                attention_mask=torch.from_numpy(attention_mask).to(device)
+            ).logits
+        return top_labels(softmax(logits.float().cpu().numpy()), self.id2label)
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        return self.predict_encoded(self.encode(texts))
+
+
+class OnnxBackend:
+    """Modelo exportado a ONNX (opcionalmente cuantizado a int8) servido con ONNX Runtime."""
+
+    def __init__(self, model: str, quantize: bool = True, cache_dir: str = ONNX_DIR, threads: int = ONNX_THREADS):
+        """
+        Args:
+            model (str): Nombre del modelo en Hugging Face o carpeta local
+            quantize (bool): Aplica cuantización dinámica int8 a los pesos
+            cache_dir (str): Carpeta donde se guardan los ficheros .onnx
+            threads (int): Hilos de ONNX Runtime por pasada (0 = automático)
+        """
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.id2label = {int(i): label for i, label in AutoConfig.from_pretrained(model).id2label.items()}
+
+        path = self.export(model, cache_dir, quantize)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        logger.info("Modelo ONNX cargado desde %s", path)
+
+    @staticmethod
+    def export(model: str, cache_dir: str, quantize: bool) -> str:
+        """
+        Exporta el modelo a ONNX (y lo cuantiza) si no existe ya en `cache_dir`.
+
+        Returns:
+            str: Ruta del fichero .onnx a cargar
+        """
+        directory = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model.strip("/")))
+        fp32_path = os.path.join(directory, "model.onnx")
+        int8_path = os.path.join(directory, "model.int8.onnx")
+        target = int8_path if quantize else fp32_path
+        if os.path.exists(target):
+            return target
+
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(fp32_path):
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            logger.info("Exportando %s a ONNX en %s", model, fp32_path)
+            tokenizer = AutoTokenizer.from_pretrained(model)
+            network = AutoModelForSequenceClassification.from_pretrained(model).eval()
+            sample = tokenizer(["texto de ejemplo", "otro"], return_tensors="pt", padding=True)
+            axes = {0: "batch", 1: "sequence"}
+            with torch.no_grad():
+                torch.onnx.export(
+                    network,
+                    (sample["input_ids"], sample["attention_mask"]),
+                    fp32_path,
+                    input_names=["input_ids", "attention_mask"],
+                    output_names=["logits"],
+                    dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": {0: "batch"}},
+                    opset_version=17,
+                    dynamo=False
+                )
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Cuantizando %s a int8", fp32_path)
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return target
+
+    def encode(self, texts: List[str]) -> List[List[int]]:
+        return encode_texts(self.tokenizer, texts)
+
+    def predict_encoded(self, batch: List[List[int]]) -> List[Dict[str, Any]]:
+        input_ids, attention_mask = pad_batch(batch, self.tokenizer.pad_token_id, self.tokenizer.padding_side)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        logits = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+        return top_labels(softmax(logits), self.id2label)
+
+    def __call__(self, texts: List[str]) -> List[Dict[str, Any]]:
+        return self.predict_encoded(self.encode(texts))
+
+
+def import_runtime(name: str):
+    """
+    Importa las librerías que necesita un backend.
+
+    Se llama por separado de `load_backend` para poder medir cuánto del arranque
+    se va en importar las librerías y cuánto en cargar los pesos.
+    """
+    import transformers  # noqa: F401
+    if name == "torch":
+        import torch  # noqa: F401
+    else:
+        import onnxruntime  # noqa: F401
+
+
+def load_backend(name: str, model: str, device: int = -1, cache_dir: Optional[str] = None):
+    """
+    Crea el backend indicado en la configuración.
+
+    Args:
+        name (str): 'torch', 'onnx' u 'onnx-int8'
+        model (str): Nombre del modelo en Hugging Face o carpeta local
+        device (int): Dispositivo para el backend torch (-1 = CPU)
+        cache_dir (str, optional): Carpeta de los modelos ONNX
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    if name == "torch":
+        return TorchBackend(model, device)
+    if name in ("onnx", "onnx-int8"):
+        if device != -1:
+            logger.warning("El backend %s solo se ejecuta en CPU", name)
+        return OnnxBackend(model, quantize=name == "onnx-int8", cache_dir=cache_dir or ONNX_DIR, threads=ONNX_THREADS)
+    raise ValueError(f"Backend desconocido: {name} (opciones: {', '.join(BACKENDS)})")
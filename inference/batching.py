@@ -0,0 +1,252 @@
+"""
+Módulo de agrupación dinámica de peticiones (micro-batching).
+
+Las peticiones concurrentes a /predict se encolan y un único worker las agrupa
+en lotes para ejecutar una sola pasada del modelo por lote, en lugar de una
+pasada con tamaño de lote 1 por cada petición.
+
+Los textos se tokenizan al encolarse y se reparten en cubetas por longitud: un
+lote solo mezcla textos de la misma cubeta y se rellena hasta su texto más largo,
+así un comentario de tres palabras no se procesa con el relleno de una reseña de
+varios párrafos. El tamaño de cada lote se limita por tokens (textos × longitud
+del más largo) además de por número de textos.
+"""
+
+import asyncio
+import bisect
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+from utils import get_logger
+
+logger = get_logger("batching")
+
+
+class _Item:
+    """Texto pendiente: su representación para el modelo, su longitud y la petición que espera."""
+
+    __slots__ = ("payload", "length", "future", "enqueued")
+
+    def __init__(self, payload: Any, length: int, future: asyncio.Future, enqueued: float):
+        self.payload = payload
+        self.length = length
+        self.future = future
+        self.enqueued = enqueued
+
+
+class MicroBatcher:
+    """
+    Cola de agrupación de peticiones de inferencia.
+
+    Cada texto enviado con `submit` se tokeniza con `encode_fn` y se añade a la
+    cubeta de su longitud. Un worker en segundo plano espera al primer texto y sigue
+    recogiendo hasta que alguna cubeta completa un lote (`max_batch_size` textos o
+    `max_batch_tokens` tokens con relleno) o se agota `max_wait_ms` para el texto
+    más antiguo. Entonces procesa un lote de esa cubeta con `predict_fn` en un hilo
+    aparte (para no bloquear el bucle de eventos) y devuelve cada resultado a la
+    petición que lo originó. Los textos que no caben esperan al siguiente lote.
+
+    Sin `encode_fn`, `predict_fn` recibe los textos tal cual y cada texto cuenta
+    como un token: solo se limita el número de textos por lote.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Any]], List[dict[str, Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        encode_fn: Optional[Callable[[List[str]], List[Sequence[int]]]] = None,
+        max_batch_tokens: int = 0,
+        bucket_boundaries: Sequence[int] = ()
+    ):
+        """
+        Args:
+            predict_fn (Callable): Función que recibe una lista de textos (o de
+                secuencias de tokens si se indica `encode_fn`) y devuelve una lista
+                de predicciones en el mismo orden
+            max_batch_size (int): Número máximo de textos por lote
+            max_wait_ms (float): Tiempo máximo (ms) que se espera para completar un lote
+            encode_fn (Callable, optional): Tokeniza una lista de textos
+            max_batch_tokens (int): Tokens máximos por lote contando el relleno
+                (0 = sin límite)
+            bucket_boundaries (Sequence[int]): Longitudes máximas de cada cubeta, en
+                orden creciente; los textos más largos van a una cubeta final
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size debe ser mayor que 0")
+        self.predict_fn = predict_fn
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max(max_batch_tokens, 0)
+        self.bucket_boundaries = sorted(bucket_boundaries)
+        self.max_wait = max(max_wait_ms, 0) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[int, Deque[_Item]] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Arranca el worker que procesa la cola de peticiones."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._pending = {}
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            "Micro-batching activo: max_batch_size=%s, max_batch_tokens=%s, cubetas=%s, max_wait_ms=%g",
+            self.max_batch_size, self.max_batch_tokens or "sin límite", self.bucket_boundaries or "una",
+            self.max_wait * 1000
+        )
+
+    async def stop(self):
+        """Detiene el worker y cancela las peticiones que quedaran pendientes."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        pending = [item for bucket in self._pending.values() for item in bucket]
+        self._pending = {}
+        if self._queue:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        for item in pending:
+            if not item.future.done():
+                item.future.cancel()
+
+    async def submit(self, text: str) -> dict[str, Any]:
+        """
+        Encola un texto y espera a que su lote sea procesado.
+
+        Args:
+            text (str): Texto a analizar
+
+        Returns:
+            dict: Predicción correspondiente al texto
+        """
+        return (await self.submit_many([text]))[0]
+
+    async def submit_many(self, texts: List[str]) -> List[dict[str, Any]]:
+        """
+        Encola varios textos a la vez. Se tokenizan juntos, se combinan con el resto
+        de peticiones concurrentes y se reparten en lotes según su longitud.
+
+        Args:
+            texts (List[str]): Textos a analizar
+
+        Returns:
+            List[dict]: Predicciones en el mismo orden que los textos
+        """
+        if not self.running:
+            raise RuntimeError("El micro-batcher no está arrancado")
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        if self.encode_fn:
+            payloads = await loop.run_in_executor(None, self.encode_fn, texts)
+            lengths = [len(ids) for ids in payloads]
+        else:
+            payloads, lengths = texts, [1] * len(texts)
+        futures = []
+        for payload, length in zip(payloads, lengths):
+            future = loop.create_future()
+            self._queue.put_nowait(_Item(payload, length, future, loop.time()))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def bucket_of(self, length: int) -> int:
+        """Índice de la cubeta que corresponde a una longitud en tokens."""
+        return bisect.bisect_left(self.bucket_boundaries, length)
+
+    def _add(self, item: _Item):
+        """Añade un texto a su cubeta."""
+        self._pending.setdefault(self.bucket_of(item.length), deque()).append(item)
+
+    def _is_full(self, bucket: Deque[_Item]) -> bool:
+        if len(bucket) >= self.max_batch_size:
+            return True
+        if self.max_batch_tokens:
+            return len(bucket) * max(item.length for item in bucket) >= self.max_batch_tokens
+        return False
+
+    def _oldest_bucket(self) -> Optional[int]:
+        """Cubeta cuyo primer texto lleva más tiempo esperando."""
+        heads = [(bucket[0].enqueued, index) for index, bucket in self._pending.items() if bucket]
+        return min(heads)[1] if heads else None
+
+    def _take(self, index: int) -> List[_Item]:
+        """
+        Saca de una cubeta, por orden de llegada, los textos que caben en un lote.
+
+        El primero se saca siempre, aunque él solo supere `max_batch_tokens`.
+        """
+        bucket = self._pending[index]
+        batch = [bucket.popleft()]
+        longest = batch[0].length
+        while bucket and len(batch) < self.max_batch_size:
+            width = max(longest, bucket[0].length)
+            if self.max_batch_tokens and (len(batch) + 1) * width > self.max_batch_tokens:
+                break
+            batch.append(bucket.popleft())
+            longest = width
+        if not bucket:
+            del self._pending[index]
+        return batch
+
+    async def _collect_batch(self) -> List[_Item]:
+        """
+        Espera a que una cubeta complete un lote o a que venza la espera del texto
+        más antiguo, y devuelve el lote de esa cubeta. Vencer la espera tiene
+        prioridad, para que una cubeta muy concurrida no retrase al resto.
+        """
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            self._add(await self._queue.get())
+        while True:
+            # Lo que ya está en la cola se recoge sin esperar
+            while not self._queue.empty():
+                self._add(self._queue.get_nowait())
+            oldest = self._oldest_bucket()
+            timeout = self._pending[oldest][0].enqueued + self.max_wait - loop.time()
+            if timeout <= 0:
+                return self._take(oldest)
+            full = next((index for index, bucket in self._pending.items() if self._is_full(bucket)), None)
+            if full is not None:
+                return self._take(full)
+            try:
+                self._add(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return self._take(oldest)
+
+    async def _run(self):
+        """Bucle principal del worker: agrupa, predice y reparte resultados."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            # Descartar peticiones cuyo cliente ya se ha desconectado
+            batch = [item for item in batch if not item.future.done()]
+            if not batch:
+                continue
+            payloads = [item.payload for item in batch]
+            logger.debug(
+                "Procesando lote de %s textos (%s tokens como máximo)", len(batch), max(item.length for item in batch)
+            )
+            try:
+                results = await loop.run_in_executor(None, self.predict_fn, payloads)
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"El modelo devolvió {len(results)} resultados para {len(batch)} textos"
+                    )
+            except Exception as e:
+                logger.error(f"Error al procesar el lote: {e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
@@ -0,0 +1,221 @@
+"""
+Módulo de caché de predicciones.
+
+Muchas reseñas se repiten literalmente ("Una obra maestra", las plantillas de
+data/comments.json...), así que se guarda el resultado de cada texto normalizado
+para no volver a pasar por el modelo. La caché está acotada en tamaño (LRU),
+las entradas caducan tras un TTL y todo su contenido se invalida si cambia la
+versión del modelo. Opcionalmente se persiste en disco para no arrancar en frío.
+"""
+
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from utils import get_logger
+
+logger = get_logger("prediction_cache")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza un texto para usarlo como clave de la caché.
+
+    Aplica normalización Unicode NFKC, pasa a minúsculas y colapsa los espacios,
+    de forma que variaciones triviales del mismo texto compartan entrada.
+
+    Args:
+        text (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+class PredictionCache:
+    """
+    Caché LRU con caducidad (TTL) para las predicciones del modelo.
+
+    Cada entrada guarda la predicción y el instante en que caduca. Al superar
+    `max_entries` se expulsa la entrada usada hace más tiempo.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 3600,
+        model_version: str = "",
+        persist_path: Optional[str] = None
+    ):
+        """
+        Args:
+            max_entries (int): Número máximo de entradas (0 desactiva la caché)
+            ttl_seconds (float): Segundos que una entrada es válida (0 = sin caducidad)
+            model_version (str): Versión del modelo que generó las predicciones
+            persist_path (str, optional): Fichero donde se guarda la caché al parar
+        """
+        self.max_entries = max(max_entries, 0)
+        self.ttl = max(ttl_seconds, 0)
+        self.model_version = model_version
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Tuple[dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[dict[str, Any]]:
+        """
+        Busca la predicción de un texto.
+
+        Args:
+            text (str): Texto original (se normaliza internamente)
+
+        Returns:
+            dict: Predicción guardada, o None si no está o ha caducado
+        """
+        if not self.enabled:
+            return None
+        key = normalize_text(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        prediction, expires_at = entry
+        if expires_at and expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(prediction)
+
+    def put(self, text: str, prediction: dict[str, Any]):
+        """
+        Guarda la predicción de un texto y expulsa la menos usada si hace falta.
+
+        Args:
+            text (str): Texto original (se normaliza internamente)
+            prediction (dict): Predicción del modelo ('label' y 'score')
+        """
+        if not self.enabled:
+            return
+        key = normalize_text(text)
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        self._entries[key] = (dict(prediction), expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché."""
+        self._entries.clear()
+
+    def set_model_version(self, model_version: str):
+        """
+        Fija la versión del modelo e invalida la caché si ha cambiado.
+
+        Args:
+            model_version (str): Versión del modelo cargado
+        """
+        if model_version != self.model_version:
+            if self._entries:
+                logger.info(f"Versión del modelo cambiada a '{model_version}', se invalida la caché")
+                self.invalidations += 1
+            self.clear()
+            self.model_version = model_version
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve los contadores y el tamaño de la caché."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def load(self) -> int:
+        """
+        Carga la caché desde el fichero de persistencia, si existe.
+
+        Se descartan las entradas caducadas y todo el fichero si fue generado
+        con otra versión del modelo.
+
+        Returns:
+            int: Número de entradas cargadas
+        """
+        if not self.enabled or not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"No se pudo leer la caché de {self.persist_path}: {e}")
+            return 0
+        if data.get("model_version") != self.model_version:
+            logger.info("La caché en disco es de otra versión del modelo, se descarta")
+            return 0
+        now = time.time()
+        # Las entradas se guardan de la menos a la más usada, así se conserva el orden LRU
+        for key, prediction, expires_at in data.get("entries", [])[-self.max_entries:]:
+            if expires_at and expires_at <= now:
+                continue
+            self._entries[key] = (prediction, expires_at)
+        logger.info(f"Cargadas {len(self._entries)} predicciones en caché desde {self.persist_path}")
+        return len(self._entries)
+
+    def save(self) -> int:
+        """
+        Guarda la caché en el fichero de persistencia.
+
+        Se escribe en un fichero temporal y se renombra para no dejar nunca
+        un fichero a medias si el proceso se interrumpe.
+
+        Returns:
+            int: Número de entradas guardadas
+        """
+        if not self.enabled or not self.persist_path:
+            return 0
+        data = {
+            "model_version": self.model_version,
+            "entries": [[key, prediction, expires_at] for key, (prediction, expires_at) in self._entries.items()]
+        }
+        # Un fichero temporal por proceso: con varios workers cada uno guarda su copia
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.error(f"No se pudo guardar la caché en {self.persist_path}: {e}")
+            return 0
+        logger.info(f"Guardadas {len(self._entries)} predicciones en caché en {self.persist_path}")
+        return len(self._entries)
@@ -1,16 +1,64 @@
-from typing import Any
-from fastapi import FastAPI, HTTPException
-import torch
+from typing import Any, Dict, List
+from fastapi import FastAPI, HTTPException, Response
+import asyncio
+import os
 import random
+import time
 from contextlib import asynccontextmanager
-from transformers import pipeline
 from pydantic import BaseModel
 from utils import get_logger  # Importar directamente la función get_logger del módulo correcto  
+from .backends import MAX_LENGTH, import_runtime, load_backend
+from .batching import MicroBatcher
+from .cache import PredictionCache
+from .metrics import (
+    BATCH_SIZE, BATCH_TOKENS, CACHE_LOOKUPS, FORWARD_SECONDS, RANDOM_FALLBACKS, MetricsMiddleware, render_metrics
+)
 
 logger = get_logger("inference_service")
 # Variable global para almacenar el pipeline
 model_pipeline = None
 
+# Configuración del micro-batching
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+# Tokens máximos por lote contando el relleno (textos × longitud del más largo)
+MAX_BATCH_TOKENS = int(os.getenv("INFERENCE_MAX_BATCH_TOKENS", "2048"))
+# Longitudes (en tokens) que separan las cubetas del micro-batching
+LENGTH_BUCKETS = [int(b) for b in os.getenv("INFERENCE_LENGTH_BUCKETS", "16,32,64").split(",") if b.strip()]
+# Número máximo de textos aceptados en una sola petición a /predict_batch
+MAX_BATCH_REQUEST = int(os.getenv("INFERENCE_MAX_BATCH_REQUEST", "256"))
+
+# Modelo utilizado y versión con la que se etiquetan las predicciones en caché
+MODEL_NAME = os.getenv("INFERENCE_MODEL", "pysentimiento/robertuito-sentiment-analysis")
+# Backend de ejecución del modelo: torch, onnx u onnx-int8 (ver inference.backends)
+BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+# Los backends ONNX no dan exactamente las mismas probabilidades: no comparten caché con torch
+MODEL_VERSION = os.getenv("INFERENCE_MODEL_VERSION", MODEL_NAME if BACKEND == "torch" else f"{MODEL_NAME}+{BACKEND}")
+
+# Configuración de la caché de predicciones
+CACHE_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("INFERENCE_CACHE_TTL_SECONDS", "86400"))
+# Fichero opcional donde se persiste la caché entre reinicios
+CACHE_FILE = os.getenv("INFERENCE_CACHE_FILE") or None
+
+# Rondas de calentamiento antes de declarar el servicio listo (0 = sin calentamiento).
+# Cada ronda pasa por el modelo un lote de cada cubeta de longitud
+WARMUP_ROUNDS = int(os.getenv("INFERENCE_WARMUP_ROUNDS", "2"))
+WARMUP_TEXT = "La película tiene buenos actores, un guion correcto y un final que no me esperaba."
+
+# Estado del arranque: 'starting', 'warming', 'ready' o 'failed' (ver GET /readyz)
+service_status = "starting"
+# Duración en segundos de cada fase del arranque
+startup_phases: Dict[str, float] = {}
+
+# Mapear las etiquetas del modelo español a las etiquetas estándar
+# Este modelo usa etiquetas en inglés (POS, NEG, NEU)
+LABEL_MAPPING = {
+    "POS": "positive",
+    "NEG": "negative",
+    "NEU": "neutral"
+}
+
 # Modelos de datos para la API
 class PredictionRequest(BaseModel):
     text: str
@@ -19,35 +67,233 @@ class PredictionResponse(BaseModel):
     label: str
     score: float
 
+class BatchPredictionRequest(BaseModel):
+    texts: List[str]
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse]
+
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
+    ready: bool
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+class LivenessResponse(BaseModel):
+    status: str
+
+class ReadinessResponse(BaseModel):
+    status: str
+    ready: bool
+    phases: Dict[str, float]
+
+class CacheStatsResponse(BaseModel):
+    worker_pid: int
+    enabled: bool
+    model_version: str
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+def tokenize_texts(texts: List[str]) -> List[List[int]]:
+    """Tokeniza los textos al encolarlos, para agruparlos por longitud."""
+    return model_pipeline.encode(texts)
+
+
+def predict_tokens(batch: List[List[int]]) -> List[dict[str, Any]]:
+    """
+    Ejecuta una única pasada del modelo sobre un lote de textos ya tokenizados.
+
+    El backend rellena (padding) el lote solo hasta su texto más largo; el
+    micro-batcher se encarga de que los textos de un lote tengan longitudes
+    parecidas.
+
+    Args:
+        batch (List[List[int]]): Tokens de cada texto
+
+    Returns:
+        List[dict]: 'label' y 'score' de cada texto, en el mismo orden
+    """
+    BATCH_SIZE.observe(len(batch))
+    real_tokens = sum(len(ids) for ids in batch)
+    BATCH_TOKENS.labels("real").inc(real_tokens)
+    BATCH_TOKENS.labels("padding").inc(len(batch) * max(len(ids) for ids in batch) - real_tokens)
+    start = time.perf_counter()
+    results = model_pipeline.predict_encoded(batch)
+    FORWARD_SECONDS.observe(time.perf_counter() - start)
+    return [
+        {"label": LABEL_MAPPING.get(r["label"], r["label"]).lower(), "score": r["score"]}
+        for r in results
+    ]
+
+
+def random_prediction() -> dict[str, Any]:
+    """Predicción aleatoria de respaldo cuando el modelo no está disponible."""
+    labels = ["positive", "negative", "neutral"]
+    return {"label": random.choice(labels), "score": -1}
+
+
+def cached_prediction(text: str):
+    """Busca un texto en la caché y cuenta el acierto o el fallo en las métricas."""
+    prediction = prediction_cache.get(text)
+    if prediction_cache.enabled:
+        CACHE_LOOKUPS.labels("miss" if prediction is None else "hit").inc()
+    return prediction
+
+
+async def cached_predict_many(texts: List[str]) -> List[dict[str, Any]]:
+    """
+    Predice una lista de textos consultando antes la caché.
+
+    Solo los textos que no están en caché pasan por el micro-batcher, y los textos
+    repetidos dentro de la misma lista se envían al modelo una única vez.
+
+    Args:
+        texts (List[str]): Textos a analizar
+
+    Returns:
+        List[dict]: 'label' y 'score' de cada texto, en el mismo orden
+    """
+    predictions: List[Any] = [cached_prediction(text) for text in texts]
+    missing = list(dict.fromkeys(text for text, p in zip(texts, predictions) if p is None))
+    if missing:
+        computed = dict(zip(missing, await batcher.submit_many(missing)))
+        for text, prediction in computed.items():
+            prediction_cache.put(text, prediction)
+        predictions = [p if p is not None else computed[text] for text, p in zip(texts, predictions)]
+    return predictions
+
+
+batcher = MicroBatcher(
+    predict_tokens,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_WAIT_MS,
+    encode_fn=tokenize_texts,
+    max_batch_tokens=MAX_BATCH_TOKENS,
+    bucket_boundaries=LENGTH_BUCKETS
+)
+prediction_cache = PredictionCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    model_version=MODEL_VERSION,
+    persist_path=CACHE_FILE
+)
+
+def load_model():
+    """
+    Carga el modelo con el backend configurado, salvo que ya esté cargado.
+
+    En el modo multiproceso (ver inference.prefork) el proceso principal lo carga
+    una sola vez antes de crear los workers, que lo heredan ya cargado.
+
+    Returns:
+        El backend del modelo, o None si no se ha podido cargar
+    """
     global model_pipeline
+    if model_pipeline is not None:
+        return model_pipeline
     # Initialize sentiment analysis with fallback
     try:
-        device = 0 if torch.cuda.is_available() else -1
+        start = time.perf_counter()
+        # torch y transformers solo se importan aquí: importar el módulo es inmediato
+        import_runtime(BACKEND)
+        device = -1
+        if BACKEND == "torch":
+            import torch
+            device = 0 if torch.cuda.is_available() else -1
+        startup_phases["import"] = time.perf_counter() - start
 
-        logger.info(f"Using device: {'cuda' if device == 0 else 'cpu'}")
+        logger.info("Using device: %s", "cuda" if device == 0 else "cpu")
 
-        
         # Usar un modelo más preciso para español
-        model_pipeline = pipeline(
-            "text-classification", 
-            model="pysentimiento/robertuito-sentiment-analysis",  
-            device=device
-        )
-        logger.info("Successfully loaded improved Spanish sentiment analysis model (pysentimiento/robertuito)")
+        start = time.perf_counter()
+        model_pipeline = load_backend(BACKEND, MODEL_NAME, device)
+        startup_phases["load"] = time.perf_counter() - start
+        logger.info("Successfully loaded Spanish sentiment analysis model %s (backend %s)", MODEL_NAME, BACKEND)
     except Exception as e:
         logger.error(f"Failed to initialize model: {e}")
         model_pipeline = None
-    
+    return model_pipeline
+
+def warmup(rounds: int):
+    """
+    Pasa lotes de prueba por el modelo antes de recibir tráfico.
+
+    Las primeras pasadas reservan memoria y preparan los kernels de cada forma de
+    lote; sin calentamiento ese coste lo pagan las primeras peticiones reales. En
+    cada ronda se ejecuta un lote de cada cubeta de longitud, con tantos textos
+    como permite el límite de tokens por lote.
+
+    Args:
+        rounds (int): Rondas de calentamiento
+    """
+    # El texto se repite para llegar a la longitud máxima; el tokenizador lo trunca
+    full = model_pipeline.encode([" ".join([WARMUP_TEXT] * MAX_LENGTH)])[0]
+    lengths = sorted({min(length, len(full)) for length in LENGTH_BUCKETS + [len(full)]})
+    for round_number in range(rounds):
+        for length in lengths:
+            ids = full[:length - 1] + full[-1:]
+            texts = max(1, min(MAX_BATCH_SIZE, MAX_BATCH_TOKENS // length))
+            start = time.perf_counter()
+            model_pipeline.predict_encoded([ids] * texts)
+            if "first_forward" not in startup_phases:
+                startup_phases["first_forward"] = time.perf_counter() - start
+        logger.debug("Ronda de calentamiento %s completada", round_number + 1)
+
+
+async def start_service():
+    """
+    Carga el modelo, lo calienta y arranca el micro-batcher sin bloquear el
+    servidor: mientras tanto /livez responde y /readyz devuelve 503.
+    """
+    global service_status
+    start = time.perf_counter()
+    if await asyncio.to_thread(load_model) is None:
+        service_status = "failed"
+        return
+    service_status = "warming"
+    try:
+        warmup_start = time.perf_counter()
+        await asyncio.to_thread(warmup, WARMUP_ROUNDS)
+        startup_phases["warmup"] = time.perf_counter() - warmup_start
+    except Exception as e:
+        logger.error(f"Error al calentar el modelo: {e}")
+        service_status = "failed"
+        return
+    await batcher.start()
+    prediction_cache.set_model_version(MODEL_VERSION)
+    prediction_cache.load()
+    startup_phases["total"] = time.perf_counter() - start
+    service_status = "ready"
+    logger.info(
+        "Servicio listo en %.2f s (%s)", startup_phases["total"],
+        ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in startup_phases.items() if phase != "total")
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global model_pipeline
+    startup = asyncio.create_task(start_service())
+
     # Este yield debe estar fuera del bloque try-except
     yield
     
     # Cleanup
+    startup.cancel()
+    try:
+        await startup
+    except asyncio.CancelledError:
+        pass
+    await batcher.stop()
+    if service_status == "ready":
+        prediction_cache.save()
     if model_pipeline:
         del model_pipeline
         logger.debug("Model pipeline released")
@@ -60,6 +306,8 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+# Latencia y peticiones en curso por ruta (ver GET /metrics)
+app.add_middleware(MetricsMiddleware)
 
 @app.post(
     "/predict", 
@@ -70,6 +318,8 @@ app = FastAPI(
     
     El modelo utilizado es 'pysentimiento/robertuito-sentiment-analysis', especializado en textos en español.
     El sistema añade automáticamente contexto relacionado con películas para mejorar la precisión del análisis.
+    Las peticiones concurrentes se agrupan en lotes para aprovechar mejor el modelo
+    y los textos ya analizados se sirven desde una caché.
     """
 )
 async def predict(data: PredictionRequest) -> dict[str, Any]:
@@ -90,42 +340,109 @@ async def predict(data: PredictionRequest) -> dict[str, Any]:
         HTTPException: Si no se proporciona el campo 'text' (400)
     """
     original_text = data.text
-    logger.info(f"Texto recibido: '{original_text}'")
+    logger.info("Texto recibido: '%s'", original_text)
     
     # Añadir contexto de película al texto para que el modelo lo entienda mejor
     
     
     try:
-        if not model_pipeline:
-            # Random fallback if model isn't loaded
-            labels = ["positive", "negative", "neutral"]
-            random_label = random.choice(labels)
-            logger.warning(f"Modelo no cargado, retornando etiqueta aleatoria {random_label}")
-            return {"label": random_label, "score": -1}
+        if service_status != "ready":
+            # Random fallback if model isn't loaded (or still warming up)
+            prediction = random_prediction()
+            RANDOM_FALLBACKS.labels("predict").inc()
+            logger.warning(f"Modelo no listo, retornando etiqueta aleatoria {prediction['label']}")
+            return prediction
         
-        # Usar el texto con contexto para la predicción
-        result = model_pipeline(original_text)
-        prediction = result[0]
+        prediction = cached_prediction(original_text)
+        if prediction is not None:
+            logger.info("Resultado de la prediccion (cache): %s", prediction)
+            return prediction
         
-        # Mapear las etiquetas del modelo español a las etiquetas estándar
-        # Este modelo usa etiquetas en inglés (POS, NEG, NEU)
-        label_mapping = {
-            "POS": "positive",
-            "NEG": "negative",
-            "NEU": "neutral"
-        }
+        # El texto se encola y se procesa junto al resto de peticiones concurrentes
+        prediction = await batcher.submit(original_text)
+        prediction_cache.put(original_text, prediction)
         
-        label = prediction["label"]
-        mapped_label = label_mapping.get(label, label).lower()
-        
-        logger.info(f"Resultado de la prediccion: {prediction}, etiqueta: {mapped_label}")
-        return {"label": mapped_label, "score": prediction["score"]}
+        logger.info("Resultado de la prediccion: %s", prediction)
+        return prediction
     except Exception as e:
         # Random fallback if prediction fails
-        labels = ["positive", "negative", "neutral"]
-        random_label = random.choice(labels)
-        logger.error(f"Error en la prediccion: {e}, retornando etiqueta aleatoria: {random_label}")
-        return {"label": random_label, "score": -1}
+        prediction = random_prediction()
+        RANDOM_FALLBACKS.labels("predict").inc()
+        logger.error(f"Error en la prediccion: {e}, retornando etiqueta aleatoria: {prediction['label']}")
+        return prediction
+
+@app.post(
+    "/predict_batch",
+    response_model=BatchPredictionResponse,
+    summary="Analizar sentimiento de varios textos",
+    description="""
+    Analiza el sentimiento de una lista de textos en español en una sola petición.
+    
+    Los textos se procesan en lotes junto con el resto de peticiones concurrentes
+    y las predicciones se devuelven en el mismo orden en que se recibieron.
+    """
+)
+async def predict_batch(data: BatchPredictionRequest) -> dict[str, Any]:
+    """
+    Endpoint para analizar el sentimiento de varios textos a la vez.
+    
+    Args:
+        data (BatchPredictionRequest): Objeto con el campo 'texts' con los textos a analizar
+        
+    Returns:
+        dict: Contiene 'predictions', una lista con 'label' y 'score' por cada texto
+        
+    Raises:
+        HTTPException: Si se envían más textos de los permitidos (400)
+    """
+    if len(data.texts) > MAX_BATCH_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se admiten como máximo {MAX_BATCH_REQUEST} textos por petición"
+        )
+    logger.info("Lote recibido con %s textos", len(data.texts))
+    
+    try:
+        if service_status != "ready":
+            logger.warning("Modelo no listo, retornando etiquetas aleatorias")
+            RANDOM_FALLBACKS.labels("predict_batch").inc(len(data.texts))
+            return {"predictions": [random_prediction() for _ in data.texts]}
+        
+        return {"predictions": await cached_predict_many(data.texts)}
+    except Exception as e:
+        logger.error(f"Error en la prediccion por lotes: {e}, retornando etiquetas aleatorias")
+        RANDOM_FALLBACKS.labels("predict_batch").inc(len(data.texts))
+        return {"predictions": [random_prediction() for _ in data.texts]}
+
+@app.get(
+    "/cache/stats",
+    response_model=CacheStatsResponse,
+    summary="Estadísticas de la caché de predicciones",
+    description="""
+    Devuelve el tamaño de la caché de predicciones y sus contadores de aciertos,
+    fallos, expulsiones (LRU), caducidades (TTL) e invalidaciones por cambio de modelo.
+
+    Con varios workers cada uno tiene su propia caché y responde con la suya
+    (`worker_pid`); el total de aciertos y fallos de todos los workers está en
+    `inference_cache_lookups_total` de `GET /metrics`.
+    """
+)
+async def cache_stats() -> dict[str, Any]:
+    """
+    Endpoint con las estadísticas de la caché de predicciones.
+    
+    Returns:
+        dict: Tamaño, configuración y contadores de la caché
+    """
+    return {"worker_pid": os.getpid(), **prediction_cache.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Endpoint con las métricas de ejecución en formato de texto de Prometheus.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get(
     "/health",
@@ -146,6 +463,50 @@ async def health() -> dict[str, Any]:
     de análisis de sentimiento se ha cargado correctamente.
     
     Returns:
-        dict: Estado del servicio y si el modelo está cargado
+        dict: Estado del servicio, si el modelo está cargado y si está listo
+    """
+    return {"status": "ok", "model_loaded": model_pipeline is not None, "ready": service_status == "ready"}
+
+@app.get(
+    "/livez",
+    response_model=LivenessResponse,
+    summary="Comprobación de vida",
+    description="""
+    Responde mientras el proceso atiende peticiones, también durante la carga y el
+    calentamiento del modelo. Si deja de responder el orquestador debe reiniciar
+    el servicio.
+    """
+)
+async def livez() -> dict[str, Any]:
+    """
+    Endpoint de comprobación de vida del servicio.
+    
+    Returns:
+        dict: Siempre {'status': 'ok'}
+    """
+    return {"status": "ok"}
+
+@app.get(
+    "/readyz",
+    response_model=ReadinessResponse,
+    summary="Comprobación de disponibilidad",
+    description="""
+    Devuelve 200 solo cuando el modelo está cargado y calentado y el servicio puede
+    recibir tráfico; en otro caso devuelve 503. Incluye la duración en segundos de
+    cada fase del arranque: importación de librerías, carga de pesos, primera pasada
+    del modelo, calentamiento y total.
+    """,
+    responses={503: {"description": "El modelo se está cargando, calentando o no se pudo cargar"}}
+)
+async def readyz(response: Response) -> dict[str, Any]:
+    """
+    Endpoint de comprobación de disponibilidad del servicio.
+    
+    Returns:
+        dict: Estado del arranque ('starting', 'warming', 'ready' o 'failed'),
+            si está listo y la duración de cada fase
     """
-    return {"status": "ok", "model_loaded": model_pipeline is not None}
+    ready = service_status == "ready"
+    if not ready:
+        response.status_code = 503
+    return {"status": service_status, "ready": ready, "phases": startup_phases}
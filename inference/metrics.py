@@ -0,0 +1,128 @@
+"""
+Métricas de ejecución del servicio de inferencia en formato Prometheus.
+
+Se publican en `GET /metrics` e incluyen la latencia por ruta, las peticiones en
+curso, el tamaño de los lotes que llegan al modelo, los tokens reales y de
+relleno de esos lotes, la duración de cada pasada del modelo y el número de
+predicciones aleatorias de respaldo.
+
+Las métricas se guardan en un registro propio y no en el global de
+`prometheus_client`: cuando el servicio se ejecuta junto al código de la API
+(p. ej. con PYTHONPATH=src) los nombres comunes no chocan entre sí.
+
+Con varios workers (ver inference.prefork) se usa el modo multiproceso de
+`prometheus_client`: cada worker escribe sus valores en ficheros de
+PROMETHEUS_MULTIPROC_DIR y `GET /metrics` devuelve la suma de todos ellos,
+responda el worker que responda. La variable debe estar definida antes de
+importar `prometheus_client`.
+"""
+
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, GCCollector, Histogram,
+    PlatformCollector, ProcessCollector, generate_latest, multiprocess
+)
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+REGISTRY = CollectorRegistry()
+if not MULTIPROCESS_DIR:
+    # Las métricas del proceso no se pueden sumar entre workers
+    ProcessCollector(registry=REGISTRY)
+    PlatformCollector(registry=REGISTRY)
+    GCCollector(registry=REGISTRY)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP",
+    ["method", "route", "status"],
+    registry=REGISTRY
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso",
+    ["method"],
+    multiprocess_mode="livesum",
+    registry=REGISTRY
+)
+BATCH_SIZE = Histogram(
+    "inference_batch_size",
+    "Textos por pasada del modelo",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+    registry=REGISTRY
+)
+BATCH_TOKENS = Counter(
+    "inference_batch_tokens_total",
+    "Tokens procesados por el modelo: 'real' los de los textos y 'padding' el relleno",
+    ["kind"],
+    registry=REGISTRY
+)
+FORWARD_SECONDS = Histogram(
+    "inference_forward_seconds",
+    "Duración de cada pasada del modelo",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=REGISTRY
+)
+CACHE_LOOKUPS = Counter(
+    "inference_cache_lookups_total",
+    "Consultas a la caché de predicciones: 'hit' o 'miss'",
+    ["result"],
+    registry=REGISTRY
+)
+RANDOM_FALLBACKS = Counter(
+    "inference_random_fallback_total",
+    "Textos etiquetados al azar porque el modelo no estaba disponible o falló",
+    ["endpoint"],
+    registry=REGISTRY
+)
+
+# Ruta con la que se etiquetan las peticiones que no coinciden con ningún endpoint
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide la latencia y las peticiones en curso por ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method)
+        start = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # La ruta solo se conoce cuando el router ha resuelto la petición
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            REQUEST_LATENCY.labels(method, route, str(status["code"])).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    """
+    Serializa todas las métricas registradas.
+
+    En modo multiproceso se suman los valores de todos los workers.
+
+    Returns:
+        tuple: Cuerpo en formato de texto de Prometheus y su content type
+    """
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
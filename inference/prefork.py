@@ -0,0 +1,309 @@
+"""
+Servicio de inferencia multiproceso con una única copia del modelo.
+
+Con `uvicorn --workers N` cada worker importa la aplicación y carga su propia
+copia del modelo (N veces la memoria y N veces el tiempo de carga). Este módulo
+carga el modelo una vez en el proceso principal, abre el socket de escucha y
+crea los workers con `fork()`: los workers heredan los pesos ya cargados y los
+comparten con el proceso principal copy-on-write, de modo que la memoria del
+modelo no se multiplica por el número de workers. La excepción es torch con una
+GPU: un contexto CUDA no sobrevive a `fork()`, así que el proceso principal no
+toca la GPU y cada worker carga el modelo en ella.
+
+Cada worker configura sus hilos de PyTorch (intra-op e inter-op) y, opcionalmente,
+su afinidad de CPU, para que los workers no compitan por los mismos núcleos. Si
+un worker termina inesperadamente el proceso principal crea otro.
+
+Con los backends ONNX el proceso principal solo prepara el fichero .onnx
+(exportación y cuantización) y cada worker abre su propia sesión de ONNX Runtime:
+sus hilos internos no sobreviven a un `fork()`.
+
+Variables de entorno (o los argumentos equivalentes):
+    - INFERENCE_WORKERS: número de workers (por defecto 1)
+    - INFERENCE_INTRA_OP_THREADS: hilos por pasada del modelo en cada worker
+      (por defecto, los núcleos disponibles repartidos entre los workers)
+    - INFERENCE_INTER_OP_THREADS: hilos inter-op de cada worker (por defecto 1)
+    - INFERENCE_CPU_AFFINITY: 'auto' reparte los núcleos entre los workers, 'none'
+      no fija la afinidad y una lista como '0-3;4-7' asigna núcleos a cada worker
+    - PROMETHEUS_MULTIPROC_DIR: directorio donde los workers escriben sus métricas
+      para que `GET /metrics` devuelva el total (por defecto uno temporal)
+
+Cada worker tiene su propia caché de predicciones; con INFERENCE_CACHE_FILE cada
+uno la guarda en su fichero (`cache.worker0.json`, `cache.worker1.json`...), que
+recupera el worker del mismo número al reiniciarse.
+
+Uso:
+
+    python -m inference.prefork --host 0.0.0.0 --port 8001 --workers 4
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+import uvicorn
+from utils import get_logger, shutdown_logging
+
+logger = get_logger("prefork")
+
+WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INTRA_OP_THREADS = int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", "1"))
+CPU_AFFINITY = os.getenv("INFERENCE_CPU_AFFINITY", "auto")
+
+# Tiempo mínimo entre dos reinicios del mismo worker, para no entrar en un bucle
+# de forks si falla nada más arrancar
+_RESTART_DELAY = 1.0
+
+
+def available_cpus() -> List[int]:
+    """Núcleos en los que puede ejecutarse el proceso actual."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(value: str) -> List[int]:
+    """Interpreta una lista de núcleos como '0,2,4-7'."""
+    cpus: List[int] = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def plan_affinity(spec: str, workers: int, cpus: Sequence[int]) -> List[Optional[List[int]]]:
+    """
+    Decide los núcleos de cada worker.
+
+    Args:
+        spec (str): 'auto', 'none' o listas de núcleos separadas por ';'
+        workers (int): Número de workers
+        cpus (Sequence[int]): Núcleos disponibles
+
+    Returns:
+        list: Núcleos de cada worker (None = sin afinidad fija)
+
+    Raises:
+        ValueError: Si se indican listas explícitas y no hay una por worker
+    """
+    spec = spec.strip().lower()
+    if spec in ("", "none"):
+        return [None] * workers
+    if spec == "auto":
+        if workers > len(cpus):
+            # Más workers que núcleos: se reparten los núcleos de forma circular
+            return [[cpus[i % len(cpus)]] for i in range(workers)]
+        share, extra = divmod(len(cpus), workers)
+        plan, start = [], 0
+        for i in range(workers):
+            size = share + (1 if i < extra else 0)
+            plan.append(list(cpus[start:start + size]))
+            start += size
+        return plan
+    groups = [parse_cpu_list(group) for group in spec.split(";")]
+    if len(groups) != workers:
+        raise ValueError(f"Se indicaron núcleos para {len(groups)} workers, pero hay {workers}")
+    return groups
+
+
+def configure_worker(cpus: Optional[List[int]], intra_op: int, inter_op: int):
+    """
+    Fija la afinidad de CPU y los hilos de PyTorch (y de ONNX Runtime) del worker actual.
+
+    Args:
+        cpus (list, optional): Núcleos del worker (None = sin afinidad fija)
+        intra_op (int): Hilos por pasada del modelo (0 = uno por núcleo del worker)
+        inter_op (int): Hilos inter-op (0 = valor por defecto de PyTorch)
+    """
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    threads = intra_op or len(cpus or available_cpus())
+    from . import backends
+    if not backends.ONNX_THREADS:
+        backends.ONNX_THREADS = threads
+    import torch
+    torch.set_num_threads(threads)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Solo puede fijarse antes de que PyTorch ejecute trabajo en paralelo
+            logger.warning("No se pudieron fijar los hilos inter-op: %s", e)
+    logger.info("Worker %s: núcleos %s, %s hilos intra-op, %s inter-op", os.getpid(), cpus or "todos", threads, inter_op)
+
+
+def cuda_available() -> bool:
+    """
+    Indica si hay una GPU CUDA sin crear un contexto CUDA en este proceso.
+
+    La comprobación se hace con NVML, que sí se puede usar antes de `fork()`: un
+    contexto CUDA creado en el proceso principal no sirve en los workers.
+    """
+    os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
+    import torch
+    return torch.cuda.is_available()
+
+
+def preload_model() -> bool:
+    """
+    Carga el modelo en el proceso principal antes de crear los workers.
+
+    Con los backends ONNX solo se prepara el fichero; la sesión la abre cada worker.
+    Con torch y una GPU disponible no se carga nada: CUDA no admite `fork()` con
+    un contexto ya creado, así que cada worker carga su copia en la GPU al arrancar.
+
+    Returns:
+        bool: True si los workers heredan el modelo ya cargado
+    """
+    from . import inference_service
+    if inference_service.BACKEND == "torch":
+        if cuda_available():
+            logger.warning("GPU CUDA disponible: cada worker carga su propia copia del modelo en la GPU")
+            return False
+        inference_service.load_model()
+    else:
+        from .backends import ONNX_DIR, OnnxBackend
+        OnnxBackend.export(inference_service.MODEL_NAME, ONNX_DIR, inference_service.BACKEND == "onnx-int8")
+    # Los objetos ya creados no se vuelven a recorrer en las recolecciones de los
+    # workers, así el recolector no ensucia (y copia) las páginas compartidas
+    gc.freeze()
+    return inference_service.BACKEND == "torch"
+
+
+def prepare_metrics_dir() -> str:
+    """
+    Prepara el directorio del modo multiproceso de prometheus_client.
+
+    Se borran los ficheros de métricas de una ejecución anterior para no sumar sus
+    valores. Debe llamarse antes de importar `prometheus_client` (es decir, antes
+    de cargar el modelo).
+
+    Returns:
+        str: Directorio donde los workers escriben sus métricas
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="inference-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def worker_cache_path(path: Optional[str], index: int) -> Optional[str]:
+    """Fichero de la caché de predicciones del worker `index` ('cache.json' -> 'cache.worker0.json')."""
+    if not path:
+        return None
+    root, extension = os.path.splitext(path)
+    return f"{root}.worker{index}{extension}"
+
+
+def serve_worker(sock: socket.socket, index: int, cpus: Optional[List[int]], args: argparse.Namespace):
+    """Código de cada worker: configura hilos y afinidad y atiende peticiones en el socket compartido."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    configure_worker(cpus, args.intra_op_threads, args.inter_op_threads)
+    from .inference_service import app, prediction_cache
+    # Cada worker guarda y recupera su caché en su propio fichero
+    prediction_cache.persist_path = worker_cache_path(prediction_cache.persist_path, index)
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=5)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run(args: argparse.Namespace) -> int:
+    """
+    Proceso principal: carga el modelo, abre el socket, crea los workers y los vigila.
+
+    Returns:
+        int: Código de salida
+    """
+    plan = plan_affinity(args.cpu_affinity, args.workers, available_cpus())
+    if args.intra_op_threads == 0 and plan[0] is None:
+        # Sin afinidad fija los núcleos se reparten solo mediante el número de hilos
+        args.intra_op_threads = max(len(available_cpus()) // args.workers, 1)
+
+    metrics_dir = prepare_metrics_dir()
+    preload_model()
+    from prometheus_client import multiprocess
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    # Solo el proceso principal escribe (y rota) el fichero de log; el reenvío de los
+    # registros de los workers solo existe en las utilidades del servicio de inferencia
+    from utils import share_with_children
+    share_with_children()
+    logger.info("Escuchando en %s:%s con %s workers", args.host, args.port, args.workers)
+
+    children: Dict[int, int] = {}
+    started: Dict[int, float] = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                serve_worker(sock, index, plan[index], args)
+            finally:
+                shutdown_logging()
+                os._exit(0)
+        children[pid] = index
+        started[index] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(args.workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        # Las peticiones en curso del worker terminado dejan de contar
+        multiprocess.mark_process_dead(pid, metrics_dir)
+        if index is None or stopping:
+            continue
+        logger.warning("El worker %s (%s) terminó con estado %s; se crea otro", index, pid, status)
+        time.sleep(max(0.0, started[index] + _RESTART_DELAY - time.monotonic()))
+        spawn(index)
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio de inferencia multiproceso con el modelo compartido")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Número de workers")
+    parser.add_argument("--intra-op-threads", type=int, default=INTRA_OP_THREADS,
+                        help="Hilos por pasada del modelo en cada worker (0 = automático)")
+    parser.add_argument("--inter-op-threads", type=int, default=INTER_OP_THREADS,
+                        help="Hilos inter-op de cada worker (0 = valor por defecto de PyTorch)")
+    parser.add_argument("--cpu-affinity", default=CPU_AFFINITY, help="'auto', 'none' o p. ej. '0-3;4-7'")
+    parser.add_argument("--log-level", default="warning")
+    sys.exit(run(parser.parse_args()))
@@ -2,6 +2,6 @@
 Módulo de utilidades para el servicio de inferencia.
 """
 
-from .logger import get_logger
+from .logger import get_logger, shutdown_logging, share_with_children
 
-__all__ = ['get_logger']
\ No newline at end of file
+__all__ = ['get_logger', 'shutdown_logging', 'share_with_children']
\ No newline at end of file
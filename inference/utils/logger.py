@@ -3,60 +3,312 @@ Módulo de configuración centralizada de logging.
 
 Este módulo proporciona funciones para configurar y obtener loggers
 con una configuración consistente en toda la aplicación.
+
+Los loggers no escriben directamente en consola ni en disco: cada registro se
+deja en una cola en memoria y un único hilo en segundo plano (QueueListener) lo
+formatea y lo escribe, de modo que una petición nunca espera a una escritura en
+disco. El fichero se escribe en formato JSON (una línea por registro) y rota al
+alcanzar un tamaño máximo.
+
+Para que los mensajes no se formateen cuando su nivel está desactivado, se deben
+pasar los valores como argumentos (`logger.info("Texto: %s", texto)`) en lugar
+de con f-strings.
+
+Variables de entorno:
+    - LOG_FILE: fichero de log (por defecto logs/inference.log)
+    - LOG_MAX_BYTES / LOG_BACKUP_COUNT: tamaño máximo del fichero y copias rotadas
+    - LOG_QUEUE_SIZE: registros que puede haber en cola; si se llena se descartan
+    - LOG_SAMPLING: muestreo por logger de los mensajes DEBUG/INFO, por ejemplo
+      "inference_service=0.1" (WARNING y superiores nunca se descartan)
 """
 
-import os
+import atexit
+import copy
+import json
 import logging
+import os
+import pickle
+import queue
+import random
+import socket
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+LOG_FILE = os.getenv("LOG_FILE", "logs/inference.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """
+    Interpreta la configuración de muestreo "logger=tasa,logger=tasa".
+
+    Args:
+        value (str): Configuración; las entradas mal formadas se ignoran
+
+    Returns:
+        dict: Nombre del logger -> proporción de mensajes que se conservan (0-1)
+    """
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+LOG_SAMPLING = parse_sampling(os.getenv("LOG_SAMPLING", ""))
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como un objeto JSON en una sola línea."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar solo una proporción de los mensajes DEBUG e INFO de un logger."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloquea al llamante.
+
+    Solo resuelve el mensaje (para no compartir objetos mutables con el hilo de
+    escritura) y delega el formato final en los handlers del listener. Si la cola
+    está llena el registro se descarta y se contabiliza.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 # Variable para rastrear loggers ya inicializados
 _initialized_loggers = set()
 
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+# Socket por el que los hijos creados con fork() envían sus registros al proceso
+# principal (ver share_with_children), proceso que los recibe y hilo receptor
+_parent_socket: Optional[socket.socket] = None
+_children_socket: Optional[socket.socket] = None
+_receiver: Optional[threading.Thread] = None
+_receiver_owner: Optional[int] = None
+# Tamaño máximo de un registro enviado al proceso principal; los mayores se recortan
+_MAX_DATAGRAM = 60 * 1024
+
+
+def _get_queue_handler() -> _NonBlockingQueueHandler:
+    """Crea (una vez por proceso) la cola, los handlers de salida y el hilo que los alimenta."""
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+        # Configurar el handler para la consola
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter('      %(levelname)-7s %(message)s'))
+
+        # Configurar el handler para el archivo: JSON por líneas con rotación por tamaño
+        directory = os.path.dirname(LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            LOG_FILE, mode='a', maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+
+        _listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        _queue_handler = _NonBlockingQueueHandler(log_queue)
+        return _queue_handler
+
+
+class _ParentHandler(logging.Handler):
+    """Handler de los procesos hijos: envía cada registro al proceso principal como un datagrama."""
+
+    def __init__(self, sock: socket.socket):
+        super().__init__()
+        self.sock = sock
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            data = pickle.dumps(record.__dict__)
+            if len(data) > _MAX_DATAGRAM:
+                record = copy.copy(record)
+                record.msg = record.msg[:_MAX_DATAGRAM // 2] + " [recortado]"
+                record.exc_text = None
+                data = pickle.dumps(record.__dict__)
+            self.sock.send(data)
+        except Exception:
+            self.handleError(record)
+
+
+def _receive_from_children(sock: socket.socket):
+    """Hilo del proceso principal: pasa los registros de los hijos a su propia cola."""
+    while True:
+        data = sock.recv(_MAX_DATAGRAM + 4096)
+        if not data:
+            return
+        try:
+            _queue_handler.enqueue(logging.makeLogRecord(pickle.loads(data)))
+        except Exception:
+            continue
+
+
+def shutdown_logging():
+    """
+    Vacía la cola de logs y detiene el hilo de escritura.
+
+    En el proceso principal que recibe los registros de sus hijos, antes escribe
+    los que ya han llegado por el socket.
+    """
+    global _listener, _receiver
+    with _setup_lock:
+        listener, _listener = _listener, None
+        receiver = _receiver if _receiver_owner == os.getpid() else None
+        _receiver = None
+    if receiver is not None:
+        # Un datagrama vacío marca el final: los anteriores ya se han recibido
+        _children_socket.send(b"")
+        receiver.join()
+    if listener is not None:
+        listener.stop()
+
+
+def share_with_children():
+    """
+    Hace que los procesos hijos creados a partir de ahora con fork() envíen sus
+    registros a este proceso en lugar de escribirlos ellos mismos.
+
+    Si cada hijo escribiera el fichero de log, todos rotarían el mismo fichero por
+    su cuenta y las rotaciones simultáneas perderían o mezclarían líneas. Cada hijo
+    mantiene su cola y su hilo de escritura, que envía los registros por un socket
+    Unix de datagramas; un hilo de este proceso los recibe y los deja en su cola,
+    así que solo este proceso escribe y rota el fichero.
+    """
+    global _parent_socket, _children_socket, _receiver, _receiver_owner
+    _get_queue_handler()
+    with _setup_lock:
+        if _receiver is not None:
+            return
+        _parent_socket, _children_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _receiver_owner = os.getpid()
+        _receiver = threading.Thread(target=_receive_from_children, args=(_parent_socket,), daemon=True)
+        _receiver.start()
+
+
+def _restart_after_fork():
+    """
+    Vuelve a arrancar el hilo de escritura en un proceso hijo creado con fork().
+
+    Los hilos no sobreviven a fork(): sin esto los registros del hijo se quedarían
+    en una cola que nadie vacía. El hijo usa una cola nueva con su propio hilo, que
+    envía los registros al padre si este los recibe (share_with_children) o los
+    escribe con los mismos handlers.
+    """
+    global _listener, _setup_lock, _receiver
+    _setup_lock = threading.Lock()
+    _receiver = None
+    if _queue_handler is None or _listener is None:
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    handlers = [_ParentHandler(_children_socket)] if _children_socket is not None else _listener.handlers
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=False)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def dropped_records() -> int:
+    """Devuelve el número de registros descartados por tener la cola llena."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Obtiene un logger configurado con un formato y nivel consistente.
-    
+
     Esta función configura un nuevo logger o devuelve uno existente con:
     - Un nivel basado en la variable de entorno ENVIRONMENT
-    - Un handler para mostrar logs en la consola
-    - Un handler para escribir logs en un archivo
-    
+    - Un handler de cola que delega la escritura en consola y en el archivo
+      en un hilo en segundo plano
+    - Un filtro de muestreo si el logger aparece en LOG_SAMPLING
+
     Args:
         name (str): Nombre del logger (normalmente nombre del módulo)
-        
+
     Returns:
         logging.Logger: Logger configurado
     """
     # Detectar el perfil de ejecución (dev o prod)
     environment = os.getenv("ENVIRONMENT", "prod").lower()
-    
+
     # Crear un logger específico
     logger = logging.getLogger(name)
-    
+
     # Evitar configurar el logger múltiples veces
     if logger.hasHandlers():
         return logger
-    
+
     # Configurar el nivel de logging según el entorno
     if environment == "dev":
         logger.setLevel(logging.DEBUG)
     else:  # producción
         logger.setLevel(logging.WARNING)
-    
-    # Configurar el handler para la consola
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(logging.Formatter('      %(levelname)-7s %(message)s'))
-    
-    # Configurar el handler para el archivo
-    file_handler = logging.FileHandler('logs/inference.log', mode='a')
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    
-    # Añadir los handlers al logger
-    logger.addHandler(stream_handler)
-    logger.addHandler(file_handler)
-    
+
+    logger.addHandler(_get_queue_handler())
+    if name in LOG_SAMPLING:
+        logger.addFilter(SamplingFilter(LOG_SAMPLING[name]))
+
     # Solo registrar la configuración inicial una vez por nombre de logger
     if name not in _initialized_loggers:
-        logger.info(f"Logger '{name}' configurado - Perfil: {environment}")
+        logger.info("Logger '%s' configurado - Perfil: %s", name, environment)
         _initialized_loggers.add(name)
-    
-    return logger
\ No newline at end of file
+
+    return logger
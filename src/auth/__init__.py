@@ -1,2 +1,2 @@
-from .jwt import authenticator, create_jwt_token
-from .password import hash_password, verify_password
\ No newline at end of file
+from .jwt import authenticator, create_jwt_token, rotate_secret_key, token_cache
+from .password import hash_password, verify_password, password_hasher, PasswordHasher, PasswordQueueFull
\ No newline at end of file
@@ -1,9 +1,11 @@
 # src/auth/jwt.py
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import os
 import jwt
 from datetime import datetime, timedelta
 from utils import get_logger
+from .token_cache import VerifiedTokenCache
 
 logger = get_logger("jwt_auth")
 
@@ -11,12 +13,19 @@ SECRET_KEY = "mi_clave_secreta"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Caché de tokens ya verificados (0 entradas la desactiva)
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", "300"))
+token_cache = VerifiedTokenCache(max_entries=TOKEN_CACHE_MAX_ENTRIES, max_ttl_seconds=TOKEN_CACHE_MAX_TTL)
+
 class JWTBearer(HTTPBearer):
     """
     Clase para verificar y validar tokens JWT en las peticiones HTTP.
     
     Esta clase extiende HTTPBearer de FastAPI y se encarga de verificar que el token JWT
     proporcionado en el encabezado de autorización sea válido y no haya expirado.
+    Los tokens ya verificados se guardan en `token_cache` hasta su expiración para
+    no repetir la comprobación de la firma en cada petición.
     """
     
     async def __call__(self, request: Request):
@@ -35,9 +44,13 @@ class JWTBearer(HTTPBearer):
         credentials: HTTPAuthorizationCredentials = await super().__call__(request)
         if credentials:
             token = credentials.credentials
+            payload = token_cache.get(token)
+            if payload is not None:
+                return payload
             try:
                 # Se decodifica el token; si falla se lanzará una excepción
                 payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                token_cache.put(token, payload)
                 return payload
             except jwt.PyJWTError:
                 logger.warning(f"Token JWT inválido o expirado")
@@ -67,8 +80,22 @@ def create_jwt_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    logger.debug(f"Token data creado por el usuario: {data['username']}")
+    logger.debug("Token data creado por el usuario: %s", data['username'])
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def rotate_secret_key(new_secret: str):
+    """
+    Cambia la clave de firma de los tokens y vacía la caché de tokens verificados.
+    
+    Los tokens firmados con la clave anterior dejan de aceptarse de inmediato.
+    
+    Args:
+        new_secret (str): Nueva clave secreta
+    """
+    global SECRET_KEY
+    SECRET_KEY = new_secret
+    token_cache.flush()
+    logger.warning("Clave de firma JWT rotada: caché de tokens vaciada")
+
 # Instancia de JWTBearer para ser usada como dependencia en los endpoints
 authenticator = JWTBearer()
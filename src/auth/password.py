@@ -1,11 +1,35 @@
+"""
+Módulo de hash y verificación de contraseñas con bcrypt.
+
+bcrypt es lento a propósito (entre 100 y 300 ms por operación con el factor de
+trabajo por defecto), así que desde los endpoints nunca se llama directamente:
+`password_hasher` ejecuta las operaciones en un pool de hilos propio y acotado
+(bcrypt libera el GIL mientras calcula). Cuando hay demasiadas operaciones en
+espera se rechazan las nuevas de inmediato en lugar de encolarlas sin límite,
+de modo que una avalancha de logins no degrada al resto de peticiones.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
 import bcrypt
 
+# Factor de trabajo de bcrypt (log2 de las iteraciones)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hilos dedicados a bcrypt y operaciones que pueden esperar turno
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", "32"))
+
 def hash_password(password: str) -> str:
     """Encripta la contraseña usando bcrypt"""
     # Convertir la contraseña a bytes
     password_bytes = password.encode('utf-8')
     # Generar un salt y hacer hash de la contraseña
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     # Devolver el hash como string
     return hashed.decode('utf-8')
@@ -14,4 +38,129 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña coincide con el hash almacenado"""
     password_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
\ No newline at end of file
+    return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+class PasswordQueueFull(Exception):
+    """Se lanza cuando el pool de bcrypt tiene ya el máximo de operaciones pendientes."""
+
+
+class PasswordHasher:
+    """
+    Ejecutor acotado para las operaciones de bcrypt.
+
+    Admite como mucho `workers` operaciones en curso más `max_queue` en espera;
+    las que superan ese límite fallan con `PasswordQueueFull`. Registra la
+    latencia de cada operación (incluida la espera en cola) para poder
+    ajustar el número de hilos y el factor de trabajo.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 32, samples: int = 1000):
+        """
+        Args:
+            workers (int): Hilos dedicados a bcrypt
+            max_queue (int): Operaciones que pueden esperar a un hilo libre
+            samples (int): Latencias recientes guardadas para los percentiles
+        """
+        if workers < 1 or max_queue < 0:
+            raise ValueError("workers debe ser mayor que 0 y max_queue no puede ser negativo")
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies: Dict[str, Deque[float]] = {
+            "hash": deque(maxlen=samples),
+            "verify": deque(maxlen=samples)
+        }
+        self._counts = {"hash": 0, "verify": 0}
+        self.rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def hash(self, password: str) -> str:
+        """
+        Calcula el hash de una contraseña fuera del bucle de eventos.
+
+        Raises:
+            PasswordQueueFull: Si hay demasiadas operaciones pendientes
+        """
+        return await self._submit("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verifica una contraseña fuera del bucle de eventos.
+
+        Raises:
+            PasswordQueueFull: Si hay demasiadas operaciones pendientes
+        """
+        return await self._submit("verify", verify_password, plain_password, hashed_password)
+
+    async def _submit(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordQueueFull(f"Demasiadas operaciones de contraseña en curso ({self._in_flight})")
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            executor = self._executor
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                self._counts[operation] += 1
+                self._latencies[operation].append(elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve la configuración, la ocupación y las latencias del pool.
+
+        Returns:
+            dict: Operaciones en curso, rechazadas y, por tipo de operación,
+                número total y latencias recientes (media, p50, p95, máx.) en ms
+        """
+        with self._lock:
+            latencies = {operation: sorted(samples) for operation, samples in self._latencies.items()}
+            stats: Dict[str, Any] = {
+                "rounds": BCRYPT_ROUNDS,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(self._in_flight - self.workers, 0),
+                "rejected": self.rejected
+            }
+            counts = dict(self._counts)
+        for operation, samples in latencies.items():
+            stats[operation] = {"count": counts[operation], **_summarize_ms(samples)}
+        return stats
+
+    def shutdown(self):
+        """Detiene los hilos del pool; se vuelve a crear con la siguiente operación."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def _summarize_ms(samples) -> Dict[str, float]:
+    """Resume una lista ordenada de latencias en segundos como milisegundos."""
+    if not samples:
+        return {"avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    def at(q: float) -> float:
+        return round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 2)
+    return {
+        "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+        "p50_ms": at(0.5),
+        "p95_ms": at(0.95),
+        "max_ms": round(samples[-1] * 1000, 2)
+    }
+
+
+# Instancia compartida por la aplicación
+password_hasher = PasswordHasher(workers=PASSWORD_WORKERS, max_queue=PASSWORD_MAX_QUEUE)
@@ -0,0 +1,123 @@
+"""
+Módulo de caché de tokens JWT verificados.
+
+Un cliente reutiliza el mismo token en todas sus peticiones, pero `jwt.decode`
+vuelve a decodificarlo y a comprobar la firma HMAC cada vez. Esta caché guarda
+el payload de los tokens ya verificados, indexado por el SHA-256 del token (el
+token en claro nunca se guarda), y cada entrada caduca en el `exp` del propio
+token, de modo que un token caducado nunca se acepta desde la caché.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class VerifiedTokenCache:
+    """
+    Caché LRU acotada de payloads de tokens ya verificados.
+
+    Al superar `max_entries` se expulsa la entrada usada hace más tiempo. Los
+    tokens sin `exp` se guardan como mucho `max_ttl_seconds`, que también limita
+    cuánto tarda en dejar de aceptarse un token tras un cambio de clave si no
+    se vacía la caché con `flush`.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_ttl_seconds: float = 300):
+        """
+        Args:
+            max_entries (int): Número máximo de tokens guardados (0 desactiva la caché)
+            max_ttl_seconds (float): Tiempo máximo que una entrada es válida
+        """
+        self.max_entries = max(max_entries, 0)
+        self.max_ttl = max(max_ttl_seconds, 0)
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca el payload de un token ya verificado.
+
+        Args:
+            token (str): Token JWT recibido
+
+        Returns:
+            dict: Copia del payload, o None si no está o ha caducado
+        """
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(payload)
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        """
+        Guarda el payload de un token recién verificado.
+
+        Args:
+            token (str): Token JWT
+            payload (dict): Payload decodificado (su `exp` fija la caducidad)
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.max_ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        self._entries[key] = (dict(payload), expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def flush(self):
+        """Vacía la caché (por ejemplo, al rotar la clave de firma)."""
+        self._entries.clear()
+        self.flushes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve los contadores y el tamaño de la caché."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_ttl_seconds": self.max_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "flushes": self.flushes
+        }
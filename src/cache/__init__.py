@@ -0,0 +1,16 @@
+"""
+Paquete de caché de respuestas HTTP de la aplicación.
+
+Contiene la caché en memoria de las respuestas de los endpoints de lectura,
+invalidada por versiones de recurso y con validación condicional (ETag/304).
+"""
+
+from .response_cache import (
+    ResponseCache,
+    response_cache,
+    MOVIES_RESOURCE,
+    movie_resource,
+    movie_comments_resource
+)
+
+__all__ = ['ResponseCache', 'response_cache', 'MOVIES_RESOURCE', 'movie_resource', 'movie_comments_resource']
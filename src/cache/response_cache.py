@@ -0,0 +1,225 @@
+"""
+Caché de respuestas HTTP para los endpoints de lectura.
+
+El catálogo de películas cambia muy poco en comparación con las veces que se
+consulta. Esta caché guarda el cuerpo ya serializado de las respuestas de los
+endpoints de lectura, indexado por ruta y parámetros de consulta, junto con la
+versión de los recursos de los que depende (p. ej. `movies` o `movie:3:comments`).
+Las operaciones de escritura incrementan la versión de los recursos que
+modifican, y una entrada cuya versión ya no coincide se descarta.
+
+Cada respuesta lleva un ETag fuerte (hash del cuerpo) y `Cache-Control: no-cache`,
+así que los clientes revalidan con `If-None-Match` y reciben un 304 sin cuerpo
+si nada ha cambiado.
+
+Limitación con varios workers: la caché y las versiones de los recursos viven en
+la memoria de cada proceso. `create_movie`, `delete_movie` y `add_comment` solo
+incrementan la versión en el worker que atendió la escritura, así que los demás
+siguen sirviendo el cuerpo y el ETag anteriores (y respondiendo 304 a quien los
+revalida) hasta que la entrada caduca. Los ETag tampoco coinciden necesariamente
+entre workers. El TTL (RESPONSE_CACHE_TTL) es por tanto el retraso máximo con el
+que un cambio llega a todos los workers; con un único worker no hay retraso.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from utils import get_logger
+
+logger = get_logger("response_cache")
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+# Segundos que se sirve una entrada. Con varios workers es también el tiempo máximo
+# que otro worker puede seguir sirviendo una respuesta anterior a una escritura
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+# Nombres de los recursos de los que dependen las respuestas cacheadas
+MOVIES_RESOURCE = "movies"
+
+
+def movie_resource(movie_id: int) -> str:
+    """Recurso con los datos de una película."""
+    return f"movie:{movie_id}"
+
+
+def movie_comments_resource(movie_id: int) -> str:
+    """Recurso con los comentarios (y su sentimiento) de una película."""
+    return f"movie:{movie_id}:comments"
+
+
+# Cabeceras de la respuesta original que se guardan junto con el cuerpo
+_STORED_HEADERS = ("x-next-cursor",)
+
+
+class _Entry:
+    __slots__ = ("versions", "body", "etag", "headers", "expires_at")
+
+    def __init__(self, versions: Tuple[int, ...], body: bytes, etag: str, headers: Dict[str, str], expires_at: float):
+        self.versions = versions
+        self.body = body
+        self.etag = etag
+        self.headers = headers
+        self.expires_at = expires_at
+
+
+def make_etag(body: bytes) -> str:
+    """Devuelve un ETag fuerte calculado a partir del cuerpo de la respuesta."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comprueba si la cabecera `If-None-Match` incluye el ETag de la respuesta.
+
+    Args:
+        if_none_match (str, optional): Valor de la cabecera enviada por el cliente
+        etag (str): ETag actual de la respuesta
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """
+    Caché LRU de respuestas JSON invalidada por versiones de recurso.
+
+    Un recurso es una cadena arbitraria (`movies`, `movie:3`...). `bump` incrementa
+    su versión; las entradas guardan las versiones de sus recursos en el momento
+    de generarse y solo se sirven mientras sigan siendo las actuales.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 30):
+        """
+        Args:
+            max_entries (int): Número máximo de respuestas guardadas (0 desactiva la caché)
+            ttl_seconds (float): Tiempo máximo que se sirve una entrada (0 = sin caducidad)
+        """
+        self.max_entries = max(max_entries, 0)
+        self.ttl = max(ttl_seconds, 0)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, resource: str) -> int:
+        return self._versions.get(resource, 0)
+
+    def bump(self, *resources: str):
+        """
+        Invalida las respuestas que dependen de los recursos indicados.
+
+        Args:
+            *resources (str): Recursos modificados
+        """
+        for resource in resources:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+        self.invalidations += len(resources)
+        logger.debug("Respuestas invalidadas para: %s", resources)
+
+    def clear(self):
+        """Vacía la caché y reinicia las versiones."""
+        self._entries.clear()
+        self._versions.clear()
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        """Clave de una petición: ruta y parámetros de consulta en orden canónico."""
+        params = sorted(request.query_params.multi_items())
+        return request.url.path + "?" + "&".join(f"{name}={value}" for name, value in params)
+
+    async def serve(
+        self,
+        request: Request,
+        resources: Sequence[str],
+        produce: Callable[[Response], Awaitable[Any]]
+    ) -> Response:
+        """
+        Responde desde la caché o genera, guarda y devuelve la respuesta.
+
+        Args:
+            request (Request): Petición entrante (ruta, parámetros e If-None-Match)
+            resources (Sequence[str]): Recursos de los que depende la respuesta
+            produce (Callable): Genera el contenido; recibe una respuesta en la que
+                puede fijar cabeceras (p. ej. el cursor de paginación)
+
+        Returns:
+            Response: Respuesta JSON con ETag, o 304 si el cliente ya la tiene
+        """
+        key = self.key_for(request)
+        versions = tuple(self.version(resource) for resource in resources)
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is not None and (entry.versions != versions or (entry.expires_at and entry.expires_at <= time.time())):
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = await self._render(produce, versions)
+            if self.enabled:
+                self._store(key, entry)
+        return self._respond(request, entry)
+
+    async def _render(self, produce: Callable[[Response], Awaitable[Any]], versions: Tuple[int, ...]) -> _Entry:
+        scratch = Response()
+        content = await produce(scratch)
+        # Misma serialización que JSONResponse, para que el cuerpo no cambie al activar la caché
+        body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        headers = {name: scratch.headers[name] for name in _STORED_HEADERS if name in scratch.headers}
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        return _Entry(versions, body, make_etag(body), headers, expires_at)
+
+    def _store(self, key: str, entry: _Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _respond(self, request: Request, entry: _Entry) -> Response:
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve los contadores y el tamaño de la caché."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "resources": len(self._versions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Instancia compartida por la aplicación
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL)
@@ -10,8 +10,9 @@ Cada controlador tiene su propio router que se exporta desde este módulo.
 
 from .user_controller import UserController, UserCreate, UserResponse
 from .movie_controller import MovieController, MovieCreate
-from .comment_controller import CommentController, CommentCreate, CommentResponse
+from .comment_controller import CommentController, CommentCreate, CommentResponse, BulkCommentResult
 from .auth_controller import AuthController, LoginRequest
+from .stats_controller import StatsController
 
 # Para facilitar la importación en el archivo main.py
-__all__ = ['UserController', 'UserCreate', 'UserResponse', 'MovieController', 'MovieCreate', 'CommentController', 'AuthController', 'CommentCreate', 'CommentResponse','LoginRequest']
\ No newline at end of file
+__all__ = ['UserController', 'UserCreate', 'UserResponse', 'MovieController', 'MovieCreate', 'CommentController', 'AuthController', 'CommentCreate', 'CommentResponse', 'BulkCommentResult','LoginRequest', 'StatsController']
\ No newline at end of file
@@ -1,9 +1,10 @@
 from typing import Any
 from fastapi import HTTPException, status, Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import BaseModel
 from db import User, get_session
-from auth import verify_password, create_jwt_token
+from auth import password_hasher, PasswordQueueFull, create_jwt_token
 from utils import get_logger
 
 logger = get_logger("auth_controller")
@@ -16,14 +17,27 @@ class AuthController:
     @staticmethod
     async def login(
         login_data: LoginRequest, 
-        db: Session = Depends(get_session)
+        db: AsyncSession = Depends(get_session)
     ) -> dict[str, Any]:
         """
         Endpoint de autenticación que valida las credenciales y devuelve un token JWT.
         """
-        user = db.exec(select(User).where(User.username == login_data.username)).first()
+        user = (await db.exec(select(User).where(User.username == login_data.username))).first()
         
-        if not user or not verify_password(login_data.password, user.password):
+        valid = False
+        if user:
+            try:
+                # bcrypt se ejecuta en su propio pool; si está saturado se rechaza sin esperar
+                valid = await password_hasher.verify(login_data.password, user.password)
+            except PasswordQueueFull:
+                logger.warning(f"Login rechazado por saturación del pool de contraseñas: {login_data.username}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many login attempts in progress. Please retry later.",
+                    headers={"Retry-After": "1"}
+                )
+        
+        if not valid:
             logger.warning(f"Intento de inicio de sesión fallido para el usuario: {login_data.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,10 +48,10 @@ class AuthController:
             "sub": str(user.id),
             "username": user.username
         }
-        logger.debug(f"Token data: {token_data}")
+        logger.debug("Token data: %s", token_data)
         token = create_jwt_token(token_data)
 
-        logger.debug(f"Usuario {user.id} autenticado correctamente")
+        logger.debug("Usuario %s autenticado correctamente", user.id)
         
         return {
             "access_token": token,
@@ -1,14 +1,34 @@
-from typing import Any, List, Optional
-from fastapi import HTTPException, Depends
-from sqlmodel import Session, select
-from pydantic import BaseModel
+import asyncio
+import os
+import zlib
+from typing import Any, AsyncIterator, List, Optional, Set, Tuple
+from fastapi import HTTPException, Depends, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from pydantic import BaseModel, ValidationError
 from db import Comment, User, Movie, get_session
+from db.bulk import chunked
+from db.sentiment_counts import apply_sentiment_deltas, count_comment, sentiment_deltas
 from auth import authenticator
-from utils import get_logger
-from ia import SentimentModel
+from cache import response_cache, movie_comments_resource
+from utils import get_logger, BULK_COMMENT_RECORDS
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, paginate
+from ia import SentimentModel, sentiment_worker, SENTIMENT_MODE, PENDING_SENTIMENT
 
 logger = get_logger("comment_controller")
 
+# Carga masiva (POST /comments/bulk): registros por transacción, textos por
+# petición al servicio de inferencia (como mucho INFERENCE_MAX_BATCH_REQUEST),
+# errores que se detallan en la respuesta, tamaño máximo de una línea y del
+# cuerpo ya descomprimido
+BULK_COMMENTS_CHUNK_SIZE = int(os.getenv("BULK_COMMENTS_CHUNK_SIZE", "1000"))
+BULK_SENTIMENT_BATCH_SIZE = int(os.getenv("BULK_SENTIMENT_BATCH_SIZE", "256"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(1024 * 1024)))
+BULK_MAX_BODY_BYTES = int(os.getenv("BULK_MAX_BODY_BYTES", str(512 * 1024 * 1024)))
+# Bytes descomprimidos que se generan como mucho a partir de cada trozo leído
+DECOMPRESS_CHUNK_BYTES = 64 * 1024
+
 # Pydantic models for API requests and responses
 class CommentCreate(BaseModel):
     user_id: int
@@ -22,45 +42,193 @@ class CommentResponse(BaseModel):
     text: str
     sentiment: str
 
+class BulkCommentRecord(BaseModel):
+    movie_id: int
+    user_id: int
+    text: str
+
+class BulkCommentError(BaseModel):
+    line: int
+    error: str
+
+class BulkCommentResult(BaseModel):
+    received: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    errors: List[BulkCommentError] = []
+    errors_truncated: bool = False
+
+    def reject(self, line: int, error: str):
+        """Anota un registro rechazado; solo se detallan los primeros BULK_MAX_ERRORS."""
+        self.rejected += 1
+        if len(self.errors) < BULK_MAX_ERRORS:
+            self.errors.append(BulkCommentError(line=line, error=error))
+        else:
+            self.errors_truncated = True
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = BULK_MAX_LINE_BYTES
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Parte en líneas un cuerpo NDJSON que llega por trozos, sin cargarlo entero.
+
+    Las líneas vacías se saltan (pero cuentan para la numeración). Una línea más
+    larga que `max_line_bytes` se descarta sin guardarla en memoria y se entrega
+    como None para que se informe del error.
+
+    Args:
+        chunks (AsyncIterator[bytes]): Trozos del cuerpo de la petición
+        max_line_bytes (int): Tamaño máximo de una línea
+
+    Yields:
+        tuple: Número de línea (desde 1) y su contenido, o None si era demasiado larga
+    """
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, None
+            else:
+                buffer += chunk[start:end]
+                if len(buffer) > max_line_bytes:
+                    yield line_number, None
+                elif buffer.strip():
+                    yield line_number, bytes(buffer)
+            buffer.clear()
+            start = end + 1
+    if oversized or buffer.strip():
+        line_number += 1
+        yield line_number, None if oversized else bytes(buffer)
+
+async def decode_body(chunks: AsyncIterator[bytes], encoding: Optional[str]) -> AsyncIterator[bytes]:
+    """
+    Descomprime por trozos un cuerpo enviado con `Content-Encoding: gzip`.
+
+    Cada trozo se descomprime en bloques de como mucho DECOMPRESS_CHUNK_BYTES, de
+    modo que un gzip muy comprimido (una "bomba") no se expande entero en memoria,
+    y la carga se corta en cuanto el cuerpo descomprimido supera BULK_MAX_BODY_BYTES.
+
+    Raises:
+        HTTPException: Si la codificación no está soportada (415), el gzip no es
+            válido (400) o el cuerpo es demasiado grande (413)
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    total = 0
+
+    def counted(data: bytes) -> bytes:
+        nonlocal total
+        total += len(data)
+        if total > BULK_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail=f"Body larger than {BULK_MAX_BODY_BYTES} bytes")
+        return data
+
+    if encoding == "identity":
+        async for chunk in chunks:
+            yield counted(chunk)
+        return
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        async for chunk in chunks:
+            data = decompressor.decompress(chunk, DECOMPRESS_CHUNK_BYTES)
+            yield counted(data)
+            while decompressor.unconsumed_tail:
+                data = decompressor.decompress(decompressor.unconsumed_tail, DECOMPRESS_CHUNK_BYTES)
+                yield counted(data)
+        yield counted(decompressor.flush())
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+
+def _validation_message(error: ValidationError) -> str:
+    """Resume el primer error de validación de un registro ('campo: mensaje')."""
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
 class CommentController:
     @staticmethod
-    def get_comments_by_movie(id: int, db: Session = Depends(get_session)) -> List[CommentResponse]:
+    async def get_comments_by_movie(
+        id: int,
+        db: AsyncSession = Depends(get_session),
+        response: Optional[Response] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> List[CommentResponse]:
         """
-        Devuelve una lista con todos los comentarios de la película con el id especificado.
+        Devuelve una página de los comentarios de la película con el id especificado.
+        
+        La película, sus comentarios y los autores se obtienen con una única consulta
+        (outer join) que solo selecciona las columnas de CommentResponse.
+        Los comentarios se recorren por id a partir del cursor (paginación keyset).
         """
-        movie = db.get(Movie, id)
-        if not movie:
+        after_id = decode_cursor(cursor)
+        rows = (await db.exec(
+            select(
+                Movie.title,
+                Comment.id,
+                Comment.movie_id,
+                Comment.user_id,
+                User.username,
+                Comment.text,
+                Comment.sentiment
+            )
+            .select_from(Movie)
+            # El filtro del cursor va en el ON para que la película siga apareciendo sin más comentarios
+            .outerjoin(Comment, (Comment.movie_id == Movie.id) & (Comment.id > after_id))
+            .outerjoin(User, User.id == Comment.user_id)
+            .where(Movie.id == id)
+            .order_by(Comment.id)
+            .limit(limit + 1)
+        )).all()
+        if not rows:
             raise HTTPException(status_code=404, detail="Movie not found")
         
-        comments = db.exec(select(Comment).where(Comment.movie_id == id)).all()
-        
-        results = []
-        for c in comments:
-            user = db.get(User, c.user_id)
-            results.append(CommentResponse(
+        # Una película sin comentarios devuelve una única fila con las columnas del comentario a NULL
+        comments = paginate([row for row in rows if row.id is not None], limit, lambda c: c.id, response)
+        return [
+            CommentResponse(
                 movie_id=c.movie_id,
-                title=movie.title,
+                title=c.title,
                 user_id=c.user_id,
-                username=user.username if user else None,
+                username=c.username,
                 text=c.text,
                 sentiment=c.sentiment
-            ))
-        return results
+            )
+            for c in comments
+        ]
 
     @staticmethod
     async def add_comment(
         id: int, 
         comment: CommentCreate, 
-        db: Session = Depends(get_session),
-        auth: dict = Depends(authenticator)
+        db: AsyncSession = Depends(get_session),
+        auth: dict = Depends(authenticator),
+        response: Optional[Response] = None
     ) -> CommentResponse:
         """
         Añade un nuevo comentario a la película con el id especificado.
         
         Requiere autenticación mediante token JWT.
         El campo sentiment se rellenará automáticamente usando el modelo de análisis de sentimiento.
+        En modo asíncrono (SENTIMENT_MODE=async) el comentario se guarda como 'pending',
+        se responde con 202 y el sentimiento se calcula en segundo plano.
         """
-        movie = db.get(Movie, id)
+        movie = await db.get(Movie, id)
         if not movie:
             raise HTTPException(status_code=404, detail="Movie not found")
         
@@ -70,22 +238,35 @@ class CommentController:
         # Get user_id from the request body (CommentCreate model)
         user_id = comment.user_id
         
-        user = db.get(User, user_id)
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        logger.debug(f"Usuario {user.username} añadiendo comentario a película {movie.title}")
+        logger.debug("Usuario %s añadiendo comentario a película %s", user.username, movie.title)
         
-        sentiment = SentimentModel.analyze_sentiment(comment.text)
+        background = SENTIMENT_MODE == "async"
+        if background:
+            sentiment = PENDING_SENTIMENT
+        else:
+            sentiment = await SentimentModel.analyze_sentiment(comment.text)
         new_comment = Comment(
             movie_id=movie_id, 
             user_id=user_id, 
             text=comment.text, 
-            sentiment=sentiment
+            sentiment=str(sentiment),
+            sentiment_source=getattr(sentiment, "decision", None)
         )
         db.add(new_comment)
-        db.commit()
-        db.refresh(new_comment)
+        # El contador de sentimiento de la película se actualiza en la misma transacción
+        await count_comment(db, movie_id, sentiment)
+        await db.commit()
+        await db.refresh(new_comment)
+        response_cache.bump(movie_comments_resource(movie_id))
+        
+        if background:
+            sentiment_worker.enqueue(new_comment.id, new_comment.text)
+            if response is not None:
+                response.status_code = status.HTTP_202_ACCEPTED
         
         return CommentResponse(
             movie_id=new_comment.movie_id,
@@ -94,4 +275,112 @@ class CommentController:
             username=user.username,
             text=new_comment.text,
             sentiment=new_comment.sentiment
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    async def bulk_add_comments(chunks: AsyncIterator[bytes], db: AsyncSession) -> BulkCommentResult:
+        """
+        Añade los comentarios de un cuerpo NDJSON con un registro
+        `{"movie_id", "user_id", "text"}` por línea.
+
+        Los registros se procesan por bloques de BULK_COMMENTS_CHUNK_SIZE y cada
+        bloque cuesta unas pocas sentencias en lugar de varias por comentario:
+        - Las películas y los usuarios se comprueban con una consulta IN por
+          tabla; los ids ya vistos en bloques anteriores no se vuelven a consultar.
+        - El sentimiento se calcula con SentimentModel.analyze_sentiments en lotes
+          de BULK_SENTIMENT_BATCH_SIZE textos, enviados en paralelo.
+        - Los comentarios se insertan con un único INSERT de varias filas y los
+          contadores de sentimiento se actualizan en la misma transacción, que se
+          confirma al terminar el bloque.
+
+        Los registros inválidos no detienen la carga: se cuentan en `rejected` y
+        se detallan (los primeros BULK_MAX_ERRORS) con su número de línea. Los
+        bloques ya confirmados se mantienen aunque la carga se interrumpa.
+        El sentimiento se calcula siempre durante la carga, también con
+        SENTIMENT_MODE=async.
+
+        Args:
+            chunks (AsyncIterator[bytes]): Cuerpo de la petición, por trozos
+            db (AsyncSession): Sesión de base de datos
+
+        Returns:
+            BulkCommentResult: Registros recibidos, insertados y rechazados
+        """
+        result = BulkCommentResult()
+        known_movies: Set[int] = set()
+        known_users: Set[int] = set()
+        pending: List[Tuple[int, BulkCommentRecord]] = []
+
+        async for line_number, line in iter_ndjson_lines(chunks, BULK_MAX_LINE_BYTES):
+            result.received += 1
+            if line is None:
+                result.reject(line_number, f"Line longer than {BULK_MAX_LINE_BYTES} bytes")
+                continue
+            try:
+                pending.append((line_number, BulkCommentRecord.model_validate_json(line)))
+            except ValidationError as e:
+                result.reject(line_number, _validation_message(e))
+                continue
+            if len(pending) >= BULK_COMMENTS_CHUNK_SIZE:
+                await CommentController._insert_bulk_chunk(pending, db, known_movies, known_users, result)
+                pending = []
+        if pending:
+            await CommentController._insert_bulk_chunk(pending, db, known_movies, known_users, result)
+        # Los errores de claves ajenas se detectan al procesar cada bloque, después de los de formato
+        result.errors.sort(key=lambda error: error.line)
+
+        BULK_COMMENT_RECORDS.labels("inserted").inc(result.inserted)
+        BULK_COMMENT_RECORDS.labels("rejected").inc(result.rejected)
+        logger.info(
+            "Carga masiva de comentarios: %s recibidos, %s insertados, %s rechazados",
+            result.received, result.inserted, result.rejected
+        )
+        return result
+
+    @staticmethod
+    async def _insert_bulk_chunk(
+        records: List[Tuple[int, BulkCommentRecord]],
+        db: AsyncSession,
+        known_movies: Set[int],
+        known_users: Set[int],
+        result: BulkCommentResult
+    ):
+        """Valida, etiqueta e inserta un bloque de la carga masiva en una transacción."""
+        for model, known, ids in (
+            (Movie, known_movies, {record.movie_id for _, record in records}),
+            (User, known_users, {record.user_id for _, record in records})
+        ):
+            missing = ids - known
+            if missing:
+                known.update((await db.exec(select(model.id).where(model.id.in_(missing)))).all())
+
+        valid = []
+        for line_number, record in records:
+            if record.movie_id not in known_movies:
+                result.reject(line_number, "Movie not found")
+            elif record.user_id not in known_users:
+                result.reject(line_number, "User not found")
+            else:
+                valid.append(record)
+        if not valid:
+            return
+
+        batches = list(chunked([record.text for record in valid], BULK_SENTIMENT_BATCH_SIZE))
+        labels = [
+            label
+            for batch_labels in await asyncio.gather(*(SentimentModel.analyze_sentiments(batch) for batch in batches))
+            for label in batch_labels
+        ]
+        rows = [
+            {
+                "movie_id": record.movie_id, "user_id": record.user_id, "text": record.text,
+                "sentiment": str(label), "sentiment_source": getattr(label, "decision", None)
+            }
+            for record, label in zip(valid, labels)
+        ]
+        connection = await db.connection()
+        await connection.execute(Comment.__table__.insert(), rows)
+        await apply_sentiment_deltas(db, sentiment_deltas((row["movie_id"], row["sentiment"], 1) for row in rows))
+        await db.commit()
+        result.inserted += len(rows)
+        response_cache.bump(*{movie_comments_resource(row["movie_id"]) for row in rows})
@@ -1,10 +1,15 @@
 from typing import Any, List, Optional, Dict
-from fastapi import HTTPException, Query, Depends
-from sqlmodel import Session, select
+from fastapi import HTTPException, Depends, Response
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import BaseModel
-from db import Movie, Comment, get_session
+from db import Movie, Comment, MovieSentiment, get_session
+from db.sentiment_counts import sentiment_summary
 from auth import authenticator
 from utils import get_logger
+from search import NGRAM_SIZE, title_index
+from cache import response_cache, MOVIES_RESOURCE, movie_resource, movie_comments_resource
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, paginate
 
 logger = get_logger("movie_controller")
 
@@ -18,37 +23,63 @@ class MovieCreate(BaseModel):
 
 class MovieController:
     @staticmethod
-    def list_movies(db: Session = Depends(get_session)) -> List[Dict[str, Any]]:
+    async def list_movies(
+        db: AsyncSession = Depends(get_session),
+        response: Optional[Response] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Devuelve una lista con todas las películas registradas en la base de datos.
+        Devuelve una página de las películas registradas en la base de datos.
+        
+        Las películas se recorren por id a partir del cursor (paginación keyset) y,
+        si quedan más, el cursor de la página siguiente se añade a la respuesta.
         """
-        logger.debug("Listando todas las películas")
-        movies = db.exec(select(Movie)).all()
-        # Convert Pydantic models to dictionaries
+        after_id = decode_cursor(cursor)
+        logger.debug("Listando películas con id > %s (limit=%s)", after_id, limit)
+        rows = (await db.exec(
+            select(Movie.id, Movie.title)
+            .where(Movie.id > after_id)
+            .order_by(Movie.id)
+            .limit(limit + 1)
+        )).all()
+        movies = paginate(rows, limit, lambda m: m.id, response)
         return [{"id": m.id, "title": m.title} for m in movies]
 
     @staticmethod
-    def search_movies(title: str = Query(...), db: Session = Depends(get_session)) -> List[Dict[str, Any]]:
+    async def search_movies(
+        title: str,
+        db: AsyncSession = Depends(get_session),
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         Busca películas por título.
         
-        Devuelve todas las películas que contengan la cadena a buscar en el título 
-        (en cualquier posición y sin distinción de mayúsculas y minúsculas).
+        Devuelve todas las películas (o las `limit` primeras) que contengan la cadena a
+        buscar en el título (en cualquier posición y sin distinción de mayúsculas y minúsculas).
+        Si el índice de trigramas está construido se usa para evitar recorrer la tabla
+        y los resultados se ordenan por relevancia; si no, o si la cadena es más corta
+        que un trigrama (el índice tendría que comprobar todos los títulos), se consulta
+        la base de datos.
         """
-        logger.debug(f"Buscando películas con título: {title}")
-        query = select(Movie).where(Movie.title.ilike(f"%{title}%"))
-        movies = db.exec(query).all()
-        logger.debug(f"Encontradas {len(movies)} películas con título que contiene: {title}")
-        # Convert Pydantic models to dictionaries
-        return [{"id": m.id, "title": m.title} for m in movies]
+        logger.debug("Buscando películas con título: %s (limit=%s)", title, limit)
+        if title_index.ready and len(title) >= NGRAM_SIZE:
+            movies = title_index.search(title, limit)
+        else:
+            query = select(Movie.id, Movie.title).where(Movie.title.ilike(f"%{title}%"))
+            if limit is not None:
+                query = query.limit(limit)
+            movies = (await db.exec(query)).all()
+        logger.debug("Encontradas %s películas con título que contiene: %s", len(movies), title)
+        return [{"id": movie_id, "title": movie_title} for movie_id, movie_title in movies]
         
     @staticmethod
-    def get_movie(id: int, db: Session = Depends(get_session)) -> Dict[str, Any]:
+    async def get_movie(id: int, db: AsyncSession = Depends(get_session)) -> Dict[str, Any]:
         """
         Devuelve los datos de la película con el id especificado.
         """
-        logger.debug(f"Consultando película con id: {id}")
-        movie = db.get(Movie, id)
+        logger.debug("Consultando película con id: %s", id)
+        movie = await db.get(Movie, id)
         if not movie:
             logger.warning(f"Película con id {id} no encontrada")
             raise HTTPException(status_code=404, detail="Movie not found")
@@ -61,17 +92,31 @@ class MovieController:
             "genre": movie.genre
         }
         
+    @staticmethod
+    async def get_movie_sentiment(id: int, db: AsyncSession = Depends(get_session)) -> Dict[str, Any]:
+        """
+        Devuelve el resumen de sentimiento de los comentarios de la película.
+        
+        Se lee de la tabla de contadores (una consulta por clave primaria), sin
+        recorrer los comentarios.
+        """
+        counts = await db.get(MovieSentiment, id)
+        if counts is None and not await db.get(Movie, id):
+            logger.warning(f"Película con id {id} no encontrada")
+            raise HTTPException(status_code=404, detail="Movie not found")
+        return sentiment_summary(id, counts)
+        
     @staticmethod
     async def create_movie(
         movie: MovieCreate, 
-        db: Session = Depends(get_session),
+        db: AsyncSession = Depends(get_session),
         auth: dict = Depends(authenticator)
     ) -> Dict[str, Any]:
         """
         Crea una nueva película en la base de datos.
         Requiere autenticación mediante token JWT.
         """
-        logger.debug(f"Creando nueva película: {movie.title}")
+        logger.debug("Creando nueva película: %s", movie.title)
         # Create a new Movie instance from the MovieCreate DTO
         movie_obj = Movie(
             title=movie.title,
@@ -80,8 +125,10 @@ class MovieController:
             genre=movie.genre
         )
         db.add(movie_obj)
-        db.commit()
-        db.refresh(movie_obj)
+        await db.commit()
+        await db.refresh(movie_obj)
+        title_index.add(movie_obj.id, movie_obj.title)
+        response_cache.bump(MOVIES_RESOURCE)
         
         # Return a dictionary instead of a Pydantic model
         return {
@@ -95,7 +142,7 @@ class MovieController:
     @staticmethod
     async def delete_movie(
         id: int, 
-        db: Session = Depends(get_session),
+        db: AsyncSession = Depends(get_session),
         auth: dict = Depends(authenticator)
     ) -> dict[str, str]:
         """
@@ -104,14 +151,15 @@ class MovieController:
         Requiere autenticación mediante token JWT.
         Si la película tiene comentarios asociados, también se eliminarán.
         """
-        logger.debug(f"Intentando eliminar película con id: {id}")
-        movie = db.get(Movie, id)
+        logger.debug("Intentando eliminar película con id: %s", id)
+        movie = await db.get(Movie, id)
         if not movie:
             raise HTTPException(status_code=404, detail="Movie not found")
-        # Se eliminan también los comentarios asociados
-        comments = db.exec(select(Comment).where(Comment.movie_id == id)).all()
-        for c in comments:
-            db.delete(c)
-        db.delete(movie)
-        db.commit()
+        # Se eliminan también los comentarios asociados y sus contadores
+        await db.exec(delete(Comment).where(Comment.movie_id == id))
+        await db.exec(delete(MovieSentiment).where(MovieSentiment.movie_id == id))
+        await db.delete(movie)
+        await db.commit()
+        title_index.remove(id)
+        response_cache.bump(MOVIES_RESOURCE, movie_resource(id), movie_comments_resource(id))
         return {"detail": "Movie deleted successfully"}
\ No newline at end of file
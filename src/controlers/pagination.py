@@ -0,0 +1,89 @@
+"""
+Utilidades de paginación por cursor (keyset).
+
+Los listados se recorren ordenados por clave primaria: cada página pide las filas
+con id mayor que el último id devuelto, en lugar de usar OFFSET, de modo que el
+coste de cada página no depende de su posición en la tabla. El cursor que recibe
+el cliente es opaco (base64 de un JSON con el último id) y se devuelve en la
+cabecera `X-Next-Cursor` para no alterar el cuerpo de las respuestas.
+"""
+
+import base64
+import binascii
+import json
+import os
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+
+# Tamaño de página por defecto y máximo permitido
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Cabecera en la que se devuelve el cursor de la página siguiente
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Codifica el último id de una página como cursor opaco.
+
+    Args:
+        last_id (int): Clave primaria de la última fila devuelta
+
+    Returns:
+        str: Cursor en base64 apto para URLs
+    """
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """
+    Decodifica un cursor recibido del cliente.
+
+    Args:
+        cursor (str, optional): Cursor devuelto en una página anterior
+
+    Returns:
+        int: Id a partir del cual (excluido) empieza la página; 0 si no hay cursor
+
+    Raises:
+        HTTPException: Si el cursor no es válido (400)
+    """
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = data["id"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or last_id < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def paginate(
+    rows: Sequence[Any],
+    limit: int,
+    last_id_of,
+    response: Optional[Response] = None
+) -> List[Any]:
+    """
+    Recorta una consulta que pidió `limit + 1` filas y publica el cursor siguiente.
+
+    La fila sobrante solo indica que existe otra página; no se devuelve.
+
+    Args:
+        rows (Sequence): Filas obtenidas con `limit + 1`
+        limit (int): Tamaño de página solicitado
+        last_id_of (Callable): Función que devuelve la clave primaria de una fila
+        response (Response, optional): Respuesta en la que se añade la cabecera del cursor
+
+    Returns:
+        List: Filas de la página actual
+    """
+    page = list(rows[:limit])
+    if len(rows) > limit and response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_id_of(page[-1]))
+    return page
@@ -0,0 +1,57 @@
+from typing import Any
+from ia import SentimentModel, sentiment_worker
+from auth import password_hasher, token_cache
+from cache import response_cache
+from utils import get_logger, sql_profiler
+
+logger = get_logger("stats_controller")
+
+class StatsController:
+    @staticmethod
+    def get_sentiment_stats() -> dict[str, Any]:
+        """
+        Devuelve el estado del análisis de sentimiento en segundo plano.
+        """
+        return sentiment_worker.stats()
+
+    @staticmethod
+    def get_password_stats() -> dict[str, Any]:
+        """
+        Devuelve la ocupación y las latencias del pool de bcrypt.
+        """
+        return password_hasher.stats()
+
+    @staticmethod
+    def get_token_cache_stats() -> dict[str, Any]:
+        """
+        Devuelve los contadores de la caché de tokens JWT verificados.
+        """
+        return token_cache.stats()
+
+    @staticmethod
+    def get_response_cache_stats() -> dict[str, Any]:
+        """
+        Devuelve los contadores de la caché de respuestas HTTP.
+        """
+        return response_cache.stats()
+
+    @staticmethod
+    def get_slow_requests(limit: int) -> dict[str, Any]:
+        """
+        Devuelve las peticiones recientes más lentas con sus estadísticas de SQL.
+        """
+        return sql_profiler.stats(limit)
+
+    @staticmethod
+    def get_inference_circuit_stats() -> dict[str, Any]:
+        """
+        Devuelve el estado del circuit breaker del servicio de inferencia.
+        """
+        return SentimentModel.client.breaker.stats()
+
+    @staticmethod
+    def get_local_classifier_stats() -> dict[str, Any]:
+        """
+        Devuelve el estado del clasificador local y las tasas de escalado y acuerdo.
+        """
+        return SentimentModel.local_stats()
@@ -1,9 +1,13 @@
-from typing import Any
-from fastapi import HTTPException
-from sqlmodel import Session, select
-from db import User, Comment
+from typing import Any, Optional
+from fastapi import HTTPException, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from db import User, Movie, Comment
 from pydantic import BaseModel
+from auth import PasswordQueueFull
 from utils import get_logger
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, paginate
 
 logger = get_logger("user_controller")
 
@@ -22,40 +26,64 @@ class UserCreate(BaseModel):
 
 class UserController:
     @staticmethod
-    def list_users(db: Session) -> list[dict[str, Any]]:
+    async def list_users(
+        db: AsyncSession,
+        response: Optional[Response] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> list[dict[str, Any]]:
         """
-        Devuelve una lista con todos los usuarios registrados en la base de datos.
+        Devuelve una página de los usuarios registrados en la base de datos.
+        
+        Los usuarios se recorren por id a partir del cursor (paginación keyset) y,
+        si quedan más, el cursor de la página siguiente se añade a la respuesta.
         """
-        logger.debug("Listando todos los usuarios")
-        users = db.exec(select(User)).all()
+        after_id = decode_cursor(cursor)
+        logger.debug("Listando usuarios con id > %s (limit=%s)", after_id, limit)
+        rows = (await db.exec(
+            select(User.id, User.username)
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .limit(limit + 1)
+        )).all()
+        users = paginate(rows, limit, lambda u: u.id, response)
         return [{"id": u.id, "username": u.username} for u in users]
 
     @staticmethod
-    def get_user(id: int, db: Session) -> User:
+    async def get_user(id: int, db: AsyncSession) -> User:
         """
         Devuelve los datos del usuario con el id especificado.
         """
-        logger.debug(f"Consultando usuario con id: {id}")
-        user = db.get(User, id)
+        logger.debug("Consultando usuario con id: %s", id)
+        user = await db.get(User, id)
         if not user:
             logger.warning(f"Usuario con id {id} no encontrado")
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
     @staticmethod
-    def create_user(user_data: UserCreate, db: Session, hash_password_func) -> User:
+    async def create_user(user_data: UserCreate, db: AsyncSession, hash_password_func) -> User:
         """
         Crea un nuevo usuario en la base de datos y devuelve los datos del usuario sin la contraseña.
         """
-        logger.debug(f"Intentando crear usuario: {user_data.username}")
-        existing_user = db.exec(select(User).where(User.username == user_data.username)).first()
+        logger.debug("Intentando crear usuario: %s", user_data.username)
+        existing_user = (await db.exec(select(User).where(User.username == user_data.username))).first()
         if existing_user:
             logger.warning(f"Intento de crear usuario con nombre ya existente: {user_data.username}")
             raise HTTPException(
                 status_code=409,
                 detail="Username already exists. Please choose another username."
             )
-        hashed_password = hash_password_func(user_data.password)
+        # bcrypt es costoso: se calcula en el pool de contraseñas, fuera del bucle de eventos
+        try:
+            hashed_password = await hash_password_func(user_data.password)
+        except PasswordQueueFull:
+            logger.warning(f"Alta de usuario rechazada por saturación del pool de contraseñas: {user_data.username}")
+            raise HTTPException(
+                status_code=503,
+                detail="Too many password operations in progress. Please retry later.",
+                headers={"Retry-After": "1"}
+            )
         
         new_user = User(
             username=user_data.username,
@@ -64,32 +92,70 @@ class UserController:
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        logger.debug(f"Usuario creado correctamente: {new_user.username} (ID: {new_user.id})")
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Otra petición ha creado el mismo username entre la comprobación y el commit
+            await db.rollback()
+            logger.warning(f"Intento de crear usuario con nombre ya existente: {user_data.username}")
+            raise HTTPException(
+                status_code=409,
+                detail="Username already exists. Please choose another username."
+            )
+        await db.refresh(new_user)
+        logger.debug("Usuario creado correctamente: %s (ID: %s)", new_user.username, new_user.id)
         
         return new_user
 
     @staticmethod
-    def get_comments_by_user(id: int, db: Session) -> list[dict[str, Any]]:
+    async def get_comments_by_user(
+        id: int,
+        db: AsyncSession,
+        response: Optional[Response] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> list[dict[str, Any]]:
         """
-        Devuelve una lista con todos los comentarios del usuario con el id especificado.
+        Devuelve una página de los comentarios del usuario con el id especificado.
+        
+        El usuario, sus comentarios y los títulos de las películas se obtienen con una
+        única consulta (outer join) que solo selecciona las columnas necesarias.
+        Los comentarios se recorren por id a partir del cursor (paginación keyset).
         """
-        user = db.get(User, id)
-        if not user:
+        after_id = decode_cursor(cursor)
+        rows = (await db.exec(
+            select(
+                User.username,
+                Comment.id,
+                Comment.movie_id,
+                Movie.title,
+                Comment.user_id,
+                Comment.text,
+                Comment.sentiment
+            )
+            .select_from(User)
+            # El filtro del cursor va en el ON para que el usuario siga apareciendo sin más comentarios
+            .outerjoin(Comment, (Comment.user_id == User.id) & (Comment.id > after_id))
+            .outerjoin(Movie, Movie.id == Comment.movie_id)
+            .where(User.id == id)
+            .order_by(Comment.id)
+            .limit(limit + 1)
+        )).all()
+        if not rows:
             raise HTTPException(status_code=404, detail="User not found")
-        from db.models import Movie
-        comments = db.exec(select(Comment).where(Comment.user_id == id)).all()
-        results = []
-        for c in comments:
-            movie = db.get(Movie, c.movie_id)
-            results.append({
+        
+        # Un usuario sin comentarios devuelve una única fila con las columnas del comentario a NULL
+        comments = paginate([row for row in rows if row.id is not None], limit, lambda c: c.id, response)
+        results = [
+            {
                 "movie_id": c.movie_id,
-                "title": movie.title if movie else None,
+                "title": c.title,
                 "user_id": c.user_id,
-                "username": user.username,
+                "username": c.username,
                 "text": c.text,
                 "sentiment": c.sentiment
-            })
-        logger.debug(f"Comentarios del usuario {user.username} (ID: {user.id}) cargados correctamente")
+            }
+            for c in comments
+        ]
+        logger.debug("Comentarios del usuario %s (ID: %s) cargados correctamente", rows[0].username, id)
         return results
\ No newline at end of file
@@ -1,9 +1,10 @@
 from .db import (
     engine, 
     create_db_and_tables, 
+    run_migrations,
     drop_db_and_tables, 
     get_session, 
     get_session_context,
     seed_default_data
 )
-from .models import User, Movie, Comment
\ No newline at end of file
+from .models import User, Movie, Comment, MovieSentiment
\ No newline at end of file
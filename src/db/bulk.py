@@ -0,0 +1,308 @@
+"""
+Carga masiva de datos en la base de datos.
+
+Cargar fila a fila con el ORM (`add_all` + `commit` + `refresh` por objeto) hace
+una ida y vuelta a la base de datos por fila y mantiene todos los objetos en
+memoria. Aquí las filas se insertan por bloques con `executemany` de SQLAlchemy
+Core (el driver de MySQL lo convierte en un único INSERT de varias filas), los ficheros JSON se leen elemento a elemento sin
+cargarlos completos y el hash bcrypt de las contraseñas, que es deliberadamente
+lento, se reparte entre varios procesos.
+
+Las funciones reciben una `Connection` síncrona, igual que las migraciones, y se
+ejecutan desde el motor asíncrono con `conn.run_sync`.
+"""
+
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from sqlalchemy import Table, func, select
+from sqlalchemy.engine import Connection
+from utils import get_logger
+from .models import User, Movie, Comment
+from .sentiment_counts import recompute_sentiment_counts
+
+logger = get_logger("bulk")
+
+# Filas por bloque de inserción
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+# Procesos para el hash de contraseñas (0 = uno por CPU)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "0"))
+# Por debajo de este número de contraseñas no compensa arrancar procesos
+_MIN_PARALLEL_HASHES = 8
+# Tamaño de lectura al recorrer los ficheros JSON
+_READ_SIZE = 64 * 1024
+
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Agrupa un iterable en listas de como mucho `size` elementos.
+
+    Args:
+        items (Iterable): Elementos a agrupar
+        size (int): Tamaño máximo de cada bloque
+    """
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_json_array(path: str) -> Iterator[Any]:
+    """
+    Recorre los elementos de un fichero con un array JSON sin cargarlo entero.
+
+    Args:
+        path (str): Ruta del fichero
+
+    Yields:
+        Any: Cada elemento del array, ya decodificado
+
+    Raises:
+        ValueError: Si el fichero no contiene un array JSON
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(_READ_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} no contiene un array JSON")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                # Elemento incompleto: se lee otro bloque y se reintenta
+                if eof:
+                    raise ValueError(f"{path} no contiene un array JSON válido")
+                chunk = f.read(_READ_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def hash_passwords(passwords: Sequence[str], workers: int = HASH_WORKERS) -> List[str]:
+    """
+    Calcula el hash bcrypt de varias contraseñas en paralelo.
+
+    Cada hash lleva su propia sal, así que no se reutilizan resultados entre
+    contraseñas iguales; el coste se reparte entre un pool de procesos.
+
+    Args:
+        passwords (Sequence[str]): Contraseñas en claro
+        workers (int): Número de procesos (0 = uno por CPU)
+
+    Returns:
+        List[str]: Hashes en el mismo orden que las contraseñas
+    """
+    from auth.password import hash_password
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < _MIN_PARALLEL_HASHES:
+        return [hash_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=min(workers, len(passwords))) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(hash_password, passwords, chunksize=chunksize))
+
+
+def bulk_insert(
+    conn: Connection,
+    table: Table,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = BULK_BATCH_SIZE,
+    commit_every: int = 0,
+    progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Inserta filas por bloques con una sentencia `executemany` por bloque.
+
+    Con `commit_every` la transacción se confirma cada cierto número de filas,
+    para cargas de millones de filas en las que una única transacción haría
+    crecer sin límite el log de la base de datos.
+
+    Args:
+        conn (Connection): Conexión a la base de datos
+        table (Table): Tabla destino
+        rows (Iterable[dict]): Filas a insertar; se consumen por bloques
+        batch_size (int): Filas por bloque
+        commit_every (int): Filas entre commits (0 = no confirmar aquí)
+        progress (Callable, optional): Se llama con el total insertado tras cada commit
+
+    Returns:
+        int: Número de filas insertadas
+    """
+    total = 0
+    pending = 0
+    for batch in chunked(rows, batch_size):
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+        pending += len(batch)
+        if commit_every and pending >= commit_every:
+            conn.commit()
+            pending = 0
+            if progress:
+                progress(total)
+    if commit_every:
+        conn.commit()
+        if progress:
+            progress(total)
+    return total
+
+
+def max_id(conn: Connection, table: Table) -> int:
+    """Devuelve el mayor id de una tabla (0 si está vacía)."""
+    return conn.execute(select(func.max(table.c.id))).scalar() or 0
+
+
+def ids_after(conn: Connection, table: Table, after_id: int) -> List[int]:
+    """Devuelve los ids de una tabla mayores que `after_id`, es decir, los recién insertados."""
+    return list(conn.execute(
+        select(table.c.id).where(table.c.id > after_id).order_by(table.c.id)
+    ).scalars())
+
+
+def load_users(conn: Connection, path: str, batch_size: int = BULK_BATCH_SIZE) -> List[int]:
+    """
+    Carga usuarios desde un fichero JSON con hash de contraseñas en paralelo.
+
+    Args:
+        conn (Connection): Conexión (dentro de una transacción)
+        path (str): Fichero con un array de objetos username/email/password
+        batch_size (int): Usuarios por bloque
+
+    Returns:
+        List[int]: Ids de los usuarios creados
+    """
+    table = User.__table__
+    before = max_id(conn, table)
+    total = 0
+    # Los bloques de hash son mayores que los de inserción para aprovechar el pool
+    for users in chunked(iter_json_array(path), batch_size * 10):
+        hashes = hash_passwords([user["password"] for user in users])
+        total += bulk_insert(conn, table, (
+            {"username": user["username"], "email": user["email"], "password": hashed}
+            for user, hashed in zip(users, hashes)
+        ), batch_size)
+    logger.debug(f"Creados {total} usuarios desde {path}")
+    return ids_after(conn, table, before)
+
+
+def load_movies(conn: Connection, path: str, batch_size: int = BULK_BATCH_SIZE) -> List[int]:
+    """
+    Carga películas desde un fichero JSON.
+
+    Args:
+        conn (Connection): Conexión (dentro de una transacción)
+        path (str): Fichero con un array de objetos title/director/year/genre
+        batch_size (int): Películas por bloque
+
+    Returns:
+        List[int]: Ids de las películas creadas
+    """
+    table = Movie.__table__
+    before = max_id(conn, table)
+    total = bulk_insert(conn, table, (
+        {"title": m["title"], "director": m["director"], "year": m["year"], "genre": m["genre"]}
+        for m in iter_json_array(path)
+    ), batch_size)
+    logger.debug(f"Creadas {total} películas desde {path}")
+    return ids_after(conn, table, before)
+
+
+def load_comment_templates(path: str) -> Dict[str, List[str]]:
+    """
+    Lee las plantillas de comentarios agrupadas por sentimiento.
+
+    Raises:
+        ValueError: Si falta alguno de los sentimientos
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        templates = json.load(f)
+    if not all(templates.get(sentiment) for sentiment in SENTIMENTS):
+        raise ValueError(f"Formato incorrecto en el archivo de comentarios {path}")
+    return {sentiment: list(templates[sentiment]) for sentiment in SENTIMENTS}
+
+
+def random_comments(
+    movie_ids: Sequence[int],
+    user_ids: Sequence[int],
+    templates: Dict[str, List[str]],
+    extra: int,
+    rng: Optional[random.Random] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Genera un comentario por película más `extra` comentarios aleatorios.
+
+    Args:
+        movie_ids (Sequence[int]): Películas a comentar
+        user_ids (Sequence[int]): Autores posibles
+        templates (dict): Plantillas por sentimiento
+        extra (int): Comentarios adicionales sobre películas al azar
+        rng (random.Random, optional): Generador aleatorio (para datos reproducibles)
+
+    Yields:
+        dict: Filas de la tabla comment
+    """
+    rng = rng or random.Random()
+
+    def comment(movie_id: int) -> Dict[str, Any]:
+        sentiment = rng.choice(SENTIMENTS)
+        return {
+            "movie_id": movie_id,
+            "user_id": rng.choice(user_ids),
+            "text": rng.choice(templates[sentiment]),
+            "sentiment": sentiment
+        }
+
+    for movie_id in movie_ids:
+        yield comment(movie_id)
+    for _ in range(extra):
+        yield comment(rng.choice(movie_ids))
+
+
+def seed_from_files(
+    conn: Connection,
+    users_path: str,
+    movies_path: str,
+    comments_path: str,
+    extra_comments: int = 75,
+    batch_size: int = BULK_BATCH_SIZE
+) -> Dict[str, int]:
+    """
+    Carga usuarios, películas y comentarios generados a partir de los ficheros JSON.
+
+    Args:
+        conn (Connection): Conexión (dentro de una transacción)
+        users_path (str): Fichero de usuarios
+        movies_path (str): Fichero de películas
+        comments_path (str): Fichero de plantillas de comentarios
+        extra_comments (int): Comentarios además del obligatorio por película
+        batch_size (int): Filas por bloque
+
+    Returns:
+        dict: Número de filas creadas por tabla
+    """
+    user_ids = load_users(conn, users_path, batch_size)
+    movie_ids = load_movies(conn, movies_path, batch_size)
+    comments = 0
+    if user_ids and movie_ids:
+        templates = load_comment_templates(comments_path)
+        comments = bulk_insert(
+            conn, Comment.__table__,
+            random_comments(movie_ids, user_ids, templates, extra_comments),
+            batch_size
+        )
+        logger.debug(f"Generados {comments} comentarios aleatorios")
+        recompute_sentiment_counts(conn, movie_ids)
+    return {"users": len(user_ids), "movies": len(movie_ids), "comments": comments}
@@ -0,0 +1,174 @@
+"""
+Sistema de migraciones versionadas del esquema.
+
+`SQLModel.metadata.create_all` crea las tablas que faltan pero nunca modifica las
+existentes, así que los cambios de esquema sobre bases de datos ya desplegadas se
+aplican aquí. Cada migración tiene un número de versión y se ejecuta una sola vez;
+las versiones aplicadas se registran en la tabla `schema_version`.
+
+Para añadir una migración basta con escribir una función que reciba la conexión
+y añadirla al final de `MIGRATIONS` con el siguiente número de versión. Las
+migraciones deben ser idempotentes, porque en una base de datos nueva
+`create_all` ya habrá creado el esquema actual.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Sequence
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, inspect, select, func
+)
+from sqlalchemy.engine import Connection
+from utils import get_logger
+from .models import User, Movie, Comment, MovieSentiment
+from .sentiment_counts import recompute_sentiment_counts
+
+logger = get_logger("migrations")
+
+# Tabla con las versiones de esquema ya aplicadas
+schema_version_table = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def create_index_if_missing(
+    conn: Connection,
+    table: Table,
+    name: str,
+    columns: Sequence[str],
+    unique: bool = False
+) -> bool:
+    """
+    Crea un índice si la tabla todavía no tiene uno con ese nombre.
+
+    Args:
+        conn (Connection): Conexión sobre la que se ejecuta la migración
+        table (Table): Tabla a indexar
+        name (str): Nombre del índice
+        columns (Sequence[str]): Columnas del índice
+        unique (bool): Si el índice debe ser único
+
+    Returns:
+        bool: True si se ha creado el índice
+    """
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    if name in existing:
+        return False
+    # El índice se define sobre una copia de la tabla para no añadirlo a los metadatos del modelo
+    detached = Table(table.name, MetaData(), *(Column(column, table.c[column].type) for column in columns))
+    Index(name, *(detached.c[column] for column in columns), unique=unique).create(conn)
+    logger.info(f"Creado índice {name} en {table.name}({', '.join(columns)})")
+    return True
+
+
+def add_column_if_missing(conn: Connection, table: Table, name: str) -> bool:
+    """
+    Añade a una tabla existente una columna del modelo si todavía no la tiene.
+
+    Args:
+        conn (Connection): Conexión sobre la que se ejecuta la migración
+        table (Table): Tabla del modelo que define la columna
+        name (str): Nombre de la columna
+
+    Returns:
+        bool: True si se ha añadido la columna
+    """
+    if name in {column["name"] for column in inspect(conn).get_columns(table.name)}:
+        return False
+    column = table.c[name]
+    preparer = conn.dialect.identifier_preparer
+    conn.exec_driver_sql(
+        f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+        f"{column.type.compile(dialect=conn.dialect)}"
+    )
+    logger.info(f"Añadida columna {name} a {table.name}")
+    return True
+
+
+def _add_lookup_indexes(conn: Connection):
+    """Índices de las consultas frecuentes y unicidad del nombre de usuario."""
+    user = User.__table__
+    duplicated = conn.execute(
+        select(user.c.username).group_by(user.c.username).having(func.count() > 1).limit(5)
+    ).scalars().all()
+    if duplicated:
+        raise RuntimeError(
+            f"No se puede crear el índice único de username: hay nombres repetidos ({', '.join(duplicated)})"
+        )
+    create_index_if_missing(conn, user, "ix_user_username", ["username"], unique=True)
+    create_index_if_missing(conn, Movie.__table__, "ix_movie_title", ["title"])
+    create_index_if_missing(conn, Comment.__table__, "ix_comment_movie_id", ["movie_id"])
+    create_index_if_missing(conn, Comment.__table__, "ix_comment_user_id", ["user_id"])
+
+
+def _add_movie_sentiment_counts(conn: Connection):
+    """Tabla de contadores de sentimiento por película, calculada con los comentarios existentes."""
+    MovieSentiment.__table__.create(conn, checkfirst=True)
+    recompute_sentiment_counts(conn)
+
+
+def _add_comment_sentiment_source(conn: Connection):
+    """Origen de la etiqueta de sentimiento; los comentarios existentes quedan con origen desconocido."""
+    add_column_if_missing(conn, Comment.__table__, "sentiment_source")
+
+
+# Migraciones en orden de versión; no se deben modificar una vez publicadas
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Índices de búsqueda y username único", _add_lookup_indexes),
+    Migration(2, "Contadores de sentimiento por película", _add_movie_sentiment_counts),
+    Migration(3, "Origen de la etiqueta de sentimiento de los comentarios", _add_comment_sentiment_source),
+]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """
+    Devuelve la última versión de esquema aplicada (0 si no hay ninguna).
+
+    Args:
+        conn (Connection): Conexión a la base de datos
+    """
+    schema_version_table.create(conn, checkfirst=True)
+    version = conn.execute(select(func.max(schema_version_table.c.version))).scalar()
+    return version or 0
+
+
+def apply_migrations(conn: Connection, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Aplica en orden las migraciones con versión superior a la actual.
+
+    Args:
+        conn (Connection): Conexión (dentro de una transacción) a la base de datos
+        migrations (Sequence[Migration]): Migraciones disponibles
+
+    Returns:
+        List[int]: Versiones aplicadas en esta ejecución
+    """
+    current = get_schema_version(conn)
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= current:
+            continue
+        logger.info(f"Aplicando migración {migration.version}: {migration.description}")
+        migration.upgrade(conn)
+        conn.execute(schema_version_table.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=datetime.utcnow()
+        ))
+        applied.append(migration.version)
+    if applied:
+        logger.info(f"Esquema actualizado a la versión {applied[-1]}")
+    else:
+        logger.debug(f"Esquema al día en la versión {current}")
+    return applied
@@ -4,14 +4,14 @@ from sqlmodel import SQLModel, Field, Relationship
 # Database entities (SQLModel)
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    username: str = Field(..., max_length=100)
+    username: str = Field(..., max_length=100, unique=True, index=True)
     email: str = Field(..., max_length=255)
     password: str = Field(..., max_length=255)
     comments: List["Comment"] = Relationship(back_populates="user")
 
 class Movie(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    title: str = Field(..., max_length=255)
+    title: str = Field(..., max_length=255, index=True)
     director: str = Field(..., max_length=255)
     year: int = Field(...)
     genre: str = Field(..., max_length=100)
@@ -19,12 +19,21 @@ class Movie(SQLModel, table=True):
 
 class Comment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    movie_id: int = Field(..., foreign_key="movie.id")
-    user_id: int = Field(..., foreign_key="user.id")
+    movie_id: int = Field(..., foreign_key="movie.id", index=True)
+    user_id: int = Field(..., foreign_key="user.id", index=True)
     text: str = Field(...)
     sentiment: str = Field(...)
+    # Quién decidió la etiqueta: 'remote' (modelo del servicio de inferencia), 'local',
+    # 'local_fallback' o 'random_fallback'; None si no se conoce (p. ej. datos de ejemplo)
+    sentiment_source: Optional[str] = Field(default=None, max_length=20)
     movie: Optional[Movie] = Relationship(back_populates="comments")
     user: Optional[User] = Relationship(back_populates="comments")
 
-
-
+class MovieSentiment(SQLModel, table=True):
+    """Contadores de comentarios por sentimiento de cada película (ver db.sentiment_counts)."""
+    __tablename__ = "movie_sentiment"
+    movie_id: int = Field(..., foreign_key="movie.id", primary_key=True, sa_column_kwargs={"autoincrement": False})
+    positive: int = Field(default=0)
+    negative: int = Field(default=0)
+    neutral: int = Field(default=0)
+    pending: int = Field(default=0)
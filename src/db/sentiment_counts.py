@@ -0,0 +1,198 @@
+"""
+Contadores de sentimiento por película.
+
+La tabla `movie_sentiment` guarda, para cada película, cuántos comentarios hay
+de cada sentimiento (y cuántos siguen pendientes de analizar). Quien inserta,
+reetiqueta o borra comentarios aplica el cambio a los contadores en la misma
+transacción, con una sentencia atómica `contador = contador + delta`, así que
+leer el resumen de una película cuesta una consulta por clave primaria en lugar
+de recorrer todos sus comentarios.
+
+Si los contadores se desincronizan (cargas manuales, fallos antiguos...) se
+reconstruyen desde la tabla `comment` con:
+
+    PYTHONPATH=src python -m db.sentiment_counts [--movie ID ...]
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.engine import Connection
+from utils import get_logger
+from .models import Comment, MovieSentiment
+
+logger = get_logger("sentiment_counts")
+
+# Columnas de contador de la tabla movie_sentiment
+SENTIMENT_COLUMNS = ("positive", "negative", "neutral", "pending")
+
+
+def sentiment_column(sentiment: str) -> Optional[str]:
+    """
+    Devuelve la columna de contador de una etiqueta de sentimiento.
+
+    Args:
+        sentiment (str): Etiqueta guardada en el comentario
+
+    Returns:
+        str: Nombre de la columna, o None si la etiqueta no se contabiliza
+    """
+    column = sentiment.lower()
+    return column if column in SENTIMENT_COLUMNS else None
+
+
+def sentiment_deltas(changes: Iterable[tuple]) -> Dict[int, Counter]:
+    """
+    Agrupa cambios individuales en un delta por película.
+
+    Args:
+        changes (Iterable[tuple]): Tuplas (movie_id, sentimiento, incremento)
+
+    Returns:
+        dict: Película -> Counter de incrementos por columna
+    """
+    deltas: Dict[int, Counter] = {}
+    for movie_id, sentiment, delta in changes:
+        column = sentiment_column(sentiment)
+        if column is None:
+            logger.warning(f"Sentimiento '{sentiment}' no contabilizado en la película {movie_id}")
+            continue
+        deltas.setdefault(movie_id, Counter())[column] += delta
+    return deltas
+
+
+def upsert_statement(dialect: str):
+    """
+    Construye la sentencia que suma un delta a los contadores de una película.
+
+    Si la película todavía no tiene fila de contadores se crea con el delta como
+    valor inicial; si ya la tiene se le suma el valor propuesto para la fila. Se
+    usa el upsert nativo de cada base de datos para que dos transacciones
+    concurrentes nunca pierdan un incremento.
+
+    La sentencia no lleva valores: se ejecuta con una fila de parámetros por
+    película (`movie_id` y una clave por columna de SENTIMENT_COLUMNS), así que
+    varias películas cuestan un único `executemany`.
+
+    Args:
+        dialect (str): Nombre del dialecto de SQLAlchemy ('mysql', 'sqlite'...)
+
+    Returns:
+        Executable: Sentencia INSERT ... ON CONFLICT / ON DUPLICATE KEY
+    """
+    table = MovieSentiment.__table__
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        statement = mysql_insert(table)
+        return statement.on_duplicate_key_update(
+            {column: table.c[column] + statement.inserted[column] for column in SENTIMENT_COLUMNS}
+        )
+    if dialect in ("sqlite", "postgresql"):
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        statement = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(table)
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.movie_id],
+            set_={column: table.c[column] + statement.excluded[column] for column in SENTIMENT_COLUMNS}
+        )
+    raise NotImplementedError(f"Dialecto sin soporte de upsert: {dialect}")
+
+
+async def apply_sentiment_deltas(session, deltas: Mapping[int, Mapping[str, int]]):
+    """
+    Aplica los deltas a los contadores dentro de la transacción de la sesión.
+
+    Todas las películas se actualizan con un único `executemany`, en orden de
+    película para que las transacciones concurrentes bloqueen las filas en el
+    mismo orden. No hace commit: el llamante confirma los contadores junto con
+    los comentarios que los han provocado.
+
+    Args:
+        session (AsyncSession): Sesión asíncrona con la transacción en curso
+        deltas (Mapping): Película -> incremento por columna
+    """
+    rows = [
+        {"movie_id": movie_id, **{column: delta.get(column, 0) for column in SENTIMENT_COLUMNS}}
+        for movie_id, delta in sorted(deltas.items())
+        if any(delta.values())
+    ]
+    if rows:
+        await session.exec(upsert_statement(session.get_bind().dialect.name), params=rows)
+
+
+async def count_comment(session, movie_id: int, sentiment: str, delta: int = 1):
+    """
+    Suma (o resta) un comentario al contador de su sentimiento.
+
+    Args:
+        session (AsyncSession): Sesión asíncrona con la transacción en curso
+        movie_id (int): Película del comentario
+        sentiment (str): Sentimiento del comentario
+        delta (int): +1 al crear, -1 al borrar
+    """
+    await apply_sentiment_deltas(session, sentiment_deltas([(movie_id, sentiment, delta)]))
+
+
+def recompute_sentiment_counts(conn: Connection, movie_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Reconstruye los contadores a partir de la tabla `comment`.
+
+    Args:
+        conn (Connection): Conexión (dentro de una transacción)
+        movie_ids (Sequence[int], optional): Películas a reparar; todas si se omite
+
+    Returns:
+        int: Número de películas con contadores tras la reparación
+    """
+    table = MovieSentiment.__table__
+    label = func.lower(Comment.sentiment)
+    counts = select(
+        Comment.movie_id,
+        *(func.sum(case((label == column, 1), else_=0)).label(column) for column in SENTIMENT_COLUMNS)
+    ).group_by(Comment.movie_id)
+    clear = delete(table)
+    if movie_ids is not None:
+        counts = counts.where(Comment.movie_id.in_(movie_ids))
+        clear = clear.where(table.c.movie_id.in_(movie_ids))
+    conn.execute(clear)
+    result = conn.execute(insert(table).from_select(["movie_id", *SENTIMENT_COLUMNS], counts))
+    logger.info(f"Contadores de sentimiento reconstruidos para {result.rowcount} películas")
+    return result.rowcount
+
+
+def sentiment_summary(movie_id: int, counts: Optional[Any]) -> Dict[str, Any]:
+    """
+    Construye el resumen de sentimiento de una película a partir de sus contadores.
+
+    Las proporciones se calculan sobre los comentarios ya etiquetados.
+
+    Args:
+        movie_id (int): Película
+        counts (MovieSentiment, optional): Fila de contadores (None = sin comentarios)
+    """
+    values = {column: getattr(counts, column, 0) or 0 for column in SENTIMENT_COLUMNS}
+    labeled = values["positive"] + values["negative"] + values["neutral"]
+    return {
+        "movie_id": movie_id,
+        **values,
+        "total": labeled + values["pending"],
+        "positive_ratio": round(values["positive"] / labeled, 4) if labeled else 0.0,
+        "negative_ratio": round(values["negative"] / labeled, 4) if labeled else 0.0,
+        "neutral_ratio": round(values["neutral"] / labeled, 4) if labeled else 0.0
+    }
+
+
+async def main(args: argparse.Namespace):
+    from .db import engine
+    async with engine.begin() as conn:
+        repaired = await conn.run_sync(recompute_sentiment_counts, args.movie or None)
+    print(f"Contadores reconstruidos para {repaired} películas")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye los contadores de sentimiento por película")
+    parser.add_argument("--movie", type=int, action="append", help="Película a reparar (repetible); todas si se omite")
+    asyncio.run(main(parser.parse_args()))
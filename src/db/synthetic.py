@@ -0,0 +1,223 @@
+"""
+Generador de datos sintéticos para pruebas de carga y escalado.
+
+Genera películas, usuarios y comentarios realistas directamente en la base de
+datos configurada en `DB_URL`, por bloques y confirmando cada cierto número de
+filas, de forma que el consumo de memoria no depende del tamaño del conjunto.
+
+Todos los usuarios comparten la misma contraseña y se guarda un único hash
+bcrypt precalculado: calcular 100k hashes distintos llevaría horas y no aporta
+nada a una prueba de carga. La popularidad de las películas sigue una ley de
+potencias, como en los datos reales: unas pocas películas concentran la mayoría
+de los comentarios.
+
+Uso (desde la raíz del repositorio):
+
+    PYTHONPATH=src python -m db.synthetic --movies 1000000 --users 100000 --comments 50000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Iterator, List, Sequence
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+from utils import get_logger
+from .bulk import (
+    BULK_BATCH_SIZE, SENTIMENTS, bulk_insert, ids_after, load_comment_templates, max_id
+)
+from .sentiment_counts import recompute_sentiment_counts
+from .db import engine, run_migrations
+from .models import User, Movie, Comment
+
+logger = get_logger("synthetic")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+COMMENTS_JSON = os.path.join(DATA_DIR, "comments.json")
+
+# Contraseña común de los usuarios sintéticos
+SYNTHETIC_PASSWORD = "password123"
+
+GENRES = (
+    "Drama", "Comedy", "Action", "Sci-Fi", "Thriller", "Horror", "Romance",
+    "Animation", "Documentary", "Crime", "Fantasy", "Adventure"
+)
+_TITLE_ADJECTIVES = (
+    "Dark", "Silent", "Lost", "Last", "Broken", "Golden", "Hidden", "Eternal",
+    "Red", "Wild", "Frozen", "Secret", "Crimson", "Distant", "Forgotten", "Burning"
+)
+_TITLE_NOUNS = (
+    "Night", "River", "Empire", "Dream", "Star", "City", "Shadow", "Horizon",
+    "Garden", "Storm", "Kingdom", "Island", "Mirror", "Road", "Memory", "Signal"
+)
+_FIRST_NAMES = (
+    "Ana", "Luis", "Marta", "Pablo", "Lucía", "Jorge", "Elena", "Diego",
+    "Sara", "Carlos", "Laura", "Javier", "Irene", "Hugo", "Nuria", "Álvaro"
+)
+_LAST_NAMES = (
+    "García", "López", "Martín", "Sánchez", "Pérez", "Gómez", "Ruiz", "Díaz",
+    "Moreno", "Muñoz", "Romero", "Navarro", "Torres", "Vidal", "Castro", "Ortega"
+)
+
+
+def synthetic_movies(count: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """Genera `count` películas con título, director, año y género aleatorios."""
+    for n in range(count):
+        title = f"The {rng.choice(_TITLE_ADJECTIVES)} {rng.choice(_TITLE_NOUNS)}"
+        if n >= len(_TITLE_ADJECTIVES) * len(_TITLE_NOUNS):
+            # A partir de aquí los títulos se repetirían: se numeran como secuelas
+            title = f"{title} {rng.randint(2, 9)}"
+        yield {
+            "title": title,
+            "director": f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}",
+            "year": rng.randint(1920, 2025),
+            "genre": rng.choice(GENRES)
+        }
+
+
+def synthetic_users(count: int, first: int, password_hash: str) -> Iterator[Dict[str, Any]]:
+    """
+    Genera `count` usuarios con nombre único a partir del número `first`.
+
+    Args:
+        count (int): Número de usuarios
+        first (int): Número del primer usuario (evita choques con los ya existentes)
+        password_hash (str): Hash bcrypt común
+    """
+    for n in range(first, first + count):
+        yield {
+            "username": f"user{n:07d}",
+            "email": f"user{n:07d}@example.com",
+            "password": password_hash
+        }
+
+
+def synthetic_comments(
+    count: int,
+    movie_ids: Sequence[int],
+    user_ids: Sequence[int],
+    templates: Dict[str, List[str]],
+    rng: random.Random,
+    skew: float = 2.0
+) -> Iterator[Dict[str, Any]]:
+    """
+    Genera `count` comentarios con una popularidad de películas sesgada.
+
+    Con `skew` = 1 las películas se eligen de forma uniforme; valores mayores
+    concentran los comentarios en las primeras películas.
+
+    Args:
+        count (int): Número de comentarios
+        movie_ids (Sequence[int]): Películas a comentar
+        user_ids (Sequence[int]): Autores posibles
+        templates (dict): Plantillas de texto por sentimiento
+        rng (random.Random): Generador aleatorio
+        skew (float): Exponente de la ley de potencias
+    """
+    movies = len(movie_ids)
+    for _ in range(count):
+        sentiment = rng.choice(SENTIMENTS)
+        yield {
+            "movie_id": movie_ids[int(movies * rng.random() ** skew)],
+            "user_id": rng.choice(user_ids),
+            "text": rng.choice(templates[sentiment]),
+            "sentiment": sentiment
+        }
+
+
+def generate(
+    conn: Connection,
+    movies: int,
+    users: int,
+    comments: int,
+    batch_size: int = BULK_BATCH_SIZE,
+    commit_every: int = 100000,
+    seed: int = 42,
+    skew: float = 2.0
+) -> Dict[str, int]:
+    """
+    Inserta el conjunto de datos sintético.
+
+    Args:
+        conn (Connection): Conexión a la base de datos
+        movies (int): Películas a crear
+        users (int): Usuarios a crear
+        comments (int): Comentarios a crear
+        batch_size (int): Filas por bloque de inserción
+        commit_every (int): Filas entre commits
+        seed (int): Semilla para obtener datos reproducibles
+        skew (float): Sesgo de popularidad de las películas
+
+    Returns:
+        dict: Número de filas creadas por tabla
+    """
+    from auth.password import hash_password
+
+    rng = random.Random(seed)
+
+    def progress(table: str, total: int):
+        def report(done: int):
+            logger.info(f"{table}: {done}/{total} filas")
+        return report
+
+    movie_table, user_table = Movie.__table__, User.__table__
+    first_movie, first_user = max_id(conn, movie_table), max_id(conn, user_table)
+
+    bulk_insert(conn, movie_table, synthetic_movies(movies, rng), batch_size,
+                commit_every, progress("movie", movies))
+    bulk_insert(conn, user_table, synthetic_users(users, first_user + 1, hash_password(SYNTHETIC_PASSWORD)),
+                batch_size, commit_every, progress("user", users))
+
+    movie_ids = ids_after(conn, movie_table, first_movie)
+    user_ids = ids_after(conn, user_table, first_user)
+    created = 0
+    if comments and movie_ids and user_ids:
+        created = bulk_insert(
+            conn, Comment.__table__,
+            synthetic_comments(comments, movie_ids, user_ids, load_comment_templates(COMMENTS_JSON), rng, skew),
+            batch_size, commit_every, progress("comment", comments)
+        )
+        # Una sola agregación al final es mucho más barata que actualizar contadores por bloque
+        recompute_sentiment_counts(conn)
+        conn.commit()
+    return {"movies": len(movie_ids), "users": len(user_ids), "comments": created}
+
+
+async def main(args: argparse.Namespace):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    await run_migrations()
+    start = time.perf_counter()
+    async with engine.connect() as conn:
+        counts = await conn.run_sync(
+            generate, args.movies, args.users, args.comments,
+            args.batch_size, args.commit_every, args.seed, args.skew
+        )
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    print(
+        f"Creadas {counts['movies']} películas, {counts['users']} usuarios y "
+        f"{counts['comments']} comentarios en {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} filas/s)"
+    )
+    await engine.dispose()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos en la base de datos de DB_URL")
+    parser.add_argument("--movies", type=int, default=10000, help="Películas a crear")
+    parser.add_argument("--users", type=int, default=1000, help="Usuarios a crear")
+    parser.add_argument("--comments", type=int, default=100000, help="Comentarios a crear")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Filas por bloque de inserción")
+    parser.add_argument("--commit-every", type=int, default=100000, help="Filas entre commits")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    parser.add_argument("--skew", type=float, default=2.0, help="Sesgo de popularidad (1 = uniforme)")
+    args = parser.parse_args(argv)
+    if min(args.movies, args.users, args.comments) < 0 or args.batch_size < 1 or args.skew < 1:
+        parser.error("los contadores no pueden ser negativos, batch-size debe ser > 0 y skew >= 1")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
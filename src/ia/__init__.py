@@ -1 +1,3 @@
-from .sentiment_analysis import SentimentModel
+from .sentiment_analysis import SentimentModel, SentimentLabel
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .sentiment_worker import SentimentWorker, sentiment_worker, SENTIMENT_MODE, PENDING_SENTIMENT
\ No newline at end of file
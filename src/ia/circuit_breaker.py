@@ -0,0 +1,160 @@
+"""
+Circuit breaker para las llamadas a un servicio externo.
+
+Cuando el servicio de inferencia está caído, cada llamada espera hasta agotar el
+timeout antes de recurrir a la etiqueta aleatoria de respaldo. El circuit breaker
+cuenta los fallos consecutivos y, al llegar al umbral, se abre: durante el tiempo
+de enfriamiento las llamadas fallan al instante sin tocar la red. Pasado ese
+tiempo pasa a semiabierto y deja pasar una única sonda; si sale bien el circuito
+se cierra y si falla se vuelve a abrir otro periodo de enfriamiento.
+
+Estados:
+    - closed: las llamadas pasan con normalidad
+    - open: las llamadas se rechazan de inmediato con `CircuitOpenError`
+    - half_open: solo pasa la sonda; el resto se rechaza hasta conocer su resultado
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional
+from utils import CIRCUIT_REJECTIONS, CIRCUIT_STATE, get_logger
+
+logger = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor numérico de cada estado en la métrica circuit_breaker_state
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuito está abierto y la llamada se rechaza sin intentarla."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con estados cerrado, abierto y semiabierto.
+
+    No hace las llamadas: quien llama pide permiso con `before_call` y comunica el
+    resultado con `record_success` o `record_failure`. Si la llamada era la sonda,
+    debe llamar además a `release_probe` al terminar pase lo que pase (en un
+    `finally`), para que una cancelación no deje el circuito semiabierto para
+    siempre. Se usa desde un único bucle de eventos, por lo que no necesita bloqueos.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            name (str): Nombre del servicio protegido (etiqueta de las métricas)
+            failure_threshold (int): Fallos consecutivos que abren el circuito
+            reset_timeout (float): Segundos que el circuito permanece abierto antes
+                de dejar pasar una sonda
+            clock (Callable): Reloj monotónico (sustituible en los tests)
+        """
+        if failure_threshold < 1 or reset_timeout < 0:
+            raise ValueError("failure_threshold debe ser mayor que 0 y reset_timeout no puede ser negativo")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        self.opened = 0
+        self.rejected = 0
+        self.probes = 0
+        CIRCUIT_STATE.labels(name).set(_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            logger.warning("Circuito %s: %s -> %s", self.name, self._state, state)
+        self._state = state
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+    def before_call(self) -> bool:
+        """
+        Comprueba si una llamada puede hacerse.
+
+        Returns:
+            bool: True si la llamada es la sonda del estado semiabierto
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o ya hay una sonda en curso
+        """
+        if self._state == CLOSED:
+            return False
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self._state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            self.probes += 1
+            return True
+        self.rejected += 1
+        CIRCUIT_REJECTIONS.labels(self.name).inc()
+        raise CircuitOpenError(f"Circuito {self.name} abierto: {self._last_error}")
+
+    def release_probe(self):
+        """
+        Libera la sonda del estado semiabierto aunque no se haya registrado su
+        resultado (por ejemplo si la tarea se cancela): la siguiente llamada
+        volverá a ser la sonda. No hace nada si la sonda ya terminó.
+        """
+        self._probe_in_flight = False
+
+    def record_success(self):
+        """Registra una llamada correcta: cierra el circuito y reinicia los fallos."""
+        self._failures = 0
+        self._probe_in_flight = False
+        self._set_state(CLOSED)
+
+    def record_failure(self, error: Any = None):
+        """
+        Registra una llamada fallida. Abre el circuito si se alcanza el umbral de
+        fallos consecutivos o si ha fallado la sonda.
+        """
+        self._failures += 1
+        self._last_error = str(error) if error is not None else "error"
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._probe_in_flight = False
+            self._opened_at = self._clock()
+            if self._state != OPEN:
+                self.opened += 1
+            self._set_state(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado del circuito y sus contadores.
+
+        Returns:
+            dict: Estado, fallos consecutivos, configuración, segundos hasta la
+                siguiente sonda (solo si está abierto), veces que se ha abierto,
+                llamadas rechazadas, sondas y último error
+        """
+        retry_in = None
+        if self._state == OPEN:
+            retry_in = round(max(self._opened_at + self.reset_timeout - self._clock(), 0.0), 3)
+        return {
+            "name": self.name,
+            "state": self._state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_in_seconds": retry_in,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "probes": self.probes,
+            "last_error": self._last_error
+        }
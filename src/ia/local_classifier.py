@@ -0,0 +1,292 @@
+"""
+Clasificador de sentimiento local y ligero (naive Bayes multinomial).
+
+Se entrena fuera de línea con los comentarios ya etiquetados de la tabla
+`comment` (ver ia.train_local_classifier) y se guarda en un JSON. Predecir un
+texto solo requiere tokenizarlo y sumar unos pocos logaritmos por token, así que
+responde en microsegundos dentro del propio proceso de la API.
+
+`SentimentModel` lo usa como primer nivel: si la confianza supera el umbral la
+etiqueta local es la respuesta y solo los textos dudosos se envían al servicio
+de inferencia. Cuando el servicio no responde, la etiqueta local sustituye a la
+aleatoria.
+
+La confianza es la probabilidad a posteriori de la etiqueta elegida, calibrada
+con una temperatura ajustada sobre un conjunto de validación: naive Bayes da
+probabilidades demasiado extremas y sin calibrar el umbral no tendría sentido.
+"""
+
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from utils import get_logger
+
+logger = get_logger("local_classifier")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Palabras que invierten el sentido de la siguiente ("no me gustó" ≠ "me gustó")
+_NEGATIONS = {"no", "ni", "nunca", "jamás", "nada", "tampoco", "sin"}
+# Temperaturas que se prueban al calibrar
+_TEMPERATURES = [round(1.25 ** i, 3) for i in range(-4, 25)]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Extrae las características de un texto: palabras en minúsculas, bigramas y
+    palabras precedidas de una negación marcadas con 'NO_'.
+    """
+    words = _WORD_RE.findall(text.lower())
+    features = list(words)
+    features.extend(f"{first} {second}" for first, second in zip(words, words[1:]))
+    features.extend(f"NO_{word}" for previous, word in zip(words, words[1:]) if previous in _NEGATIONS)
+    return features
+
+
+def _softmax(scores: Sequence[float], temperature: float) -> List[float]:
+    scaled = [score / temperature for score in scores]
+    top = max(scaled)
+    exp = [math.exp(score - top) for score in scaled]
+    total = sum(exp)
+    return [value / total for value in exp]
+
+
+class LocalSentimentClassifier:
+    """Naive Bayes multinomial con suavizado de Laplace y confianza calibrada."""
+
+    def __init__(
+        self,
+        labels: List[str],
+        class_log_prior: List[float],
+        feature_log_prob: Dict[str, List[float]],
+        temperature: float = 1.0,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            labels (List[str]): Etiquetas, en el orden de las listas de probabilidades
+            class_log_prior (List[float]): Logaritmo de la probabilidad a priori de cada etiqueta
+            feature_log_prob (Dict[str, List[float]]): Logaritmo de P(característica | etiqueta)
+            temperature (float): Temperatura con la que se calibran las probabilidades
+            metadata (dict, optional): Datos del entrenamiento (textos, precisión...)
+        """
+        self.labels = labels
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob
+        self.temperature = temperature
+        self.metadata = metadata or {}
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        alpha: float = 1.0,
+        min_count: int = 2,
+        max_features: int = 50000
+    ) -> "LocalSentimentClassifier":
+        """
+        Entrena el clasificador.
+
+        Args:
+            texts (Sequence[str]): Textos de entrenamiento
+            labels (Sequence[str]): Etiqueta de cada texto
+            alpha (float): Suavizado de Laplace
+            min_count (int): Apariciones mínimas de una característica para usarla
+            max_features (int): Número máximo de características (las más frecuentes)
+
+        Raises:
+            ValueError: Si no hay textos o solo hay una etiqueta
+        """
+        classes = sorted(set(labels))
+        if not texts or len(classes) < 2:
+            raise ValueError("Se necesitan textos de al menos dos etiquetas para entrenar")
+        index = {label: i for i, label in enumerate(classes)}
+        documents = [Counter(tokenize(text)) for text in texts]
+
+        totals: Counter = Counter()
+        for features in documents:
+            totals.update(features)
+        vocabulary = [feature for feature, count in totals.most_common(max_features) if count >= min_count]
+        allowed = set(vocabulary)
+
+        counts = {feature: [0.0] * len(classes) for feature in vocabulary}
+        class_tokens = [0.0] * len(classes)
+        class_documents = [0] * len(classes)
+        for features, label in zip(documents, labels):
+            column = index[label]
+            class_documents[column] += 1
+            for feature, count in features.items():
+                if feature in allowed:
+                    counts[feature][column] += count
+                    class_tokens[column] += count
+
+        denominators = [math.log(tokens + alpha * len(vocabulary)) for tokens in class_tokens]
+        feature_log_prob = {
+            feature: [math.log(row[i] + alpha) - denominators[i] for i in range(len(classes))]
+            for feature, row in counts.items()
+        }
+        class_log_prior = [math.log(n / len(texts)) if n else -1e9 for n in class_documents]
+        return cls(classes, class_log_prior, feature_log_prob, metadata={
+            "trained_on": len(texts),
+            "features": len(vocabulary),
+            "class_counts": dict(zip(classes, class_documents))
+        })
+
+    def _scores(self, text: str) -> List[float]:
+        scores = list(self.class_log_prior)
+        for feature in tokenize(text):
+            log_prob = self.feature_log_prob.get(feature)
+            if log_prob is not None:
+                for i, value in enumerate(log_prob):
+                    scores[i] += value
+        return scores
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Probabilidad calibrada de cada etiqueta."""
+        return dict(zip(self.labels, _softmax(self._scores(text), self.temperature)))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Clasifica un texto.
+
+        Returns:
+            tuple: Etiqueta más probable y su probabilidad calibrada
+        """
+        probabilities = _softmax(self._scores(text), self.temperature)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.labels[best], probabilities[best]
+
+    def calibrate(self, texts: Sequence[str], labels: Sequence[str]) -> float:
+        """
+        Elige la temperatura que minimiza la log-verosimilitud negativa de un
+        conjunto de validación.
+
+        Returns:
+            float: La temperatura elegida
+        """
+        scored = [(self._scores(text), self.labels.index(label)) for text, label in zip(texts, labels)
+                  if label in self.labels]
+        if not scored:
+            return self.temperature
+
+        def loss(temperature: float) -> float:
+            return -sum(math.log(max(_softmax(scores, temperature)[target], 1e-12)) for scores, target in scored)
+
+        self.temperature = min(_TEMPERATURES, key=loss)
+        return self.temperature
+
+    def evaluate(self, texts: Sequence[str], labels: Sequence[str], threshold: float) -> Dict[str, Any]:
+        """
+        Mide la precisión global y la de los textos que superan el umbral.
+
+        Returns:
+            dict: 'accuracy', 'coverage' (proporción que supera el umbral) y
+                'confident_accuracy' (precisión sobre esos textos)
+        """
+        confident = correct = confident_correct = 0
+        for text, label in zip(texts, labels):
+            predicted, confidence = self.predict(text)
+            correct += predicted == label
+            if confidence >= threshold:
+                confident += 1
+                confident_correct += predicted == label
+        total = len(texts)
+        return {
+            "accuracy": round(correct / total, 4) if total else None,
+            "coverage": round(confident / total, 4) if total else None,
+            "confident_accuracy": round(confident_correct / confident, 4) if confident else None
+        }
+
+    def save(self, path: str):
+        """Guarda el modelo en un fichero JSON (escritura atómica)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "labels": self.labels,
+                "class_log_prior": self.class_log_prior,
+                "temperature": self.temperature,
+                "metadata": self.metadata,
+                "feature_log_prob": self.feature_log_prob
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LocalSentimentClassifier"]:
+        """
+        Carga un modelo guardado con `save`.
+
+        Returns:
+            LocalSentimentClassifier: El modelo, o None si el fichero no existe o no es válido
+        """
+        if not os.path.exists(path):
+            logger.info("No hay clasificador local en %s; se usa solo el servicio de inferencia", path)
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            model = cls(
+                data["labels"], data["class_log_prior"], data["feature_log_prob"],
+                data.get("temperature", 1.0), data.get("metadata")
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"No se pudo cargar el clasificador local de {path}: {e}")
+            return None
+        logger.info("Clasificador local cargado de %s (%s características)", path, len(model.feature_log_prob))
+        return model
+
+
+class TieredStats:
+    """
+    Contadores de las decisiones del clasificador por niveles.
+
+    - local: respondió el clasificador local (confianza sobre el umbral)
+    - escalated: texto dudoso enviado al servicio de inferencia
+    - audited: texto con confianza suficiente enviado igualmente al servicio para
+      medir el acuerdo entre ambos
+    - local_fallback: el servicio falló y se usó la etiqueta local
+    - random_fallback: el servicio falló y no había clasificador local
+
+    El acuerdo se mide por separado para los textos seguros (auditados) y los dudosos.
+    """
+
+    DECISIONS = ("local", "escalated", "audited", "local_fallback", "random_fallback")
+
+    def __init__(self, audit_rate: float = 0.0, seed: Optional[int] = None):
+        self.audit_rate = audit_rate
+        self._rng = random.Random(seed)
+        self.decisions = {decision: 0 for decision in self.DECISIONS}
+        self.agreement = {tier: {"compared": 0, "agreed": 0} for tier in ("confident", "uncertain")}
+
+    def should_audit(self) -> bool:
+        """Decide si un texto seguro se envía también al servicio para medir el acuerdo."""
+        return self.audit_rate > 0 and self._rng.random() < self.audit_rate
+
+    def record(self, decision: str, count: int = 1):
+        self.decisions[decision] += count
+
+    def record_agreement(self, confident: bool, agreed: bool):
+        tier = self.agreement["confident" if confident else "uncertain"]
+        tier["compared"] += 1
+        tier["agreed"] += agreed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Decisiones, proporción de textos escalados y acuerdo por nivel
+        """
+        total = sum(self.decisions.values())
+        sent = self.decisions["escalated"] + self.decisions["audited"]
+        return {
+            "decisions": dict(self.decisions),
+            "escalation_rate": round(self.decisions["escalated"] / total, 4) if total else 0.0,
+            "remote_rate": round(sent / total, 4) if total else 0.0,
+            "agreement": {
+                tier: {**counts, "rate": round(counts["agreed"] / counts["compared"], 4) if counts["compared"] else None}
+                for tier, counts in self.agreement.items()
+            }
+        }
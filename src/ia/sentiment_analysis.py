@@ -1,51 +1,433 @@
-from utils import get_logger
+from typing import List, Optional, Tuple
+from utils import get_logger, INFERENCE_FALLBACKS, SENTIMENT_DECISIONS
+import asyncio
 import random
-import requests
+import httpx
 import os
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .local_classifier import LocalSentimentClassifier, TieredStats
 
 logger = get_logger("sentiment_analysis")
 
+# Configuración del cliente del servicio de inferencia
+INFERENCE_HOST = os.environ.get("INFERENCE_HOST", "host.docker.internal")
+INFERENCE_PORT = int(os.environ.get("INFERENCE_PORT", "8001"))
+INFERENCE_CONNECT_TIMEOUT = float(os.environ.get("INFERENCE_CONNECT_TIMEOUT", "1"))
+INFERENCE_READ_TIMEOUT = float(os.environ.get("INFERENCE_READ_TIMEOUT", "5"))
+# Número máximo de peticiones simultáneas al servicio de inferencia
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get("INFERENCE_MAX_CONCURRENCY", "32"))
+# Conexiones keep-alive que se mantienen abiertas en el pool
+INFERENCE_MAX_KEEPALIVE = int(os.environ.get("INFERENCE_MAX_KEEPALIVE", "16"))
+# Circuit breaker: fallos consecutivos que lo abren, segundos abierto antes de
+# sondear de nuevo el servicio y tiempo máximo de la sonda (GET /readyz)
+INFERENCE_BREAKER_FAILURES = int(os.environ.get("INFERENCE_BREAKER_FAILURES", "5"))
+INFERENCE_BREAKER_COOLDOWN = float(os.environ.get("INFERENCE_BREAKER_COOLDOWN", "10"))
+INFERENCE_BREAKER_PROBE_TIMEOUT = float(os.environ.get("INFERENCE_BREAKER_PROBE_TIMEOUT", "1"))
+
+# Clasificador local (ver ia.local_classifier): fichero del modelo (vacío = desactivado),
+# confianza mínima para responder sin consultar el servicio (> 1 = escalar siempre) y
+# proporción de textos seguros que se envían igualmente al servicio para medir el acuerdo
+LOCAL_CLASSIFIER_PATH = os.environ.get("LOCAL_CLASSIFIER_PATH", os.path.join("models", "local_sentiment.json"))
+LOCAL_CLASSIFIER_THRESHOLD = float(os.environ.get("LOCAL_CLASSIFIER_THRESHOLD", "0.9"))
+LOCAL_CLASSIFIER_AUDIT_RATE = float(os.environ.get("LOCAL_CLASSIFIER_AUDIT_RATE", "0.02"))
+
+
+def is_random_prediction(prediction: dict) -> bool:
+    """
+    Indica si una predicción del servicio de inferencia es su respaldo aleatorio.
+
+    Cuando el modelo no está cargado o falla, el servicio responde igualmente 200
+    con una etiqueta al azar y `score` -1; esas respuestas no son del modelo.
+    """
+    return prediction.get("score", 0) < 0
+
+
+class SentimentLabel(str):
+    """
+    Etiqueta de sentimiento que recuerda quién la decidió.
+
+    Se comporta como la cadena de la etiqueta; `decision` es 'local', 'remote',
+    'local_fallback' o 'random_fallback' y se guarda junto al comentario para
+    saber qué etiquetas son del modelo del servicio de inferencia.
+    """
+
+    decision: str
+
+    def __new__(cls, label: str, decision: str):
+        obj = super().__new__(cls, label)
+        obj.decision = decision
+        return obj
+
+
+def _random_predictions(response: httpx.Response) -> bool:
+    """Indica si una respuesta correcta de /predict o /predict_batch trae etiquetas aleatorias."""
+    if not response.is_success:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    if not isinstance(body, dict):
+        return False
+    return any(is_random_prediction(p) for p in body.get("predictions", [body]) if isinstance(p, dict))
+
+
+class InferenceClient:
+    """
+    Cliente HTTP asíncrono y compartido para el servicio de inferencia.
+
+    Reutiliza las conexiones mediante un pool keep-alive en lugar de abrir una
+    conexión nueva por comentario, y limita con un semáforo el número de peticiones
+    en vuelo para que un servicio lento no acumule conexiones sin control.
+
+    Las peticiones pasan por un circuit breaker: tras varios fallos seguidos
+    (errores de red, timeouts, respuestas 5xx o respuestas con las etiquetas
+    aleatorias del servicio cuando no tiene el modelo) se rechazan al instante con
+    `CircuitOpenError`. Pasado el enfriamiento, la siguiente petición sondea antes
+    `GET /readyz` con un timeout corto y solo se envía si el servicio está listo.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        max_concurrency: int,
+        max_keepalive: int,
+        breaker: Optional[CircuitBreaker] = None,
+        probe_timeout: float = 1.0
+    ):
+        """
+        Args:
+            base_url (str): URL base del servicio de inferencia
+            connect_timeout (float): Tiempo máximo (s) para establecer la conexión
+            read_timeout (float): Tiempo máximo (s) de espera de la respuesta
+            max_concurrency (int): Número máximo de peticiones simultáneas
+            max_keepalive (int): Conexiones que se mantienen abiertas en el pool
+            breaker (CircuitBreaker, optional): Circuit breaker de las peticiones
+                (por defecto uno con la configuración de INFERENCE_BREAKER_*)
+            probe_timeout (float): Tiempo máximo (s) de la sonda del estado semiabierto
+        """
+        self.base_url = base_url
+        self.breaker = breaker or CircuitBreaker(
+            "inference",
+            failure_threshold=INFERENCE_BREAKER_FAILURES,
+            reset_timeout=INFERENCE_BREAKER_COOLDOWN
+        )
+        self.probe_timeout = probe_timeout
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_keepalive
+        )
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        """Crea el cliente y el semáforo la primera vez (o si cambia el bucle de eventos)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    async def post(self, path: str, payload: dict) -> httpx.Response:
+        """
+        Envía una petición POST con JSON al servicio de inferencia.
+
+        Args:
+            path (str): Ruta del endpoint (por ejemplo '/predict')
+            payload (dict): Cuerpo de la petición
+
+        Returns:
+            httpx.Response: Respuesta del servicio
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o la sonda ha fallado
+            httpx.HTTPError: Si la petición falla
+        """
+        client = self._ensure_client()
+        if self.breaker.before_call():
+            try:
+                await self._probe(client)
+            finally:
+                # CancelledError no pasa por record_success ni record_failure
+                self.breaker.release_probe()
+        try:
+            async with self._semaphore:
+                response = await client.post(path, json=payload)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        elif _random_predictions(response):
+            # El servicio responde, pero sin modelo: cada llamada sería un viaje en balde
+            self.breaker.record_failure(f"HTTP {response.status_code} con etiquetas aleatorias")
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def _probe(self, client: httpx.AsyncClient):
+        """
+        Sonda del estado semiabierto: comprueba `GET /readyz` con un timeout corto.
+
+        Raises:
+            CircuitOpenError: Si el servicio no responde o no contesta con un 2xx
+        """
+        try:
+            response = await client.get("/readyz", timeout=self.probe_timeout)
+            ready = response.is_success
+            error = f"sonda: HTTP {response.status_code}"
+        except Exception as e:
+            ready, error = False, f"sonda: {e!r}"
+        if not ready:
+            self.breaker.record_failure(error)
+            raise CircuitOpenError(f"Circuito {self.breaker.name} abierto ({error})")
+        logger.info("La sonda del servicio de inferencia ha respondido; se cierra el circuito")
+        self.breaker.record_success()
+
+    async def aclose(self):
+        """Cierra las conexiones del pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+            self._loop = None
+
+
 class SentimentModel:
     """
     Clase para el análisis de sentimientos de textos.
-    
-    Esta clase proporciona métodos para analizar el sentimiento de textos utilizando
-    un servicio de inferencia externo que implementa el modelo de análisis.
-    Si el servicio no está disponible, se utiliza una selección aleatoria como respaldo.
+
+    Esta clase proporciona métodos para analizar el sentimiento de textos en dos
+    niveles: un clasificador local ligero (ver ia.local_classifier) responde los
+    textos en los que tiene confianza suficiente y el resto se envía al servicio
+    de inferencia externo que implementa el modelo de análisis.
+    Si el servicio no está disponible, se usa la etiqueta del clasificador local
+    y, si no lo hay, una selección aleatoria como respaldo.
     """
-    
+
+    client = InferenceClient(
+        base_url=f"http://{INFERENCE_HOST}:{INFERENCE_PORT}",
+        connect_timeout=INFERENCE_CONNECT_TIMEOUT,
+        read_timeout=INFERENCE_READ_TIMEOUT,
+        max_concurrency=INFERENCE_MAX_CONCURRENCY,
+        max_keepalive=INFERENCE_MAX_KEEPALIVE,
+        probe_timeout=INFERENCE_BREAKER_PROBE_TIMEOUT
+    )
+    local_classifier: Optional[LocalSentimentClassifier] = (
+        LocalSentimentClassifier.load(LOCAL_CLASSIFIER_PATH) if LOCAL_CLASSIFIER_PATH else None
+    )
+    tiered_stats = TieredStats(audit_rate=LOCAL_CLASSIFIER_AUDIT_RATE)
+
+    @staticmethod
+    def _local_prediction(text: str) -> Tuple[Optional[Tuple[str, float]], bool]:
+        """
+        Etiqueta del clasificador local y si debe usarse sin consultar el servicio.
+
+        Returns:
+            tuple: (etiqueta, confianza) o None si no hay clasificador local, y True
+                si la confianza supera el umbral y el texto no se audita
+        """
+        if SentimentModel.local_classifier is None:
+            return None, False
+        prediction = SentimentModel.local_classifier.predict(text)
+        confident = prediction[1] >= LOCAL_CLASSIFIER_THRESHOLD
+        return prediction, confident and not SentimentModel.tiered_stats.should_audit()
+
+    @staticmethod
+    def _record_remote(local: Optional[Tuple[str, float]], label: str):
+        """Registra un texto resuelto por el servicio y su acuerdo con la etiqueta local."""
+        if local is None:
+            return
+        confident = local[1] >= LOCAL_CLASSIFIER_THRESHOLD
+        SentimentModel.tiered_stats.record("audited" if confident else "escalated")
+        SentimentModel.tiered_stats.record_agreement(confident, local[0] == label)
+
     @staticmethod
-    def analyze_sentiment(text):
+    async def analyze_sentiment(text):
         """
         Analiza el sentimiento del texto proporcionado.
-        
-        Este método envía una petición al servicio de inferencia para obtener un análisis
-        de sentimiento del texto. Intenta conectarse a diferentes URLs en caso de fallo.
-        Si ninguna conexión tiene éxito, se devuelve una clasificación aleatoria como respaldo.
-        
+
+        Si el clasificador local está seguro de la etiqueta se devuelve sin más. En
+        otro caso se envía una petición al servicio de inferencia sin bloquear el
+        bucle de eventos. Si la petición falla, se devuelve la etiqueta del
+        clasificador local o, si no lo hay, una clasificación aleatoria.
+
         Args:
             text (str): Texto a analizar
-            
+
         Returns:
-            str: Etiqueta de sentimiento ('positive', 'negative', 'neutral')
+            SentimentLabel: Etiqueta de sentimiento ('positive', 'negative', 'neutral')
+                y quién la decidió
         """
-        try:
-            inference_host = os.environ.get("INFERENCE_HOST", "host.docker.internal")
-            url = f"http://{inference_host}:8001/predict"
+        local, use_local = SentimentModel._local_prediction(text)
+        if use_local:
+            SentimentModel.tiered_stats.record("local")
+            SENTIMENT_DECISIONS.labels("local").inc()
+            return SentimentLabel(local[0], "local")
 
+        try:
             text_with_context = f"Mi opinión sobre esta película: {text}"
-            logger.debug(f"Se manda al modelo: '{text_with_context}'")
-            
-            logger.debug(f"Sending request to: {url}")
-            response = requests.post(url, json={"text": text_with_context}, timeout=5)
+            logger.debug("Se manda al modelo: '%s'", text_with_context)
+
+            response = await SentimentModel.client.post("/predict", {"text": text_with_context})
             if response.status_code == 200:
-                result = response.json()
-                return result["label"]
+                prediction = response.json()
+                if not is_random_prediction(prediction):
+                    SentimentModel._record_remote(local, prediction["label"])
+                    SENTIMENT_DECISIONS.labels("remote").inc()
+                    return SentimentLabel(prediction["label"], "remote")
+                logger.error("Inference service returned a random label (model not available)")
+            else:
+                logger.error(f"Inference service returned status {response.status_code}")
+        except CircuitOpenError as e:
+            # El servicio está marcado como caído: se responde al instante con el respaldo
+            logger.debug("Petición rechazada sin llamar al servicio de inferencia: %s", e)
         except Exception as e:
-            logger.error(f"Error connecting to inference service at {url}: {e}")
-        
+            logger.error(f"Error connecting to inference service at {SentimentModel.client.base_url}: {e}")
+
+        if local is not None:
+            # Respaldo determinista: la etiqueta del clasificador local
+            SentimentModel.tiered_stats.record("local_fallback")
+            SENTIMENT_DECISIONS.labels("local_fallback").inc()
+            logger.debug("Using local fallback: %s", local[0])
+            return SentimentLabel(local[0], "local_fallback")
+
         # Fallback to random if inference service fails
         labels = ["positive", "negative", "neutral"]
         random_choice = random.choice(labels)
+        INFERENCE_FALLBACKS.labels("predict").inc()
+        SentimentModel.tiered_stats.record("random_fallback")
+        SENTIMENT_DECISIONS.labels("random_fallback").inc()
         logger.warning(f"Using random fallback: {random_choice}")
-        return random_choice
\ No newline at end of file
+        return SentimentLabel(random_choice, "random_fallback")
+
+    @staticmethod
+    async def analyze_sentiments(texts: List[str]) -> List[str]:
+        """
+        Analiza el sentimiento de varios textos (ver `classify_sentiments`).
+
+        Args:
+            texts (List[str]): Textos a analizar
+
+        Returns:
+            List[SentimentLabel]: Etiquetas de sentimiento (y quién decidió cada una)
+                en el mismo orden que los textos
+        """
+        return [SentimentLabel(label, decision) for label, decision in await SentimentModel.classify_sentiments(texts)]
+
+    @staticmethod
+    async def classify_sentiments(texts: List[str]) -> List[Tuple[str, str]]:
+        """
+        Analiza el sentimiento de varios textos e indica quién decidió cada etiqueta.
+
+        Los textos en los que el clasificador local está seguro se etiquetan en el
+        propio proceso y el resto se envía en una sola petición a /predict_batch.
+        Si la petición falla, cada uno de esos textos recibe la etiqueta local o,
+        si no hay clasificador local, una clasificación aleatoria como respaldo; lo
+        mismo ocurre con los textos a los que el servicio responde con su etiqueta
+        aleatoria (`score` negativo).
+
+        Args:
+            texts (List[str]): Textos a analizar
+
+        Returns:
+            List[Tuple[str, str]]: Etiqueta de sentimiento y origen de la decisión
+                ('local', 'remote', 'local_fallback' o 'random_fallback') de cada
+                texto, en el mismo orden que los textos
+        """
+        if not texts:
+            return []
+        labels: List[Optional[str]] = [None] * len(texts)
+        decisions: List[str] = ["local"] * len(texts)
+        local_predictions: List[Optional[Tuple[str, float]]] = [None] * len(texts)
+        remote: List[int] = []
+        for i, text in enumerate(texts):
+            local_predictions[i], use_local = SentimentModel._local_prediction(text)
+            if use_local:
+                labels[i] = local_predictions[i][0]
+            else:
+                remote.append(i)
+        resolved = len(texts) - len(remote)
+        if resolved:
+            SentimentModel.tiered_stats.record("local", resolved)
+            SENTIMENT_DECISIONS.labels("local").inc(resolved)
+        if not remote:
+            return list(zip(labels, decisions))
+
+        try:
+            texts_with_context = [f"Mi opinión sobre esta película: {texts[i]}" for i in remote]
+            logger.debug("Se manda al modelo un lote de %s textos", len(remote))
+
+            response = await SentimentModel.client.post("/predict_batch", {"texts": texts_with_context})
+            if response.status_code == 200:
+                failed = []
+                for i, prediction in zip(remote, response.json()["predictions"]):
+                    if is_random_prediction(prediction):
+                        failed.append(i)
+                        continue
+                    labels[i], decisions[i] = prediction["label"], "remote"
+                    SentimentModel._record_remote(local_predictions[i], labels[i])
+                if len(failed) < len(remote):
+                    SENTIMENT_DECISIONS.labels("remote").inc(len(remote) - len(failed))
+                if not failed:
+                    return list(zip(labels, decisions))
+                logger.error(f"Inference service returned random labels for {len(failed)} texts (model not available)")
+                remote = failed
+            else:
+                logger.error(f"Inference service returned status {response.status_code}")
+        except CircuitOpenError as e:
+            # El servicio está marcado como caído: se responde al instante con el respaldo
+            logger.debug("Petición rechazada sin llamar al servicio de inferencia: %s", e)
+        except Exception as e:
+            logger.error(f"Error connecting to inference service at {SentimentModel.client.base_url}: {e}")
+
+        if SentimentModel.local_classifier is not None:
+            for i in remote:
+                labels[i], decisions[i] = local_predictions[i][0], "local_fallback"
+            SentimentModel.tiered_stats.record("local_fallback", len(remote))
+            SENTIMENT_DECISIONS.labels("local_fallback").inc(len(remote))
+            logger.debug("Using local fallback for %s texts", len(remote))
+            return list(zip(labels, decisions))
+
+        choices = ["positive", "negative", "neutral"]
+        logger.warning(f"Using random fallback for {len(remote)} texts")
+        INFERENCE_FALLBACKS.labels("predict_batch").inc(len(remote))
+        SentimentModel.tiered_stats.record("random_fallback", len(remote))
+        SENTIMENT_DECISIONS.labels("random_fallback").inc(len(remote))
+        for i in remote:
+            labels[i], decisions[i] = random.choice(choices), "random_fallback"
+        return list(zip(labels, decisions))
+
+    @staticmethod
+    def local_stats() -> dict:
+        """
+        Estado del clasificador local y contadores de las decisiones por niveles.
+        """
+        model = SentimentModel.local_classifier
+        return {
+            "enabled": model is not None,
+            "path": LOCAL_CLASSIFIER_PATH,
+            "threshold": LOCAL_CLASSIFIER_THRESHOLD,
+            "audit_rate": SentimentModel.tiered_stats.audit_rate,
+            "model": {
+                "features": len(model.feature_log_prob),
+                "temperature": model.temperature,
+                **model.metadata
+            } if model else None,
+            **SentimentModel.tiered_stats.stats()
+        }
+
+    @staticmethod
+    async def close():
+        """Libera el pool de conexiones con el servicio de inferencia."""
+        await SentimentModel.client.aclose()
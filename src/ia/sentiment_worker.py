@@ -0,0 +1,199 @@
+"""
+Módulo de análisis de sentimiento en segundo plano.
+
+En el modo asíncrono los comentarios se guardan con sentimiento 'pending' y se
+encolan aquí. Un conjunto de workers vacía la cola por lotes, pide las etiquetas
+al servicio de inferencia con una sola petición por lote y actualiza las filas.
+Los comentarios que solo reciben una etiqueta aleatoria de respaldo no se
+actualizan: siguen como 'pending' y cuentan como fallidos.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlmodel import select, update
+from db import Comment, get_session_context
+from db.sentiment_counts import apply_sentiment_deltas, sentiment_deltas
+from utils import get_logger
+from cache import response_cache, movie_comments_resource
+from .sentiment_analysis import SentimentLabel, SentimentModel
+
+logger = get_logger("sentiment_worker")
+
+# Modo de etiquetado de comentarios: 'sync' (durante la petición) o 'async' (en segundo plano)
+SENTIMENT_MODE = os.getenv("SENTIMENT_MODE", "sync").lower()
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", "2"))
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+
+# Etiqueta con la que se guardan los comentarios pendientes de analizar
+PENDING_SENTIMENT = "pending"
+
+
+class SentimentWorker:
+    """
+    Pool de workers que etiqueta en lotes los comentarios pendientes.
+
+    Cada comentario encolado se registra con el instante en que entró en la cola,
+    lo que permite conocer en todo momento la profundidad de la cola y el retraso
+    (lag) del comentario más antiguo aún sin etiquetar.
+    """
+
+    def __init__(self, workers: int = 2, batch_size: int = 32):
+        """
+        Args:
+            workers (int): Número de tareas que procesan la cola en paralelo
+            batch_size (int): Número máximo de comentarios por lote
+        """
+        if workers < 1 or batch_size < 1:
+            raise ValueError("workers y batch_size deben ser mayores que 0")
+        self.workers = workers
+        self.batch_size = batch_size
+        self.processed = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Comentarios en cola o en proceso -> instante en que se encolaron
+        self._pending: Dict[int, float] = {}
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self):
+        """Arranca los workers y encola los comentarios que quedaron pendientes."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+        pending = await self._load_pending()
+        for comment_id, text in pending:
+            self.enqueue(comment_id, text)
+        logger.info(
+            f"Workers de sentimiento activos: workers={self.workers}, "
+            f"batch_size={self.batch_size}, pendientes={len(pending)}"
+        )
+
+    async def stop(self):
+        """Detiene los workers. Los comentarios sin procesar siguen como 'pending' en la base de datos."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+
+    def enqueue(self, comment_id: int, text: str):
+        """
+        Encola un comentario para etiquetarlo en segundo plano.
+
+        Si los workers no están arrancados el comentario queda como 'pending'
+        y se recuperará de la base de datos en el siguiente arranque.
+
+        Args:
+            comment_id (int): Id del comentario guardado
+            text (str): Texto del comentario
+        """
+        if self._queue is None or comment_id in self._pending:
+            return
+        self._pending[comment_id] = time.monotonic()
+        self._queue.put_nowait((comment_id, text))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado de la cola.
+
+        Returns:
+            dict: Profundidad de la cola, retraso del comentario más antiguo (s)
+                y contadores de comentarios procesados y fallidos
+        """
+        oldest = next(iter(self._pending.values()), None)
+        return {
+            "mode": SENTIMENT_MODE,
+            "running": self.running,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "queue_depth": len(self._pending),
+            "lag_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            "processed": self.processed,
+            "failed": self.failed
+        }
+
+    async def _collect_batch(self) -> List[Tuple[int, str]]:
+        """Espera al primer comentario y recoge los que ya estén en cola hasta llenar el lote."""
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        """Bucle de cada worker: agrupa, etiqueta y guarda."""
+        while True:
+            batch = await self._collect_batch()
+            try:
+                predictions = await SentimentModel.classify_sentiments([text for _, text in batch])
+                # Una etiqueta aleatoria no es un resultado: esos comentarios siguen
+                # como 'pending' y se reintentarán en el próximo arranque
+                results = [
+                    (comment_id, SentimentLabel(label, decision))
+                    for (comment_id, _), (label, decision) in zip(batch, predictions)
+                    if decision != "random_fallback"
+                ]
+                if len(results) < len(batch):
+                    self.failed += len(batch) - len(results)
+                    logger.warning(f"Sin etiqueta para {len(batch) - len(results)} comentarios; siguen pendientes")
+                if results:
+                    await self._store(results)
+                self.processed += len(results)
+                logger.debug("Etiquetados %s comentarios pendientes", len(results))
+            except Exception as e:
+                # Los comentarios siguen como 'pending' y se reintentarán en el próximo arranque
+                self.failed += len(batch)
+                logger.error(f"Error al etiquetar un lote de {len(batch)} comentarios: {e}")
+            finally:
+                for comment_id, _ in batch:
+                    self._pending.pop(comment_id, None)
+
+    @staticmethod
+    async def _load_pending() -> List[Tuple[int, str]]:
+        """Lee de la base de datos los comentarios que siguen pendientes."""
+        async with get_session_context() as session:
+            rows = (await session.exec(
+                select(Comment.id, Comment.text)
+                .where(Comment.sentiment == PENDING_SENTIMENT)
+                .order_by(Comment.id)
+            )).all()
+        return [(comment_id, text) for comment_id, text in rows]
+
+    @staticmethod
+    async def _store(results: List[Tuple[int, str]]):
+        """Guarda las etiquetas de un lote y los contadores de sentimiento en una única transacción."""
+        async with get_session_context() as session:
+            movie_ids = dict((await session.exec(
+                select(Comment.id, Comment.movie_id)
+                .where(Comment.id.in_([comment_id for comment_id, _ in results]))
+            )).all())
+            changes = []
+            for comment_id, label in results:
+                result = await session.exec(
+                    update(Comment)
+                    .where(Comment.id == comment_id, Comment.sentiment == PENDING_SENTIMENT)
+                    .values(sentiment=str(label), sentiment_source=getattr(label, "decision", None))
+                )
+                # Si el comentario ya no estaba pendiente (o se ha borrado) no se toca el contador
+                if result.rowcount:
+                    movie_id = movie_ids[comment_id]
+                    changes += [(movie_id, PENDING_SENTIMENT, -1), (movie_id, label, 1)]
+            await apply_sentiment_deltas(session, sentiment_deltas(changes))
+            await session.commit()
+        # Los comentarios de estas películas ya no están pendientes
+        response_cache.bump(*{movie_comments_resource(movie_id) for movie_id, _, _ in changes})
+
+
+# Instancia compartida por la aplicación
+sentiment_worker = SentimentWorker(workers=SENTIMENT_WORKERS, batch_size=SENTIMENT_BATCH_SIZE)
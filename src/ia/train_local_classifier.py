@@ -0,0 +1,153 @@
+"""
+Entrenamiento fuera de línea del clasificador de sentimiento local.
+
+Lee los comentarios de la tabla `comment` de la base de datos de `DB_URL`
+etiquetados por el modelo del servicio de inferencia (los más recientes primero),
+separa una parte para validación, entrena el naive Bayes, calibra su confianza
+sobre la validación y lo vuelve a entrenar con todos los textos antes de guardarlo.
+
+Solo se usan las filas con `sentiment_source = 'remote'`: las etiquetas puestas
+por el propio clasificador local o al azar mientras el servicio estaba caído
+harían que el modelo aprendiera de su propia salida o de ruido. Los comentarios
+anteriores a esa columna tienen origen desconocido y tampoco se usan. El acuerdo
+entre ambos modelos que se publica en `GET /stats/local-classifier` permite
+vigilar la calidad del modelo entrenado.
+
+Uso (desde la raíz del repositorio):
+
+    PYTHONPATH=src python -m ia.train_local_classifier --limit 200000
+    PYTHONPATH=src python -m ia.train_local_classifier --include-seed --threshold 0.85
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import List, Tuple
+from sqlmodel import select
+from db.bulk import SENTIMENTS
+from db.db import engine
+from db.models import Comment
+from .local_classifier import LocalSentimentClassifier
+from .sentiment_analysis import LOCAL_CLASSIFIER_PATH, LOCAL_CLASSIFIER_THRESHOLD
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "comments.json")
+
+
+async def load_labeled_comments(limit: int) -> List[Tuple[str, str]]:
+    """
+    Devuelve (texto, etiqueta) de los comentarios más recientes etiquetados por el
+    modelo del servicio de inferencia.
+
+    Args:
+        limit (int): Número máximo de comentarios
+    """
+    query = (
+        select(Comment.text, Comment.sentiment)
+        .where(Comment.sentiment.in_(SENTIMENTS), Comment.sentiment_source == "remote")
+        .order_by(Comment.id.desc())
+        .limit(limit)
+    )
+    async with engine.connect() as conn:
+        rows = (await conn.execute(query)).all()
+    await engine.dispose()
+    return [(text, sentiment) for text, sentiment in rows]
+
+
+def load_seed_comments() -> List[Tuple[str, str]]:
+    """Comentarios de ejemplo de `data/comments.json`, útiles con una base de datos casi vacía."""
+    with open(SEED_FILE, encoding="utf-8") as f:
+        return [(text, sentiment) for sentiment, texts in json.load(f).items() for text in texts]
+
+
+def train(samples: List[Tuple[str, str]], args: argparse.Namespace) -> LocalSentimentClassifier:
+    """
+    Entrena, calibra y evalúa el clasificador.
+
+    Returns:
+        LocalSentimentClassifier: Modelo entrenado con todos los textos y la
+            temperatura calibrada sobre la validación
+    """
+    rng = random.Random(args.seed)
+    rng.shuffle(samples)
+    split = int(len(samples) * (1 - args.validation))
+    train_set, validation = samples[:split], samples[split:]
+
+    model = LocalSentimentClassifier.train(
+        [t for t, _ in train_set], [l for _, l in train_set], alpha=args.alpha, min_count=args.min_count,
+        max_features=args.max_features
+    )
+    evaluation = {}
+    if validation:
+        texts, labels = [t for t, _ in validation], [l for _, l in validation]
+        model.calibrate(texts, labels)
+        evaluation = model.evaluate(texts, labels, args.threshold)
+
+    final = LocalSentimentClassifier.train(
+        [t for t, _ in samples], [l for _, l in samples], alpha=args.alpha, min_count=args.min_count,
+        max_features=args.max_features
+    )
+    final.temperature = model.temperature
+    final.metadata.update({
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "validation_size": len(validation),
+        "validation_threshold": args.threshold,
+        **{f"validation_{key}": value for key, value in evaluation.items()}
+    })
+    return final
+
+
+async def main(args: argparse.Namespace):
+    samples = await load_labeled_comments(args.limit)
+    print(f"Comentarios etiquetados por el servicio de inferencia en la base de datos: {len(samples)}")
+    if args.include_seed:
+        samples += load_seed_comments()
+
+    start = time.perf_counter()
+    try:
+        model = train(samples, args)
+    except ValueError as e:
+        raise SystemExit(f"No se puede entrenar: {e}")
+    print(f"Entrenado con {len(samples)} textos y {len(model.feature_log_prob)} características "
+          f"en {time.perf_counter() - start:.1f}s (temperatura {model.temperature})")
+    metadata = model.metadata
+    if metadata.get("validation_size"):
+        print(
+            f"Validación ({metadata['validation_size']} textos): precisión {metadata['validation_accuracy']}, "
+            f"con confianza >= {args.threshold}: cobertura {metadata['validation_coverage']} "
+            f"y precisión {metadata['validation_confident_accuracy']}"
+        )
+
+    texts = [text for text, _ in samples[:1000]]
+    start = time.perf_counter()
+    for text in texts:
+        model.predict(text)
+    print(f"Tiempo medio por predicción: {(time.perf_counter() - start) / len(texts) * 1e6:.0f} µs")
+
+    model.save(args.output)
+    print(f"Modelo guardado en {args.output}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de sentimiento local con la tabla comment")
+    parser.add_argument("--output", default=LOCAL_CLASSIFIER_PATH or os.path.join("models", "local_sentiment.json"),
+                        help="Fichero donde se guarda el modelo")
+    parser.add_argument("--limit", type=int, default=200000, help="Comentarios más recientes que se usan")
+    parser.add_argument("--include-seed", action="store_true", help="Añade los ejemplos de data/comments.json")
+    parser.add_argument("--validation", type=float, default=0.1, help="Proporción reservada para validación")
+    parser.add_argument("--threshold", type=float, default=LOCAL_CLASSIFIER_THRESHOLD,
+                        help="Umbral de confianza con el que se evalúa la validación")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Suavizado de Laplace")
+    parser.add_argument("--min-count", type=int, default=2, help="Apariciones mínimas de cada característica")
+    parser.add_argument("--max-features", type=int, default=50000, help="Número máximo de características")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de la separación en validación")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if not 0 <= arguments.validation < 1:
+        raise SystemExit("--validation debe estar entre 0 y 1")
+    asyncio.run(main(arguments))
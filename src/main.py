@@ -1,9 +1,12 @@
 import os
-from utils import get_logger
+from utils import get_logger, MetricsMiddleware, SQLProfilerMiddleware, render_metrics
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from db import get_session, create_db_and_tables, drop_db_and_tables, seed_default_data
-from routers import user_router, movie_router, comment_router, auth_router
+from fastapi import FastAPI, Response
+from db import engine, get_session, create_db_and_tables, drop_db_and_tables, run_migrations, seed_default_data
+from routers import user_router, movie_router, comment_router, comment_bulk_router, auth_router, stats_router
+from ia import SentimentModel, sentiment_worker, SENTIMENT_MODE
+from search import build_title_index
+from auth import password_hasher
 
 
 # Obtener logger configurado para la aplicación principal
@@ -27,25 +30,39 @@ async def lifespan(app: FastAPI):
         if os.getenv("ENVIRONMENT", "prod").lower() == "dev":
             logger.warning("Perfil de desarrollo detectado: recreando tablas y datos")
             # En desarrollo: borrar tablas primero (para usar descomentar), luego crearlas de nuevo y cargar datos
-            # drop_db_and_tables()
-            create_db_and_tables()
+            # await drop_db_and_tables()
+            await create_db_and_tables()
+            await run_migrations()
             # Cargar los datos predeterminados en modo dev
-            seed_default_data()
+            await seed_default_data()
             logger.info("Base de datos reinicializada correctamente para desarrollo")
         else:
             logger.info("Perfil de producción detectado: manteniendo datos existentes")
             # En producción solo garantizamos que existan las tablas, pero no modificamos datos
-            create_db_and_tables()
+            await create_db_and_tables()
+            # Las tablas existentes se actualizan mediante migraciones versionadas
+            await run_migrations()
             logger.info("Base de datos verificada correctamente para producción")
         
     except Exception as e:
         logger.error(f"Error al inicializar la base de datos: {str(e)}")
         raise
     
+    # Construir el índice de búsqueda de títulos a partir de la tabla movie
+    logger.info(f"Índice de títulos listo: {await build_title_index()} películas")
+    
+    # En modo asíncrono los comentarios se etiquetan en segundo plano
+    if SENTIMENT_MODE == "async":
+        await sentiment_worker.start()
+    
     yield
     
     # Tareas de limpieza al cerrar la app
     logger.info("Aplicación terminando...")
+    await sentiment_worker.stop()
+    await engine.dispose()
+    await SentimentModel.close()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Movies API",
@@ -53,11 +70,17 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+# Latencia, peticiones en curso y sentencias SQL por ruta (ver GET /metrics)
+app.add_middleware(MetricsMiddleware)
+# Sentencias SQL por petición: cabecera Server-Timing y GET /stats/slow-requests
+app.add_middleware(SQLProfilerMiddleware)
 # Incluir todos los routers directamente desde los controladores
 app.include_router(user_router)
 app.include_router(movie_router)
 app.include_router(comment_router)
+app.include_router(comment_bulk_router)
 app.include_router(auth_router)
+app.include_router(stats_router)
 
 @app.get("/")
 async def root():
@@ -74,3 +97,11 @@ async def root():
             "/login"
         ]
     }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Endpoint con las métricas de ejecución en formato de texto de Prometheus.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -7,14 +7,16 @@ de la API, separando las rutas por recursos.
 Módulos:
 - user_router: Endpoints relacionados con usuarios
 - movie_router: Endpoints relacionados con películas 
-- comment_router: Endpoints relacionados con comentarios
+- comment_router: Endpoints relacionados con comentarios (y su carga masiva)
 - auth_router: Endpoints relacionados con autenticación
+- stats_router: Endpoints con estadísticas internas del servicio
 """
 
 from .user_router import user_router
 from .movie_router import movie_router
-from .comment_router import comment_router
+from .comment_router import comment_router, comment_bulk_router
 from .auth_router import auth_router
+from .stats_router import stats_router
 
 # Para acceso directo desde routers.*
-__all__ = ['user_router', 'movie_router', 'comment_router', 'auth_router']
\ No newline at end of file
+__all__ = ['user_router', 'movie_router', 'comment_router', 'comment_bulk_router', 'auth_router', 'stats_router']
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Any
 from db import get_session
 from controlers import AuthController, LoginRequest
@@ -19,7 +19,7 @@ auth_router = APIRouter(
     El token incluye información básica del usuario como su ID y nombre de usuario.
     """
 )
-async def login(login_data: LoginRequest, db: Session = Depends(get_session)) -> dict[str, Any]:
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_session)) -> dict[str, Any]:
     """
     Endpoint de autenticación que valida las credenciales y devuelve un token JWT.
     """
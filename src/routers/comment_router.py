@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, Query, Request, Response
+from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
 from db import get_session
-from controlers import CommentController, CommentCreate, CommentResponse
+from controlers import CommentController, CommentCreate, CommentResponse, BulkCommentResult
+from controlers.comment_controller import decode_body
+from controlers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from auth import authenticator
+from cache import response_cache, movie_resource, movie_comments_resource
 
 # Crear router para comentarios
 comment_router = APIRouter(
@@ -11,6 +15,12 @@ comment_router = APIRouter(
     responses={404: {"description": "Movie or User not found"}}
 )
 
+# Carga masiva: las películas de cada comentario van en el propio registro
+comment_bulk_router = APIRouter(
+    prefix="/comments",
+    tags=["comments"]
+)
+
 @comment_router.get(
     "/{id}/comments",
     summary="Obtener comentarios de una película",
@@ -18,14 +28,27 @@ comment_router = APIRouter(
     Devuelve una lista con todos los comentarios asociados a la película con el id especificado.
     
     Incluye información del usuario que realizó cada comentario y el análisis de sentimiento.
+
+    Los resultados se devuelven paginados por cursor (keyset). El parámetro `limit` fija el
+    tamaño de página y, si hay más resultados, la cabecera `X-Next-Cursor` contiene el valor
+    que debe enviarse en el parámetro `cursor` para obtener la página siguiente.
     """,
     response_model=list[CommentResponse]
 )
-def get_comments_by_movie(id: int, db: Session = Depends(get_session)):
+async def get_comments_by_movie(
+    id: int,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_session)
+):
     """
-    Devuelve una lista con todos los comentarios de la película con el id especificado.
+    Devuelve una página de los comentarios de la película con el id especificado.
     """
-    return CommentController.get_comments_by_movie(id, db)
+    return await response_cache.serve(
+        request, [movie_resource(id), movie_comments_resource(id)],
+        lambda response: CommentController.get_comments_by_movie(id, db, response, limit, cursor)
+    )
 
 @comment_router.post(
     "/{id}/comments", 
@@ -38,16 +61,55 @@ def get_comments_by_movie(id: int, db: Session = Depends(get_session)):
     El comentario debe contener un texto y el ID del usuario que lo realiza.
     El sistema analizará automáticamente el sentimiento del comentario utilizando
     un modelo de aprendizaje automático para clasificarlo como positivo, negativo o neutro.
+    
+    Si el servicio está configurado en modo asíncrono, el comentario se guarda con
+    sentimiento 'pending', se responde con 202 y el sentimiento se calcula en segundo plano.
     """,
-    response_model=CommentResponse
+    response_model=CommentResponse,
+    responses={202: {"description": "Comment stored, sentiment pending"}}
 )
 async def add_comment(
     id: int, 
     comment: CommentCreate, 
-    db: Session = Depends(get_session),
+    response: Response,
+    db: AsyncSession = Depends(get_session),
     auth: dict = Depends(authenticator)
 ) -> CommentResponse:
     """
     Añade un nuevo comentario a la película con el id especificado.
     """
-    return await CommentController.add_comment(id, comment, db, auth)
\ No newline at end of file
+    return await CommentController.add_comment(id, comment, db, auth, response)
+
+@comment_bulk_router.post(
+    "/bulk",
+    summary="Carga masiva de comentarios (NDJSON)",
+    description="""
+    Añade muchos comentarios en una sola petición autenticada.
+
+    El cuerpo es NDJSON (`application/x-ndjson`): un objeto JSON por línea con
+    `movie_id`, `user_id` y `text`. Se lee en streaming, así que admite millones de
+    registros, y puede enviarse comprimido con `Content-Encoding: gzip`. El cuerpo
+    descomprimido no puede superar `BULK_MAX_BODY_BYTES` bytes.
+
+    Los registros se validan, etiquetan e insertan por bloques: las películas y los
+    usuarios se comprueban con una consulta por bloque, el sentimiento se calcula en
+    lotes y cada bloque se guarda con un INSERT de varias filas en su propia transacción.
+    Los registros inválidos no detienen la carga y se devuelven con su número de línea.
+    """,
+    response_model=BulkCommentResult,
+    responses={
+        400: {"description": "Invalid gzip body"},
+        413: {"description": "Body too large"},
+        415: {"description": "Unsupported Content-Encoding"}
+    }
+)
+async def bulk_add_comments(
+    request: Request,
+    db: AsyncSession = Depends(get_session),
+    auth: dict = Depends(authenticator)
+) -> BulkCommentResult:
+    """
+    Añade los comentarios de un cuerpo NDJSON y devuelve el resumen de la carga.
+    """
+    body = decode_body(request.stream(), request.headers.get("content-encoding"))
+    return await CommentController.bulk_add_comments(body, db)
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session
-from typing import Any
+from fastapi import APIRouter, Depends, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, Optional
 from db import get_session
 from auth import authenticator
 from controlers import MovieController, MovieCreate
+from controlers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from cache import response_cache, MOVIES_RESOURCE, movie_resource, movie_comments_resource
 
 # Crear router para películas
 movie_router = APIRouter(
@@ -18,13 +20,25 @@ movie_router = APIRouter(
     description="""
     Devuelve una lista con todas las películas registradas en la base de datos.
     Por motivos de eficiencia, solo se incluyen los campos id y título en la respuesta.
+
+    Los resultados se devuelven paginados por cursor (keyset). El parámetro `limit` fija el
+    tamaño de página y, si hay más resultados, la cabecera `X-Next-Cursor` contiene el valor
+    que debe enviarse en el parámetro `cursor` para obtener la página siguiente.
     """
 )
-def list_movies(db: Session = Depends(get_session)) -> list[dict[str, Any]]:
+async def list_movies(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_session)
+) -> list[dict[str, Any]]:
     """
-    Devuelve una lista con todas las películas registradas en la base de datos.
+    Devuelve una página de las películas registradas en la base de datos.
     """
-    return MovieController.list_movies(db)
+    return await response_cache.serve(
+        request, [MOVIES_RESOURCE],
+        lambda response: MovieController.list_movies(db, response, limit, cursor)
+    )
 
 @movie_router.get(
     "/search",
@@ -34,13 +48,20 @@ def list_movies(db: Session = Depends(get_session)) -> list[dict[str, Any]]:
     
     La búsqueda es insensible a mayúsculas/minúsculas y busca coincidencias parciales.
     Por ejemplo, buscar "star" encontrará "Star Wars", "Starship Troopers", etc.
+
+    Por defecto se devuelven todas las coincidencias; el parámetro opcional `limit` fija
+    el número máximo de resultados.
     """
 )
-def search_movies(title: str = Query(...), db: Session = Depends(get_session)) -> list[dict[str, Any]]:
+async def search_movies(
+    title: str = Query(...),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session)
+) -> list[dict[str, Any]]:
     """
     Busca películas por título.
     """
-    return MovieController.search_movies(title, db)
+    return await MovieController.search_movies(title, db, limit)
 
 @movie_router.get(
     "/{id}",
@@ -51,11 +72,35 @@ def search_movies(title: str = Query(...), db: Session = Depends(get_session)) -
     Incluye información como título, director, año y género.
     """
 )
-def get_movie(id: int, db: Session = Depends(get_session)) -> dict[str, Any]:
+async def get_movie(id: int, request: Request, db: AsyncSession = Depends(get_session)) -> dict[str, Any]:
     """
     Devuelve los datos de la película con el id especificado.
     """
-    return MovieController.get_movie(id, db)
+    return await response_cache.serve(
+        request, [movie_resource(id)],
+        lambda response: MovieController.get_movie(id, db)
+    )
+
+@movie_router.get(
+    "/{id}/sentiment",
+    summary="Resumen de sentimiento de una película",
+    description="""
+    Devuelve cuántos comentarios de la película son positivos, negativos y neutros,
+    cuántos están pendientes de analizar y la proporción de cada sentimiento sobre
+    los comentarios ya etiquetados.
+    
+    El resumen se lee de una tabla de contadores que se actualiza junto con los
+    comentarios, por lo que su coste no depende del número de comentarios.
+    """
+)
+async def get_movie_sentiment(id: int, request: Request, db: AsyncSession = Depends(get_session)) -> dict[str, Any]:
+    """
+    Devuelve el resumen de sentimiento de los comentarios de la película.
+    """
+    return await response_cache.serve(
+        request, [movie_resource(id), movie_comments_resource(id)],
+        lambda response: MovieController.get_movie_sentiment(id, db)
+    )
 
 @movie_router.post(
     "", 
@@ -71,7 +116,7 @@ def get_movie(id: int, db: Session = Depends(get_session)) -> dict[str, Any]:
 )
 async def create_movie(
     movie: MovieCreate, 
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_session),
     _: dict = Depends(authenticator)
 ) -> dict[str, Any]:
     """
@@ -92,7 +137,7 @@ async def create_movie(
 )
 async def delete_movie(
     id: int, 
-    db: Session = Depends(get_session),
+    db: AsyncSession = Depends(get_session),
     _: dict = Depends(authenticator)
 ) -> dict[str, str]:
     """
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Any
+from auth import authenticator
+from controlers import StatsController
+
+# Crear router para las estadísticas internas del servicio
+stats_router = APIRouter(
+    prefix="/stats",
+    tags=["stats"]
+)
+
+@stats_router.get(
+    "/sentiment",
+    summary="Estado del análisis de sentimiento en segundo plano",
+    description="""
+    Devuelve el estado de la cola de comentarios pendientes de analizar.
+    
+    Incluye el modo de etiquetado, el número de comentarios en cola (`queue_depth`),
+    el retraso en segundos del comentario más antiguo (`lag_seconds`) y los contadores
+    de comentarios procesados y fallidos.
+    """
+)
+async def get_sentiment_stats() -> dict[str, Any]:
+    """
+    Devuelve el estado del análisis de sentimiento en segundo plano.
+    """
+    return StatsController.get_sentiment_stats()
+
+@stats_router.get(
+    "/passwords",
+    summary="Estado del pool de hash de contraseñas",
+    description="""
+    Devuelve la configuración del pool de bcrypt (factor de trabajo, hilos y cola máxima),
+    las operaciones en curso y en cola, las rechazadas por saturación (`rejected`) y,
+    para `hash` y `verify`, el número de operaciones y sus latencias recientes en milisegundos.
+    """
+)
+async def get_password_stats() -> dict[str, Any]:
+    """
+    Devuelve la ocupación y las latencias del pool de bcrypt.
+    """
+    return StatsController.get_password_stats()
+
+@stats_router.get(
+    "/tokens",
+    summary="Estado de la caché de tokens JWT",
+    description="""
+    Devuelve el tamaño de la caché de tokens ya verificados y sus contadores de aciertos,
+    fallos, expulsiones por tamaño, entradas caducadas y vaciados por rotación de la clave.
+    """
+)
+async def get_token_cache_stats() -> dict[str, Any]:
+    """
+    Devuelve los contadores de la caché de tokens JWT verificados.
+    """
+    return StatsController.get_token_cache_stats()
+
+@stats_router.get(
+    "/responses",
+    summary="Estado de la caché de respuestas HTTP",
+    description="""
+    Devuelve el tamaño de la caché de respuestas de los endpoints de lectura, el número de
+    recursos con versión, los aciertos y fallos, las respuestas 304 (`not_modified`), las
+    expulsiones por tamaño y las invalidaciones provocadas por escrituras.
+    """
+)
+async def get_response_cache_stats() -> dict[str, Any]:
+    """
+    Devuelve los contadores de la caché de respuestas HTTP.
+    """
+    return StatsController.get_response_cache_stats()
+
+@stats_router.get(
+    "/slow-requests",
+    summary="Peticiones recientes más lentas y su SQL",
+    description="""
+    Devuelve las peticiones recientes más lentas con su duración, el tiempo pasado en la
+    base de datos, el número de sentencias SQL y las sentencias más repetidas.
+    
+    Las peticiones en las que una misma sentencia se repite más de `repeat_threshold`
+    veces se marcan con `n_plus_one` y generan un aviso en el log.
+
+    Requiere autenticación: las sentencias incluyen la estructura de las consultas.
+    """
+)
+async def get_slow_requests(
+    limit: int = Query(20, ge=1, le=200, description="Número de peticiones a devolver"),
+    _: dict = Depends(authenticator)
+) -> dict[str, Any]:
+    """
+    Devuelve las peticiones recientes más lentas con sus estadísticas de SQL.
+    """
+    return StatsController.get_slow_requests(limit)
+
+@stats_router.get(
+    "/inference-circuit",
+    summary="Estado del circuit breaker del servicio de inferencia",
+    description="""
+    Devuelve el estado del circuit breaker de las llamadas al servicio de inferencia
+    (`closed`, `open` o `half_open`), los fallos consecutivos, el umbral y el tiempo de
+    enfriamiento configurados, los segundos que faltan para la siguiente sonda y los
+    contadores de aperturas, llamadas rechazadas y sondas.
+    """
+)
+async def get_inference_circuit_stats() -> dict[str, Any]:
+    """
+    Devuelve el estado del circuit breaker del servicio de inferencia.
+    """
+    return StatsController.get_inference_circuit_stats()
+
+@stats_router.get(
+    "/local-classifier",
+    summary="Clasificador de sentimiento local y escalado al servicio de inferencia",
+    description="""
+    Devuelve si el clasificador local está cargado, el umbral de confianza, los datos
+    de su entrenamiento y cuántos textos ha etiquetado él solo, cuántos se han escalado
+    al servicio de inferencia, cuántos se han auditado y cuántos han usado un respaldo.
+    
+    Incluye la tasa de escalado y el acuerdo entre el clasificador local y el servicio
+    para los textos seguros (auditados) y los dudosos (escalados).
+    """
+)
+async def get_local_classifier_stats() -> dict[str, Any]:
+    """
+    Devuelve el estado del clasificador local y las tasas de escalado y acuerdo.
+    """
+    return StatsController.get_local_classifier_stats()
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, Query, Response
+from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
 from db import get_session
 from controlers import UserController, UserResponse, UserCreate
-from auth import hash_password
+from controlers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from auth import password_hasher
 
 # Crear router para usuarios
 user_router = APIRouter(
@@ -18,10 +20,19 @@ user_router = APIRouter(
     description="""
     Devuelve una lista con todos los usuarios registrados en la base de datos.
     Solo se incluyen los campos id y username por razones de seguridad y privacidad.
+
+    Los resultados se devuelven paginados por cursor (keyset). El parámetro `limit` fija el
+    tamaño de página y, si hay más resultados, la cabecera `X-Next-Cursor` contiene el valor
+    que debe enviarse en el parámetro `cursor` para obtener la página siguiente.
     """
 )
-def list_users(db: Session = Depends(get_session)):
-    return UserController.list_users(db)
+async def list_users(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_session)
+):
+    return await UserController.list_users(db, response, limit, cursor)
 
 @user_router.get(
     "/{id}",
@@ -32,8 +43,8 @@ def list_users(db: Session = Depends(get_session)):
     Incluye información como el nombre de usuario y correo electrónico, pero no la contraseña.
     """
 )
-def get_user(id: int, db: Session = Depends(get_session)):
-    return UserController.get_user(id, db)
+async def get_user(id: int, db: AsyncSession = Depends(get_session)):
+    return await UserController.get_user(id, db)
 
 @user_router.post(
     "",
@@ -46,8 +57,8 @@ def get_user(id: int, db: Session = Depends(get_session)):
     Comprueba que el nombre de usuario no exista previamente en el sistema.
     """
 )
-def create_user(user_data: UserCreate, db: Session = Depends(get_session)):
-    return UserController.create_user(user_data, db, hash_password)
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_session)):
+    return await UserController.create_user(user_data, db, password_hasher.hash)
 
 @user_router.get(
     "/{id}/comments",
@@ -55,7 +66,17 @@ def create_user(user_data: UserCreate, db: Session = Depends(get_session)):
     description="""
     Devuelve una lista con todos los comentarios realizados por el usuario con el id especificado.
     Incluye información tanto del comentario como de la película a la que se refiere.
+
+    Los resultados se devuelven paginados por cursor (keyset). El parámetro `limit` fija el
+    tamaño de página y, si hay más resultados, la cabecera `X-Next-Cursor` contiene el valor
+    que debe enviarse en el parámetro `cursor` para obtener la página siguiente.
     """
 )
-def get_comments_by_user(id: int, db: Session = Depends(get_session)):
-    return UserController.get_comments_by_user(id, db)
\ No newline at end of file
+async def get_comments_by_user(
+    id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_session)
+):
+    return await UserController.get_comments_by_user(id, db, response, limit, cursor)
\ No newline at end of file
@@ -0,0 +1,10 @@
+"""
+Paquete de búsqueda de la aplicación.
+
+Contiene el índice de trigramas que resuelve las búsquedas de películas por
+subcadena del título sin recorrer la tabla completa.
+"""
+
+from .trigram_index import NGRAM_SIZE, TrigramIndex, title_index, build_title_index
+
+__all__ = ['NGRAM_SIZE', 'TrigramIndex', 'title_index', 'build_title_index']
\ No newline at end of file
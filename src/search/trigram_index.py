@@ -0,0 +1,185 @@
+"""
+Índice de trigramas en memoria para buscar películas por título.
+
+Un `LIKE '%texto%'` con comodín inicial obliga a la base de datos a recorrer la
+tabla entera. Este índice guarda, para cada trigrama (secuencia de 3 caracteres)
+de los títulos en minúsculas, el conjunto de películas que lo contienen. Una
+búsqueda intersecta los conjuntos de los trigramas de la consulta, empezando
+por el más pequeño, y solo comprueba la subcadena sobre esos candidatos.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlmodel import select
+from db import Movie, get_session_context
+from utils import get_logger
+
+logger = get_logger("trigram_index")
+
+# Longitud de los n-gramas indexados
+NGRAM_SIZE = 3
+
+
+def _normalize(text: str) -> str:
+    """Pasa el texto a minúsculas, igual que la comparación sin distinción de mayúsculas."""
+    return text.lower()
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Devuelve los trigramas distintos de un texto ya normalizado."""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas sobre los títulos de las películas.
+
+    El índice se reconstruye completo al arrancar (`rebuild`) y se mantiene
+    incrementalmente con `add` y `remove`. Hasta que se construye por primera
+    vez `ready` es False y las búsquedas deben resolverse en la base de datos.
+    """
+
+    def __init__(self):
+        self._titles: Dict[int, str] = {}
+        self._normalized: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def rebuild(self, movies: Iterable[Tuple[int, str]]):
+        """
+        Sustituye el contenido del índice por las películas indicadas.
+
+        Args:
+            movies (Iterable): Pares (id, título)
+        """
+        titles: Dict[int, str] = {}
+        normalized: Dict[int, str] = {}
+        postings: Dict[str, Set[int]] = {}
+        for movie_id, title in movies:
+            titles[movie_id] = title
+            normalized[movie_id] = _normalize(title)
+            for trigram in _trigrams(normalized[movie_id]):
+                postings.setdefault(trigram, set()).add(movie_id)
+        with self._lock:
+            self._titles, self._normalized, self._postings = titles, normalized, postings
+            self.ready = True
+        logger.info(f"Índice de títulos construido con {len(titles)} películas y {len(postings)} trigramas")
+
+    def add(self, movie_id: int, title: str):
+        """
+        Añade (o actualiza) una película en el índice.
+
+        Args:
+            movie_id (int): Id de la película
+            title (str): Título de la película
+        """
+        with self._lock:
+            self._remove_locked(movie_id)
+            self._titles[movie_id] = title
+            self._normalized[movie_id] = _normalize(title)
+            for trigram in _trigrams(self._normalized[movie_id]):
+                self._postings.setdefault(trigram, set()).add(movie_id)
+
+    def remove(self, movie_id: int):
+        """
+        Elimina una película del índice.
+
+        Args:
+            movie_id (int): Id de la película
+        """
+        with self._lock:
+            self._remove_locked(movie_id)
+
+    def _remove_locked(self, movie_id: int):
+        normalized = self._normalized.pop(movie_id, None)
+        if normalized is None:
+            return
+        del self._titles[movie_id]
+        for trigram in _trigrams(normalized):
+            ids = self._postings.get(trigram)
+            if ids is not None:
+                ids.discard(movie_id)
+                if not ids:
+                    del self._postings[trigram]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Busca las películas cuyo título contiene la consulta, sin distinguir mayúsculas.
+
+        Los resultados se ordenan por relevancia: título idéntico, título que empieza
+        por la consulta, consulta al inicio de una palabra y, por último, cualquier
+        otra posición; a igualdad, primero la coincidencia más temprana y el título
+        más corto.
+
+        Args:
+            query (str): Texto a buscar
+            limit (int, optional): Número máximo de resultados
+
+        Returns:
+            List[Tuple[int, str]]: Pares (id, título) ordenados por relevancia
+        """
+        needle = _normalize(query)
+        with self._lock:
+            if len(needle) < NGRAM_SIZE:
+                # Consultas muy cortas: no hay trigramas, se comprueban todos los títulos
+                candidates: Iterable[int] = list(self._normalized)
+            else:
+                postings = sorted(
+                    (self._postings.get(trigram, set()) for trigram in _trigrams(needle)),
+                    key=len
+                )
+                candidates = set(postings[0])
+                for ids in postings[1:]:
+                    if not candidates:
+                        break
+                    candidates &= ids
+            matches = []
+            for movie_id in candidates:
+                normalized = self._normalized[movie_id]
+                position = normalized.find(needle)
+                if position < 0:
+                    continue
+                if normalized == needle:
+                    rank = 0
+                elif position == 0:
+                    rank = 1
+                elif not normalized[position - 1].isalnum():
+                    rank = 2
+                else:
+                    rank = 3
+                matches.append((rank, position, len(normalized), movie_id, self._titles[movie_id]))
+        matches.sort()
+        if limit is not None:
+            matches = matches[:limit]
+        return [(movie_id, title) for _, _, _, movie_id, title in matches]
+
+
+async def build_title_index(batch_size: int = 10000) -> int:
+    """
+    Reconstruye el índice compartido a partir de la tabla `movie`.
+
+    Las filas se leen por bloques para no cargar toda la tabla de golpe.
+
+    Args:
+        batch_size (int): Filas leídas por bloque
+
+    Returns:
+        int: Número de películas indexadas
+    """
+    movies = []
+    async with get_session_context() as session:
+        result = await session.stream(
+            select(Movie.id, Movie.title).execution_options(yield_per=batch_size)
+        )
+        async for movie_id, title in result:
+            movies.append((movie_id, title))
+    title_index.rebuild(movies)
+    return len(title_index)
+
+
+# Instancia compartida por la aplicación
+title_index = TrigramIndex()
@@ -5,6 +5,16 @@ Este paquete contiene funciones y clases de utilidad
 que pueden ser usadas en diferentes partes de la aplicación.
 """
 
-from .logger import get_logger
+from .logger import get_logger, shutdown_logging, dropped_records
+from .metrics import (
+    MetricsMiddleware, render_metrics, INFERENCE_FALLBACKS, CIRCUIT_STATE, CIRCUIT_REJECTIONS,
+    SENTIMENT_DECISIONS, BULK_COMMENT_RECORDS
+)
+from .sql_profiler import SQLProfiler, SQLProfilerMiddleware, sql_profiler
 
-__all__ = ['get_logger']
\ No newline at end of file
+__all__ = [
+    'get_logger', 'shutdown_logging', 'dropped_records',
+    'MetricsMiddleware', 'render_metrics', 'INFERENCE_FALLBACKS',
+    'CIRCUIT_STATE', 'CIRCUIT_REJECTIONS', 'SENTIMENT_DECISIONS', 'BULK_COMMENT_RECORDS',
+    'SQLProfiler', 'SQLProfilerMiddleware', 'sql_profiler'
+]
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Métricas de ejecución en formato Prometheus.
+
+Las métricas se registran en el registro global de `prometheus_client` y se
+publican en `GET /metrics`. Se recogen:
+
+- Latencia por ruta y peticiones en curso (middleware `MetricsMiddleware`). La
+  ruta se etiqueta con su plantilla (`/movies/{id}`) para que el número de series
+  no crezca con los identificadores.
+- Sentencias SQL ejecutadas durante cada petición.
+- Checkouts del pool de conexiones, conexiones en uso y tiempo de espera para
+  obtener una conexión (desde que una sesión la necesita hasta que la tiene).
+- Predicciones aleatorias de respaldo cuando falla el servicio de inferencia y
+  textos etiquetados por el clasificador local, por el servicio o por un respaldo.
+- Estado de los circuit breakers y llamadas rechazadas con el circuito abierto.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from starlette.routing import Match
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso",
+    ["method", "route"]
+)
+SQL_STATEMENTS_PER_REQUEST = Histogram(
+    "sql_statements_per_request",
+    "Sentencias SQL ejecutadas por petición",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "Conexiones obtenidas del pool"
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Conexiones del pool en uso"
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tiempo de espera para obtener una conexión del pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+INFERENCE_FALLBACKS = Counter(
+    "inference_random_fallback_total",
+    "Textos etiquetados al azar porque el servicio de inferencia no respondió",
+    ["endpoint"]
+)
+SENTIMENT_DECISIONS = Counter(
+    "sentiment_decisions_total",
+    "Textos etiquetados según quién decidió la etiqueta: local, remote, local_fallback o random_fallback",
+    ["path"]
+)
+BULK_COMMENT_RECORDS = Counter(
+    "bulk_comment_records_total",
+    "Registros de la carga masiva de comentarios: inserted o rejected",
+    ["result"]
+)
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Estado del circuit breaker: 0 cerrado, 1 semiabierto, 2 abierto",
+    ["name"]
+)
+CIRCUIT_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total",
+    "Llamadas rechazadas sin intentarlas porque el circuito estaba abierto",
+    ["name"]
+)
+
+# Ruta con la que se etiquetan las peticiones que no coinciden con ningún endpoint
+UNMATCHED_ROUTE = "unmatched"
+
+# Contador de sentencias de la petición en curso (lista mutable para compartirlo
+# con los hilos y greenlets en los que SQLAlchemy ejecuta las sentencias)
+_request_statements: ContextVar[Optional[List[int]]] = ContextVar("request_statements", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@event.listens_for(Pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKOUTS.inc()
+    DB_POOL_IN_USE.inc()
+
+
+@event.listens_for(Pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_IN_USE.dec()
+
+
+# Clave de `Session.info` con el momento en que la sesión empezó a necesitar una conexión
+_POOL_WAIT_START = "pool_wait_start"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _statement_needs_connection(orm_execute_state):
+    orm_execute_state.session.info[_POOL_WAIT_START] = time.perf_counter()
+
+
+@event.listens_for(Session, "before_flush")
+def _flush_needs_connection(session, flush_context, instances):
+    session.info[_POOL_WAIT_START] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _connection_acquired(session, transaction, connection):
+    # La sesión solo obtiene una conexión del pool al empezar cada transacción, justo
+    # después de la sentencia o del flush que la necesitan: la diferencia es la espera
+    # por una conexión libre (o su apertura)
+    start = session.info.pop(_POOL_WAIT_START, None)
+    if start is not None:
+        DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _transaction_ended(session, transaction):
+    # Las sentencias dentro de una transacción ya abierta no piden conexión
+    session.info.pop(_POOL_WAIT_START, None)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia, las peticiones en curso y las sentencias
+    SQL de cada petición HTTP.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        statements = [0]
+        token = _request_statements.set(statements)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        # Se resuelve antes que el router para etiquetar también las peticiones en curso
+        route = route_template(scope)
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        start = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            _request_statements.reset(token)
+            REQUEST_LATENCY.labels(method, route, str(status["code"])).observe(time.perf_counter() - start)
+            SQL_STATEMENTS_PER_REQUEST.labels(route).observe(statements[0])
+
+
+def route_template(scope) -> str:
+    """
+    Devuelve la plantilla de la ruta que atiende la petición (p. ej. `/movies/{id}`).
+
+    Recorre las rutas de la aplicación en el mismo orden que el router: la primera
+    que coincide por completo o, si ninguna lo hace, la primera que coincide en la
+    ruta pero no en el método (la que responde 405).
+    """
+    route = scope.get("route")
+    if route is None and "app" in scope:
+        partial = None
+        for candidate in scope["app"].router.routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+            if match == Match.PARTIAL and partial is None:
+                partial = candidate
+        else:
+            route = partial
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def render_metrics():
+    """
+    Serializa todas las métricas registradas.
+
+    Returns:
+        tuple: Cuerpo en formato de texto de Prometheus y su content type
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,225 @@
+"""
+Perfilado de las sentencias SQL de cada petición.
+
+Mientras se atiende una petición, los eventos de SQLAlchemy registran cada
+sentencia ejecutada (en cualquier engine): cuántas hay, cuánto tiempo se pasa en
+la base de datos y cuántas veces se repite cada "forma" de sentencia (el SQL con
+los valores literales y las listas de parámetros normalizados).
+
+- La respuesta lleva una cabecera `Server-Timing` con el tiempo de base de datos,
+  el número de sentencias y el tiempo total hasta empezar a responder.
+- Si una misma forma se repite más de `SQL_REPEAT_THRESHOLD` veces en una petición
+  se registra un aviso: es el síntoma típico de un bucle N+1 (una consulta por
+  cada fila de una consulta anterior).
+- Las últimas `SQL_PROFILER_HISTORY` peticiones se guardan en memoria y
+  `GET /stats/slow-requests` devuelve las más lentas.
+
+Variables de entorno:
+    - SQL_PROFILER: 0 para desactivar el perfilado (por defecto activo)
+    - SQL_REPEAT_THRESHOLD: repeticiones de una forma a partir de las que se avisa
+    - SQL_PROFILER_HISTORY: peticiones recientes que se conservan
+"""
+
+import os
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .logger import get_logger
+from .metrics import route_template
+
+logger = get_logger("sql_profiler")
+
+SQL_PROFILER = os.getenv("SQL_PROFILER", "1").lower() not in ("0", "false", "no")
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+SQL_PROFILER_HISTORY = int(os.getenv("SQL_PROFILER_HISTORY", "200"))
+
+# Formas repetidas que se incluyen en cada entrada del historial
+_TOP_SHAPES = 3
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normaliza una sentencia para agrupar las que solo se diferencian en sus valores.
+
+    Los literales y los distintos estilos de parámetros se sustituyen por `?` y
+    las listas `IN (?, ?, ...)` se reducen a `IN (?)`.
+
+    Args:
+        statement (str): SQL tal y como se envía al driver
+
+    Returns:
+        str: Forma normalizada de la sentencia
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _PLACEHOLDER_LIST.sub("(?)", shape)
+
+
+class RequestProfile:
+    """Sentencias SQL y tiempos de una petición."""
+
+    __slots__ = ("method", "path", "started_at", "statements", "db_seconds", "shapes")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.statements += 1
+        self.db_seconds += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """Formas que se han ejecutado más de `threshold` veces, de más a menos repetida."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing con el tiempo de base de datos y el total."""
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} queries", '
+            f'app;dur={self.elapsed() * 1000:.1f}'
+        )
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("sql_profiler_start")
+    if profile is not None and starts:
+        profile.record(statement, time.perf_counter() - starts.pop())
+
+
+class SQLProfiler:
+    """
+    Historial de las peticiones recientes con sus estadísticas de SQL.
+    """
+
+    def __init__(self, history: int = 200, repeat_threshold: int = 10):
+        """
+        Args:
+            history (int): Número de peticiones recientes que se conservan
+            repeat_threshold (int): Repeticiones de una forma a partir de las que se avisa
+        """
+        self.repeat_threshold = repeat_threshold
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=max(history, 1))
+        self.requests = 0
+        self.repeat_warnings = 0
+
+    def finish(self, profile: RequestProfile, route: str, status: int):
+        """
+        Cierra el perfil de una petición: avisa de las formas repetidas y lo guarda en el historial.
+
+        Args:
+            profile (RequestProfile): Perfil de la petición
+            route (str): Plantilla de la ruta que la atendió
+            status (int): Código de estado de la respuesta
+        """
+        repeated = profile.repeated(self.repeat_threshold)
+        for shape, count in repeated:
+            self.repeat_warnings += 1
+            logger.warning(
+                "Posible N+1 en %s %s: sentencia repetida %s veces: %s",
+                profile.method, route, count, shape
+            )
+        self.requests += 1
+        self._recent.append({
+            "method": profile.method,
+            "path": profile.path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(profile.elapsed() * 1000, 2),
+            "db_ms": round(profile.db_seconds * 1000, 2),
+            "statements": profile.statements,
+            "distinct_statements": len(profile.shapes),
+            "top_statements": [
+                {"statement": shape, "count": count}
+                for shape, count in profile.shapes.most_common(_TOP_SHAPES)
+            ],
+            "n_plus_one": bool(repeated),
+            "timestamp": time.time()
+        })
+
+    def slowest(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Devuelve las peticiones recientes más lentas, de mayor a menor duración."""
+        return sorted(self._recent, key=lambda entry: entry["duration_ms"], reverse=True)[:limit]
+
+    def clear(self):
+        self._recent.clear()
+
+    def stats(self, limit: int = 20) -> Dict[str, Any]:
+        """Devuelve la configuración, los contadores y las peticiones más lentas."""
+        return {
+            "enabled": SQL_PROFILER,
+            "repeat_threshold": self.repeat_threshold,
+            "history": self._recent.maxlen,
+            "requests": self.requests,
+            "repeat_warnings": self.repeat_warnings,
+            "slowest": self.slowest(limit)
+        }
+
+
+# Instancia compartida por la aplicación
+sql_profiler = SQLProfiler(history=SQL_PROFILER_HISTORY, repeat_threshold=SQL_REPEAT_THRESHOLD)
+
+
+class SQLProfilerMiddleware:
+    """
+    Middleware ASGI que perfila las sentencias SQL de cada petición y añade la
+    cabecera `Server-Timing` a la respuesta.
+    """
+
+    def __init__(self, app, profiler: SQLProfiler = sql_profiler, enabled: bool = SQL_PROFILER):
+        self.app = app
+        self.profiler = profiler
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        status = {"code": 500}
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            self.profiler.finish(profile, route_template(scope), status["code"])
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from inference.batching import MicroBatcher
+
+def encode(texts):
+    return [[1] * len(text.split()) for text in texts]
+
+class TestLengthBuckets(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.batches = []
+
+        def predict(batch):
+            self.batches.append([len(ids) for ids in batch])
+            return [{"label": "neutral", "score": len(ids)} for ids in batch]
+
+        self.batcher = MicroBatcher(
+            predict, max_batch_size=8, max_wait_ms=20, encode_fn=encode,
+            max_batch_tokens=40, bucket_boundaries=[4, 16]
+        )
+        await self.batcher.start()
+
+    async def asyncTearDown(self):
+        await self.batcher.stop()
+
+    async def test_results_keep_order(self):
+        texts = ["a b", "a " * 12, "a b c", "a " * 30]
+        results = await self.batcher.submit_many(texts)
+        self.assertEqual([r["score"] for r in results], [2, 12, 3, 30])
+
+    async def test_batches_do_not_mix_buckets(self):
+        texts = ["a b"] * 3 + ["a " * 10] * 2 + ["a " * 30]
+        await self.batcher.submit_many(texts)
+        self.assertEqual(sorted(self.batches), [[2, 2, 2], [10, 10], [30]])
+
+    async def test_token_cap_splits_batches(self):
+        # 4 textos de 10 tokens llenan el límite de 40; el quinto va en otro lote
+        await self.batcher.submit_many(["a " * 10] * 5)
+        self.assertEqual(self.batches, [[10] * 4, [10]])
+
+    async def test_concurrent_requests_share_batches(self):
+        await asyncio.gather(*(self.batcher.submit("a b") for _ in range(8)))
+        self.assertEqual(self.batches, [[2] * 8])
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.batches = []
+
+        def predict(texts):
+            self.batches.append(list(texts))
+            return [{"label": "neutral", "score": int(text)} for text in texts]
+
+        self.batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=20)
+        await self.batcher.start()
+
+    async def asyncTearDown(self):
+        await self.batcher.stop()
+
+    async def test_results_keep_order(self):
+        texts = [str(i) for i in range(10)]
+        results = await self.batcher.submit_many(texts)
+        self.assertEqual([r["score"] for r in results], list(range(10)))
+
+    async def test_batch_size_limit(self):
+        results = await asyncio.gather(*(self.batcher.submit(str(i)) for i in range(10)))
+        self.assertEqual([r["score"] for r in results], list(range(10)))
+        self.assertEqual([len(batch) for batch in self.batches], [4, 4, 2])
+        self.assertEqual(sum(self.batches, []), [str(i) for i in range(10)])
+
+    async def test_submit_requires_start(self):
+        batcher = MicroBatcher(lambda texts: [])
+        with self.assertRaises(RuntimeError):
+            await batcher.submit_many(["1"])
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            MicroBatcher(lambda texts: [], max_batch_size=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from sqlmodel import SQLModel, create_engine, Session, select, func
+from sqlmodel.pool import StaticPool
+
+from db import User, Movie, Comment
+from db import bulk
+from db.bulk import bulk_insert, iter_json_array, seed_from_files
+from db.synthetic import generate, synthetic_comments
+from auth import verify_password
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(self.engine)
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        self.engine.dispose()
+
+    def write_json(self, name, data):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+
+    def count(self, model):
+        with Session(self.engine) as session:
+            return session.exec(select(func.count()).select_from(model)).one()
+
+    def test_iter_json_array_streams_items_across_reads(self):
+        items = [{"title": f"Película {i}", "year": 2000 + i} for i in range(200)]
+        path = self.write_json("movies.json", items)
+        original = bulk._READ_SIZE
+        bulk._READ_SIZE = 16  # Fuerza elementos partidos entre lecturas
+        try:
+            self.assertEqual(list(iter_json_array(path)), items)
+        finally:
+            bulk._READ_SIZE = original
+
+    def test_iter_json_array_rejects_invalid_files(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self.write_json("object.json", {"a": 1})))
+
+    def test_bulk_insert_commits_in_blocks(self):
+        progress = []
+        rows = ({"title": f"M{i}", "director": "D", "year": 2000, "genre": "G"} for i in range(25))
+        with self.engine.connect() as conn:
+            total = bulk_insert(conn, Movie.__table__, rows, batch_size=4, commit_every=10, progress=progress.append)
+        self.assertEqual(total, 25)
+        self.assertEqual(progress, [12, 24, 25])
+        self.assertEqual(self.count(Movie), 25)
+
+    def test_seed_from_files(self):
+        users = self.write_json("users.json", [
+            {"username": "Alice", "email": "alice@example.com", "password": "secret1"},
+            {"username": "Bob", "email": "bob@example.com", "password": "secret1"}
+        ])
+        movies = self.write_json("movies.json", [
+            {"title": f"Movie {i}", "director": "D", "year": 2000 + i, "genre": "Drama"} for i in range(5)
+        ])
+        templates = self.write_json("comments.json", {
+            "positive": ["Genial"], "negative": ["Horrible"], "neutral": ["Normal"]
+        })
+        with self.engine.begin() as conn:
+            counts = seed_from_files(conn, users, movies, templates, extra_comments=10, batch_size=2)
+        self.assertEqual(counts, {"users": 2, "movies": 5, "comments": 15})
+        with Session(self.engine) as session:
+            stored = session.exec(select(User).order_by(User.id)).all()
+            self.assertTrue(all(verify_password("secret1", user.password) for user in stored))
+            # Cada contraseña lleva su propia sal aunque el texto coincida
+            self.assertNotEqual(stored[0].password, stored[1].password)
+            commented = session.exec(select(func.count(func.distinct(Comment.movie_id)))).one()
+            self.assertEqual(commented, 5)
+
+    def test_synthetic_generator(self):
+        with self.engine.connect() as conn:
+            counts = generate(conn, movies=300, users=20, comments=1000, batch_size=128, commit_every=500)
+            # Una segunda tanda no choca con los nombres de usuario existentes
+            generate(conn, movies=1, users=20, comments=0)
+        self.assertEqual(counts, {"movies": 300, "users": 20, "comments": 1000})
+        self.assertEqual(self.count(User), 40)
+        self.assertEqual(self.count(Comment), 1000)
+
+    def test_synthetic_comments_are_skewed(self):
+        templates = {"positive": ["a"], "negative": ["b"], "neutral": ["c"]}
+        rows = list(synthetic_comments(5000, list(range(1, 101)), [1], templates, random.Random(1), skew=2.0))
+        top_decile = sum(1 for row in rows if row["movie_id"] <= 10)
+        # Con skew=2 el primer 10% de películas recibe en torno al 32% de los comentarios
+        self.assertGreater(top_decile, 0.25 * len(rows))
@@ -0,0 +1,227 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from ia.circuit_breaker import CircuitBreaker, CircuitOpenError
+from ia.sentiment_analysis import InferenceClient, SentimentModel
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.before_call()
+            self.breaker.record_failure("timeout")
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+        for _ in range(3):
+            self.breaker.before_call()
+            self.breaker.record_failure("timeout")
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        stats = self.breaker.stats()
+        self.assertEqual((stats["opened"], stats["rejected"], stats["retry_in_seconds"]), (1, 1, 10))
+
+    def test_half_open_allows_single_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.before_call())
+        self.assertEqual(self.breaker.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertFalse(self.breaker.before_call())
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertTrue(self.breaker.before_call())
+        self.breaker.record_failure("sonda")
+        self.assertEqual(self.breaker.state, "open")
+        self.clock.now = 15
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.clock.now = 20
+        self.assertTrue(self.breaker.before_call())
+
+class TestInferenceClientBreaker(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.clock = FakeClock()
+        self.calls = []
+        self.ready = False
+        self.client = InferenceClient(
+            base_url="http://inference", connect_timeout=1, read_timeout=1, max_concurrency=4, max_keepalive=4,
+            breaker=CircuitBreaker("test-client", failure_threshold=2, reset_timeout=5, clock=self.clock)
+        )
+        self.client._client = httpx.AsyncClient(base_url="http://inference", transport=httpx.MockTransport(self.handle))
+        self.client._semaphore = asyncio.Semaphore(4)
+        self.client._loop = asyncio.get_running_loop()
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    def handle(self, request):
+        self.calls.append(request.url.path)
+        if request.url.path == "/readyz":
+            return httpx.Response(200 if self.ready else 503)
+        if not self.ready:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"label": "positive", "score": 0.9})
+
+    async def test_fails_fast_while_open_and_recovers(self):
+        for _ in range(2):
+            with self.assertRaises(httpx.ConnectError):
+                await self.client.post("/predict", {"text": "hola"})
+        with self.assertRaises(CircuitOpenError):
+            await self.client.post("/predict", {"text": "hola"})
+        self.assertEqual(self.calls, ["/predict", "/predict"])
+
+        # La sonda falla mientras el servicio no está listo
+        self.clock.now = 5
+        with self.assertRaises(CircuitOpenError):
+            await self.client.post("/predict", {"text": "hola"})
+        self.assertEqual(self.calls[-1], "/readyz")
+        self.assertEqual(self.client.breaker.state, "open")
+
+        self.ready = True
+        self.clock.now = 10
+        response = await self.client.post("/predict", {"text": "hola"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.calls[-2:], ["/readyz", "/predict"])
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    async def test_cancelled_probe_is_released(self):
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.sleep(60)
+
+        self.client._client = httpx.AsyncClient(base_url="http://inference", transport=httpx.MockTransport(hang))
+        for _ in range(2):
+            self.client.breaker.record_failure()
+        self.clock.now = 5
+        task = asyncio.create_task(self.client.post("/predict", {"text": "hola"}))
+        await started.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.client.breaker.state, "half_open")
+        self.assertTrue(self.client.breaker.before_call())
+
+    async def test_probe_requires_success_status(self):
+        self.client._client = httpx.AsyncClient(
+            base_url="http://inference", transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+        for _ in range(2):
+            self.client.breaker.record_failure()
+        self.clock.now = 5
+        with self.assertRaises(CircuitOpenError):
+            await self.client.post("/predict", {"text": "hola"})
+        self.assertEqual(self.client.breaker.state, "open")
+
+    async def test_server_errors_count_as_failures(self):
+        self.ready = True
+        self.client._client = httpx.AsyncClient(
+            base_url="http://inference", transport=httpx.MockTransport(lambda request: httpx.Response(500))
+        )
+        for _ in range(2):
+            await self.client.post("/predict", {"text": "hola"})
+        self.assertEqual(self.client.breaker.state, "open")
+
+    async def test_random_labels_open_the_circuit(self):
+        # Sin modelo el servicio contesta 200 con una etiqueta aleatoria y score -1
+        self.client._client = httpx.AsyncClient(
+            base_url="http://inference",
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"label": "positive", "score": -1}))
+        )
+        local = MagicMock()
+        local.predict.return_value = ("negative", 0.5)
+        with patch.object(SentimentModel, "client", self.client), patch.object(SentimentModel, "local_classifier", local):
+            for _ in range(2):
+                self.assertEqual(await SentimentModel.analyze_sentiment("Una película aburrida"), "negative")
+            self.assertEqual(self.client.breaker.state, "open")
+            self.assertEqual(await SentimentModel.analyze_sentiment("Una película aburrida"), "negative")
+        self.assertEqual(self.client.breaker.stats()["rejected"], 1)
+
+    async def test_sentiment_model_falls_back_when_open(self):
+        original = SentimentModel.client
+        SentimentModel.client = self.client
+        self.addCleanup(setattr, SentimentModel, "client", original)
+        for _ in range(2):
+            self.client.breaker.record_failure()
+        label = await SentimentModel.analyze_sentiment("Una película excelente")
+        self.assertIn(label, ("positive", "negative", "neutral"))
+        self.assertEqual(self.calls, [])
+
+class TestInferenceClientPool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.client = InferenceClient(
+            base_url="http://inference", connect_timeout=1, read_timeout=1, max_concurrency=2, max_keepalive=2,
+            breaker=CircuitBreaker("test-pool", failure_threshold=2, reset_timeout=5)
+        )
+        async_client = httpx.AsyncClient
+
+        def make_client(**kwargs):
+            return async_client(transport=httpx.MockTransport(self.handle), **kwargs)
+
+        patcher = patch("ia.sentiment_analysis.httpx.AsyncClient", side_effect=make_client)
+        self.factory = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def handle(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return httpx.Response(200, json={"label": "positive", "score": 0.9})
+
+    async def test_client_is_reused(self):
+        for _ in range(3):
+            await self.client.post("/predict", {"text": "hola"})
+        self.assertEqual(self.factory.call_count, 1)
+        first = self.client._client
+
+        # Otro bucle de eventos no puede compartir el cliente: se crea uno nuevo
+        def other_loop():
+            async def post():
+                await self.client.post("/predict", {"text": "hola"})
+                await self.client.aclose()
+            asyncio.run(post())
+
+        await asyncio.to_thread(other_loop)
+        self.assertEqual(self.factory.call_count, 2)
+        await self.client.post("/predict", {"text": "hola"})
+        self.assertIsNot(self.client._client, first)
+
+    async def test_concurrency_limit(self):
+        responses = await asyncio.gather(*(self.client.post("/predict", {"text": "hola"}) for _ in range(6)))
+        self.assertEqual([r.status_code for r in responses], [200] * 6)
+        self.assertEqual(self.max_in_flight, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,37 @@
+import gzip
+import json
+import os
+import tempfile
 import unittest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, create_engine, Session, select
-from sqlmodel.pool import StaticPool
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from main import app
 from auth import authenticator
-from db import get_session, User, Movie, Comment
+from cache import response_cache
+from db import get_session, User, Movie, Comment, MovieSentiment
+from controlers.pagination import encode_cursor
+from ia import SentimentLabel
 
 class TestUserEndpoints(unittest.TestCase):
 
     def setUp(self):
-        engine = create_engine(
-            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
-        )
+        # SQLite temporal compartido entre la sesión síncrona de las pruebas
+        # y el motor asíncrono (aiosqlite) que usa la aplicación
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{self.db_path}")
         SQLModel.metadata.create_all(engine)
         self.session = Session(engine)
-        def get_session_override():
-            yield self.session
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
         app.dependency_overrides[get_session] = get_session_override
 
         self.mock_auth = MagicMock()
@@ -26,11 +40,16 @@ class TestUserEndpoints(unittest.TestCase):
         self.patcher.start()
 
         app.lifespan = AsyncMock(return_value=None)
+        # Cada prueba usa una base de datos nueva: no deben servirse respuestas de otra
+        response_cache.clear()
         self.client = TestClient(app)
     
     def tearDown(self):
         app.dependency_overrides.clear()
         self.patcher.stop()
+        self.session.close()
+        self.session.get_bind().dispose()
+        os.remove(self.db_path)
     
     def seed_db(self):
         with self.session as session:
@@ -106,6 +125,27 @@ class TestUserEndpoints(unittest.TestCase):
         self.assertEqual(comments[1]['text'], 'Not bad')
         self.assertEqual(comments[1]['sentiment'], 'neutral')
     
+    def test_get_movie_comments_paginated(self):
+        self.seed_db()
+        response = self.client.get("/movies/1/comments?limit=1")
+        self.assertEqual([c['text'] for c in response.json()], ['Great movie'])
+        cursor = response.headers['X-Next-Cursor']
+        response = self.client.get(f"/movies/1/comments?limit=1&cursor={cursor}")
+        self.assertEqual([c['text'] for c in response.json()], ['Not bad'])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+        # Pasado el último comentario la película sigue existiendo
+        response = self.client.get(f"/movies/1/comments?cursor={encode_cursor(4)}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_get_user_comments_paginated(self):
+        self.seed_db()
+        response = self.client.get("/users/2/comments?limit=1")
+        self.assertEqual([c['text'] for c in response.json()], ['Not bad'])
+        response = self.client.get(f"/users/2/comments?limit=1&cursor={response.headers['X-Next-Cursor']}")
+        self.assertEqual([c['text'] for c in response.json()], ['Hated it'])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
     def test_get_movie_comments_empty(self):
         self.seed_db()
         response = self.client.get("/movies/3/comments")
@@ -120,6 +160,44 @@ class TestUserEndpoints(unittest.TestCase):
         self.assertIsInstance(response.json(), dict)
         self.assertEqual(response.json(), {"detail": "Movie not found"})
 
+    def count_statements(self, url):
+        # Se mide la consulta a la base de datos, no la caché de respuestas
+        response_cache.clear()
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        engine = self.async_engine.sync_engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.client.get(url)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def add_comments(self, count):
+        self.session.add_all([
+            Comment(text=f"Comment {i}", sentiment="neutral", movie_id=1, user_id=1 + i % 3)
+            for i in range(count)
+        ])
+        self.session.commit()
+
+    def test_get_movie_comments_constant_queries(self):
+        self.seed_db()
+        few = self.count_statements("/movies/1/comments")
+        self.add_comments(50)
+        many = self.count_statements("/movies/1/comments")
+        self.assertEqual(few, many)
+        self.assertEqual(many, 1)
+
+    def test_get_user_comments_constant_queries(self):
+        self.seed_db()
+        few = self.count_statements("/users/1/comments")
+        self.add_comments(50)
+        many = self.count_statements("/users/1/comments")
+        self.assertEqual(few, many)
+        self.assertEqual(many, 1)
+
     def test_add_comment_user_not_found(self):
         self.seed_db()
         response = self.client.post("/movies/1/comments", json={"user_id": 4, "text": "Amazing movie"})
@@ -153,6 +231,20 @@ class TestUserEndpoints(unittest.TestCase):
         self.assertEqual(comment.user.username, 'Alice')
         self.assertEqual(comment.sentiment, 'sentiment')
     
+    @patch('controlers.comment_controller.sentiment_worker')
+    @patch('controlers.comment_controller.SENTIMENT_MODE', 'async')
+    @patch('ia.SentimentModel.analyze_sentiment')
+    def test_add_comment_async_mode(self, mock_analyze_sentiment, mock_worker):
+        self.seed_db()
+        response = self.client.post("/movies/3/comments", json={"user_id": 1, "text": "Amazing movie"})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['sentiment'], 'pending')
+        mock_analyze_sentiment.assert_not_called()
+        comment = self.session.exec(select(Comment).where(Comment.user_id == 1, Comment.movie_id == 3)).first()
+        self.assertIsNotNone(comment)
+        self.assertEqual(comment.sentiment, 'pending')
+        mock_worker.enqueue.assert_called_once_with(comment.id, 'Amazing movie')
+
     def test_add_comment_missing_fields(self):
         self.seed_db()
         response = self.client.post("/movies/1/comments", json={"text": "Amazing movie"})
@@ -171,3 +263,95 @@ class TestUserEndpoints(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         comment = self.session.exec(select(Comment).where(Comment.user_id == 1, Comment.movie_id == 1)).first()
         self.assertIsNone(comment)
+
+    def post_bulk(self, records, **kwargs):
+        lines = [record if isinstance(record, str) else json.dumps(record) for record in records]
+        return self.client.post("/comments/bulk", content="\n".join(lines) + "\n", **kwargs)
+
+    @patch('ia.SentimentModel.analyze_sentiments')
+    def test_bulk_add_comments(self, mock_analyze_sentiments):
+        mock_analyze_sentiments.side_effect = lambda texts: ["positive"] * len(texts)
+        self.seed_db()
+        response = self.post_bulk([
+            {"movie_id": 3, "user_id": 1, "text": "Amazing movie"},
+            {"movie_id": 4, "user_id": 1, "text": "Unknown movie"},
+            "",
+            {"movie_id": 3, "user_id": 9, "text": "Unknown user"},
+            "{not json",
+            {"movie_id": 3, "text": "No user"},
+            {"movie_id": 3, "user_id": 2, "text": "Great"}
+        ])
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result["received"], result["inserted"], result["rejected"]), (6, 2, 4))
+        self.assertEqual([error["line"] for error in result["errors"]], [2, 4, 5, 6])
+        self.assertEqual(result["errors"][0]["error"], "Movie not found")
+        self.assertEqual(result["errors"][1]["error"], "User not found")
+        self.assertTrue(result["errors"][3]["error"].startswith("user_id"))
+        comments = self.session.exec(select(Comment).where(Comment.movie_id == 3).order_by(Comment.id)).all()
+        self.assertEqual([(c.user_id, c.text, c.sentiment) for c in comments],
+                         [(1, "Amazing movie", "positive"), (2, "Great", "positive")])
+        self.assertEqual(self.session.get(MovieSentiment, 3).positive, 2)
+
+    @patch('ia.SentimentModel.analyze_sentiments')
+    @patch('ia.SentimentModel.analyze_sentiment')
+    def test_sentiment_source_is_stored(self, mock_analyze_sentiment, mock_analyze_sentiments):
+        mock_analyze_sentiment.return_value = SentimentLabel("positive", "remote")
+        mock_analyze_sentiments.side_effect = lambda texts: [SentimentLabel("neutral", "local_fallback")] * len(texts)
+        self.seed_db()
+        self.assertEqual(self.client.post("/movies/1/comments", json={"user_id": 1, "text": "Great"}).status_code, 201)
+        self.post_bulk([{"movie_id": 2, "user_id": 1, "text": "Fine"}])
+        sources = {c.text: c.sentiment_source for c in self.session.exec(select(Comment)).all()}
+        self.assertEqual((sources["Great"], sources["Fine"], sources["Not bad"]), ("remote", "local_fallback", None))
+
+    @patch('controlers.comment_controller.BULK_COMMENTS_CHUNK_SIZE', 10)
+    @patch('ia.SentimentModel.analyze_sentiments')
+    def test_bulk_add_comments_constant_queries_per_chunk(self, mock_analyze_sentiments):
+        mock_analyze_sentiments.side_effect = lambda texts: ["neutral"] * len(texts)
+        self.seed_db()
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        engine = self.async_engine.sync_engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = self.post_bulk([
+                {"movie_id": 1 + i % 3, "user_id": 1 + i % 2, "text": f"Comment {i}"} for i in range(30)
+            ])
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        self.assertEqual(response.json()["inserted"], 30)
+        # Películas y usuarios se consultan una vez; cada bloque hace un INSERT de varias filas
+        self.assertEqual(sum("FROM movie" in s for s in statements), 1)
+        self.assertEqual(sum(s.startswith("INSERT INTO comment") for s in statements), 3)
+        self.assertEqual(len(self.session.exec(select(Comment)).all()), 34)
+
+    @patch('ia.SentimentModel.analyze_sentiments')
+    def test_bulk_add_comments_gzip(self, mock_analyze_sentiments):
+        mock_analyze_sentiments.side_effect = lambda texts: ["negative"] * len(texts)
+        self.seed_db()
+        body = gzip.compress(json.dumps({"movie_id": 1, "user_id": 3, "text": "Boring"}).encode())
+        response = self.client.post("/comments/bulk", content=body, headers={"Content-Encoding": "gzip"})
+        self.assertEqual(response.json()["inserted"], 1)
+        response = self.client.post("/comments/bulk", content=body, headers={"Content-Encoding": "br"})
+        self.assertEqual(response.status_code, 415)
+
+    @patch('controlers.comment_controller.BULK_MAX_BODY_BYTES', 1024 * 1024)
+    def test_bulk_add_comments_gzip_bomb(self):
+        # 64 MiB de ceros comprimidos en unos 64 KiB
+        body = gzip.compress(b"\0" * (64 * 1024 * 1024))
+        response = self.client.post("/comments/bulk", content=body, headers={"Content-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 413)
+
+    @patch('controlers.comment_controller.BULK_MAX_LINE_BYTES', 64)
+    @patch('ia.SentimentModel.analyze_sentiments')
+    def test_bulk_add_comments_long_line(self, mock_analyze_sentiments):
+        mock_analyze_sentiments.side_effect = lambda texts: ["neutral"] * len(texts)
+        self.seed_db()
+        response = self.post_bulk([
+            {"movie_id": 1, "user_id": 1, "text": "x" * 100},
+            {"movie_id": 1, "user_id": 1, "text": "short"}
+        ])
+        result = response.json()
+        self.assertEqual((result["inserted"], result["rejected"]), (1, 1))
+        self.assertEqual(result["errors"][0]["line"], 1)
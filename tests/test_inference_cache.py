@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from inference.cache import PredictionCache, normalize_text
+
+class TestPredictionCache(unittest.TestCase):
+
+    def test_normalized_key(self):
+        cache = PredictionCache(max_entries=10)
+        cache.put("Una  obra maestra ", {"label": "positive", "score": 0.9})
+        self.assertEqual(normalize_text("  UNA obra\tmaestra"), "una obra maestra")
+        self.assertEqual(cache.get("una obra MAESTRA"), {"label": "positive", "score": 0.9})
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(max_entries=2)
+        cache.put("a", {"label": "positive", "score": 1})
+        cache.put("b", {"label": "negative", "score": 1})
+        cache.get("a")
+        cache.put("c", {"label": "neutral", "score": 1})
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 2)
+
+    def test_ttl_expiration(self):
+        cache = PredictionCache(max_entries=10, ttl_seconds=60)
+        with patch("inference.cache.time.time", return_value=1000):
+            cache.put("a", {"label": "positive", "score": 1})
+        with patch("inference.cache.time.time", return_value=1059):
+            self.assertIsNotNone(cache.get("a"))
+        with patch("inference.cache.time.time", return_value=1061):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_model_version_invalidates(self):
+        cache = PredictionCache(max_entries=10, model_version="v1")
+        cache.put("a", {"label": "positive", "score": 1})
+        cache.set_model_version("v2")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            cache = PredictionCache(max_entries=10, model_version="v1", persist_path=path)
+            cache.put("a", {"label": "positive", "score": 1})
+            self.assertEqual(cache.save(), 1)
+
+            restored = PredictionCache(max_entries=10, model_version="v1", persist_path=path)
+            self.assertEqual(restored.load(), 1)
+            self.assertEqual(restored.get("a"), {"label": "positive", "score": 1})
+
+            other_model = PredictionCache(max_entries=10, model_version="v2", persist_path=path)
+            self.assertEqual(other_model.load(), 0)
\ No newline at end of file
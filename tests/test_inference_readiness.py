@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from inference import inference_service
+
+class FakeBackend:
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.batches = []
+
+    def encode(self, texts):
+        return [[1] * min(len(text.split()) + 2, 128) for text in texts]
+
+    def predict_encoded(self, batch):
+        if self.gate:
+            self.gate.wait(5)
+        self.batches.append(len(batch))
+        return [{"label": "POS", "score": 0.9} for _ in batch]
+
+class TestInferenceReadiness(unittest.TestCase):
+
+    def setUp(self):
+        inference_service.model_pipeline = None
+        inference_service.service_status = "starting"
+        inference_service.startup_phases.clear()
+        inference_service.prediction_cache.clear()
+        patch.object(inference_service, "import_runtime").start()
+        self.addCleanup(patch.stopall)
+
+    def wait_for_status(self, client, status):
+        for _ in range(100):
+            response = client.get("/readyz")
+            if response.json()["status"] == status:
+                return response
+            time.sleep(0.05)
+        self.fail(f"El servicio no llegó al estado {status}")
+
+    def test_ready_after_warmup(self):
+        backend = FakeBackend()
+        with patch.object(inference_service, "load_backend", return_value=backend), \
+                TestClient(inference_service.app) as client:
+            response = self.wait_for_status(client, "ready")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                set(response.json()["phases"]), {"import", "load", "first_forward", "warmup", "total"}
+            )
+            # Un lote por cubeta de longitud y ronda de calentamiento
+            lengths = len(inference_service.LENGTH_BUCKETS) + 1
+            self.assertEqual(len(backend.batches), lengths * inference_service.WARMUP_ROUNDS)
+            self.assertEqual(client.post("/predict", json={"text": "muy buena"}).json()["label"], "positive")
+
+    def test_not_ready_while_warming(self):
+        gate = threading.Event()
+        with patch.object(inference_service, "load_backend", return_value=FakeBackend(gate)), \
+                TestClient(inference_service.app) as client:
+            response = self.wait_for_status(client, "warming")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(client.get("/livez").status_code, 200)
+            self.assertFalse(client.get("/health").json()["ready"])
+            gate.set()
+            self.wait_for_status(client, "ready")
+
+    def test_failed_model(self):
+        with patch.object(inference_service, "load_backend", side_effect=OSError("sin modelo")), \
+                TestClient(inference_service.app) as client:
+            response = self.wait_for_status(client, "failed")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(client.post("/predict", json={"text": "muy buena"}).json()["score"], -1)
+
+    def test_predict_batch_limit(self):
+        with patch.object(inference_service, "load_backend", return_value=FakeBackend()), \
+                patch.object(inference_service, "MAX_BATCH_REQUEST", 3), \
+                TestClient(inference_service.app) as client:
+            self.wait_for_status(client, "ready")
+            response = client.post("/predict_batch", json={"texts": ["a"] * 4})
+            self.assertEqual(response.status_code, 400)
+            predictions = client.post("/predict_batch", json={"texts": ["a", "b c", "d"]}).json()["predictions"]
+            self.assertEqual([p["label"] for p in predictions], ["positive"] * 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from benchmarks.loadtest import compare, parse_mix, percentile, summarize
+
+def row(p50, p95, p99, errors=0):
+    return {"requests": 100, "errors": errors, "rps": 10.0, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": p99}
+
+class TestLoadTestReport(unittest.TestCase):
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_summarize_ignores_failed_latencies(self):
+        samples = {"movie": [(0.010, True), (0.020, True), (5.0, False)]}
+        summary = summarize(samples, elapsed=2)["movie"]
+        self.assertEqual(summary["requests"], 3)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["rps"], 1.5)
+        self.assertEqual(summary["max_ms"], 20.0)
+
+    def test_compare_flags_regressions_past_threshold(self):
+        baseline = {"browse": row(10, 20, 40), "login": row(100, 150, 200)}
+        current = {"browse": row(11, 30, 41), "login": row(100, 150, 200, errors=2)}
+        regressions = compare(current, baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("browse p95_ms: 20.00 -> 30.00"))
+        self.assertIn("login: 2 errores", regressions[1])
+        self.assertEqual(compare(baseline, baseline, threshold=0.2), [])
+
+    def test_compare_ignores_sub_millisecond_noise(self):
+        self.assertEqual(compare({"movie": row(1.5, 1.9, 2)}, {"movie": row(1, 1, 1.5)}, threshold=0.2), [])
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("browse=3, comment=1"), {"browse": 3.0, "comment": 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix("unknown=1")
+        with self.assertRaises(ValueError):
+            parse_mix("browse=0")
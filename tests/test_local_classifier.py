@@ -0,0 +1,137 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, Session, create_engine
+
+from db import Comment
+from ia import sentiment_analysis, train_local_classifier
+from ia.circuit_breaker import CircuitOpenError
+from ia.local_classifier import LocalSentimentClassifier, TieredStats, tokenize
+from ia.sentiment_analysis import SentimentModel
+
+TRAINING = {
+    "positive": ["una película excelente", "me encantó la historia", "excelente reparto y gran final"],
+    "negative": ["no me gustó nada", "aburrida y demasiado larga", "una pérdida de tiempo aburrida"],
+    "neutral": ["una película normal", "ni buena ni mala", "normal, se deja ver"]
+}
+
+def build_classifier() -> LocalSentimentClassifier:
+    texts, labels = [], []
+    for label, examples in TRAINING.items():
+        for text in examples:
+            texts.extend([text] * 5)
+            labels.extend([label] * 5)
+    return LocalSentimentClassifier.train(texts, labels, min_count=1)
+
+class TestLocalClassifier(unittest.TestCase):
+
+    def test_tokenize_marks_negations(self):
+        features = tokenize("No me gustó")
+        self.assertIn("gustó", features)
+        self.assertIn("me gustó", features)
+        self.assertIn("NO_me", features)
+
+    def test_predict_and_save(self):
+        model = build_classifier()
+        self.assertEqual(model.predict("excelente película")[0], "positive")
+        self.assertEqual(model.predict("aburrida")[0], "negative")
+        self.assertAlmostEqual(sum(model.predict_proba("normal").values()), 1.0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.json")
+            model.save(path)
+            loaded = LocalSentimentClassifier.load(path)
+        self.assertEqual(loaded.predict("excelente película"), model.predict("excelente película"))
+        self.assertIsNone(LocalSentimentClassifier.load(path))
+
+    def test_calibration_changes_temperature(self):
+        model = build_classifier()
+        texts = [text for examples in TRAINING.values() for text in examples]
+        labels = [label for label, examples in TRAINING.items() for _ in examples]
+        model.calibrate(texts, labels)
+        evaluation = model.evaluate(texts, labels, threshold=0.5)
+        self.assertEqual(evaluation["accuracy"], 1.0)
+        self.assertGreater(evaluation["coverage"], 0)
+
+    def test_training_uses_only_remote_labels(self):
+        fd, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, db_path)
+        engine = create_engine(f"sqlite:///{db_path}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all([
+                Comment(text="del modelo", sentiment="positive", sentiment_source="remote", movie_id=1, user_id=1),
+                Comment(text="del clasificador", sentiment="negative", sentiment_source="local_fallback", movie_id=1, user_id=1),
+                Comment(text="al azar", sentiment="neutral", sentiment_source="random_fallback", movie_id=1, user_id=1),
+                Comment(text="sin origen", sentiment="neutral", movie_id=1, user_id=1)
+            ])
+            session.commit()
+        engine.dispose()
+        with patch.object(train_local_classifier, "engine", create_async_engine(f"sqlite+aiosqlite:///{db_path}")):
+            samples = asyncio.run(train_local_classifier.load_labeled_comments(10))
+        self.assertEqual(samples, [("del modelo", "positive")])
+
+    def test_train_requires_two_labels(self):
+        with self.assertRaises(ValueError):
+            LocalSentimentClassifier.train(["hola"], ["positive"])
+
+class TestTieredSentiment(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        patch.object(SentimentModel, "local_classifier", build_classifier()).start()
+        patch.object(SentimentModel, "tiered_stats", TieredStats()).start()
+        patch.object(sentiment_analysis, "LOCAL_CLASSIFIER_THRESHOLD", 0.9).start()
+        self.post = patch.object(SentimentModel.client, "post", new_callable=AsyncMock).start()
+        self.addCleanup(patch.stopall)
+
+    async def test_confident_text_stays_local(self):
+        label = await SentimentModel.analyze_sentiment("excelente excelente película excelente")
+        self.assertEqual((label, label.decision), ("positive", "local"))
+        self.post.assert_not_called()
+        self.assertEqual(SentimentModel.tiered_stats.decisions["local"], 1)
+
+    async def test_uncertain_text_is_escalated(self):
+        sentiment_analysis.LOCAL_CLASSIFIER_THRESHOLD = 1.1
+        self.post.return_value = httpx.Response(200, json={"label": "neutral", "score": 0.8})
+        self.assertEqual(await SentimentModel.analyze_sentiment("excelente película"), "neutral")
+        stats = SentimentModel.local_stats()
+        self.assertEqual(stats["decisions"]["escalated"], 1)
+        self.assertEqual(stats["escalation_rate"], 1.0)
+        self.assertEqual(stats["agreement"]["uncertain"], {"compared": 1, "agreed": 0, "rate": 0.0})
+
+    async def test_local_label_is_the_fallback(self):
+        sentiment_analysis.LOCAL_CLASSIFIER_THRESHOLD = 1.1
+        self.post.side_effect = CircuitOpenError("abierto")
+        self.assertEqual(await SentimentModel.analyze_sentiment("aburrida y larga"), "negative")
+        labels = await SentimentModel.analyze_sentiments(["aburrida", "excelente película"])
+        self.assertEqual(labels, ["negative", "positive"])
+        self.assertEqual(SentimentModel.tiered_stats.decisions["local_fallback"], 3)
+
+    async def test_random_service_labels_use_local_fallback(self):
+        # Con el modelo caído el servicio responde 200 con una etiqueta aleatoria y score -1
+        sentiment_analysis.LOCAL_CLASSIFIER_THRESHOLD = 1.1
+        self.post.return_value = httpx.Response(200, json={"label": "positive", "score": -1})
+        self.assertEqual(await SentimentModel.analyze_sentiment("aburrida y larga"), "negative")
+        self.post.return_value = httpx.Response(200, json={"predictions": [
+            {"label": "positive", "score": -1}, {"label": "neutral", "score": 0.8}
+        ]})
+        labels = await SentimentModel.analyze_sentiments(["aburrida", "excelente película"])
+        self.assertEqual(labels, ["negative", "neutral"])
+        stats = SentimentModel.local_stats()
+        self.assertEqual(stats["decisions"]["local_fallback"], 2)
+        self.assertEqual(stats["decisions"]["escalated"], 1)
+        self.assertEqual(stats["agreement"]["uncertain"]["compared"], 1)
+
+    async def test_batch_only_sends_uncertain_texts(self):
+        self.post.return_value = httpx.Response(200, json={"predictions": [{"label": "neutral", "score": 0.7}]})
+        labels = await SentimentModel.analyze_sentiments(["excelente excelente película excelente", "xyz"])
+        self.assertEqual(labels, ["positive", "neutral"])
+        self.assertEqual(self.post.call_args.args[1]["texts"], ["Mi opinión sobre esta película: xyz"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest.mock import patch
+
+from utils import logger as logger_module
+from utils.logger import JsonFormatter, SamplingFilter, _NonBlockingQueueHandler, parse_sampling
+
+def make_record(level, msg, *args, exc_info=None):
+    return logging.LogRecord("prueba", level, __file__, 1, msg, args, exc_info)
+
+class TestLoggingPipeline(unittest.TestCase):
+
+    def test_parse_sampling(self):
+        self.assertEqual(parse_sampling("a=0.1, b=2,c=x,"), {"a": 0.1, "b": 1.0})
+        self.assertEqual(parse_sampling(""), {})
+
+    def test_json_formatter(self):
+        handler = _NonBlockingQueueHandler(queue.Queue())
+        try:
+            raise ValueError("fallo")
+        except ValueError:
+            import sys
+            record = handler.prepare(make_record(logging.ERROR, "Usuario %s: %d", "Alice", 3, exc_info=sys.exc_info()))
+        line = json.loads(JsonFormatter().format(record))
+        self.assertEqual(line["message"], "Usuario Alice: 3")
+        self.assertEqual((line["level"], line["logger"]), ("ERROR", "prueba"))
+        self.assertIn("ValueError: fallo", line["exception"])
+        self.assertIn("ts", line)
+
+    def test_full_queue_drops_without_blocking(self):
+        handler = _NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        for i in range(5):
+            handler.handle(make_record(logging.INFO, "mensaje %s", i))
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+
+    def test_sampling_keeps_warnings(self):
+        sampler = SamplingFilter(0.0)
+        self.assertFalse(sampler.filter(make_record(logging.INFO, "info")))
+        self.assertTrue(sampler.filter(make_record(logging.WARNING, "aviso")))
+
+    def test_disabled_level_does_not_format(self):
+        class Expensive:
+            calls = 0
+            def __str__(self):
+                Expensive.calls += 1
+                return "caro"
+        with patch.dict("os.environ", {"ENVIRONMENT": "prod"}):
+            logger = logger_module.get_logger("prueba_lazy")
+        logger.debug("Valor: %s", Expensive())
+        self.assertEqual(Expensive.calls, 0)
+
+class TestForkedLogging(unittest.TestCase):
+
+    def test_children_log_through_parent(self):
+        # En un proceso aparte para no cambiar la configuración de logging de las pruebas
+        script = textwrap.dedent("""
+            import os
+            from utils.logger import get_logger, share_with_children, shutdown_logging
+            logger = get_logger("prueba_fork")
+            logger.warning("padre")
+            share_with_children()
+            children = []
+            for i in range(3):
+                pid = os.fork()
+                if pid == 0:
+                    for j in range(50):
+                        logger.warning("hijo %s línea %s", i, j)
+                    shutdown_logging()
+                    os._exit(0)
+                children.append(pid)
+            for pid in children:
+                os.waitpid(pid, 0)
+            shutdown_logging()
+        """)
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, "app.log")
+            # Como en el contenedor de inferencia, `utils` son las utilidades de inference/
+            inference_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "inference")
+            env = dict(
+                os.environ, PYTHONPATH=inference_dir, LOG_FILE=log_file, LOG_MAX_BYTES="2000", LOG_BACKUP_COUNT="100"
+            )
+            subprocess.run([sys.executable, "-c", script], env=env, check=True, capture_output=True)
+            lines = []
+            for name in os.listdir(directory):
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    lines += [json.loads(line) for line in f]
+        # Todas las líneas llegan (también con rotaciones) y cada proceso conserva su pid
+        self.assertEqual(len(lines), 151)
+        self.assertEqual(len({line["pid"] for line in lines}), 4)
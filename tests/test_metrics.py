@@ -0,0 +1,95 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from main import app
+from auth import authenticator
+from cache import response_cache
+from db import get_session, Movie
+from ia import SentimentModel
+from utils.metrics import route_template
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        SQLModel.metadata.create_all(self.engine)
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+        app.dependency_overrides[get_session] = get_session_override
+
+        self.patcher = patch.object(authenticator, "__call__", MagicMock(return_value=True))
+        self.patcher.start()
+        app.lifespan = AsyncMock(return_value=None)
+        response_cache.clear()
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            session.add(Movie(id=1, title="Inception", director="Christopher Nolan", year=2010, genre="Sci-Fi"))
+            session.commit()
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.patcher.stop()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_route_latency_and_sql_statements(self):
+        route = "/movies/{id}"
+        requests_before = sample("http_request_duration_seconds_count", method="GET", route=route, status="200")
+        statements_before = sample("sql_statements_per_request_sum", route=route)
+        checkouts_before = sample("db_pool_checkouts_total")
+        waits_before = sample("db_pool_checkout_wait_seconds_count")
+
+        self.assertEqual(self.client.get("/movies/1").status_code, 200)
+        self.assertEqual(self.client.get("/movies/999").status_code, 404)
+
+        self.assertEqual(sample("http_request_duration_seconds_count", method="GET", route=route, status="200"), requests_before + 1)
+        self.assertGreaterEqual(sample("http_request_duration_seconds_count", method="GET", route=route, status="404"), 1)
+        self.assertGreaterEqual(sample("sql_statements_per_request_sum", route=route), statements_before + 2)
+        self.assertGreaterEqual(sample("db_pool_checkouts_total"), checkouts_before + 2)
+        self.assertGreaterEqual(sample("db_pool_checkout_wait_seconds_count"), waits_before + 2)
+        self.assertEqual(sample("http_requests_in_flight", method="GET", route=route), 0)
+
+    def test_unknown_paths_share_one_series(self):
+        self.client.get("/no/existe/1")
+        self.client.get("/no/existe/2")
+        self.assertGreaterEqual(sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404"), 2)
+
+    def test_route_is_resolved_before_routing(self):
+        # Las peticiones en curso se etiquetan antes de que el router fije scope["route"]
+        def scope(method, path):
+            return {"type": "http", "method": method, "path": path, "root_path": "", "app": app}
+        self.assertEqual(route_template(scope("GET", "/movies/7")), "/movies/{id}")
+        self.assertEqual(route_template(scope("PATCH", "/movies/7")), "/movies/{id}")
+        self.assertEqual(route_template(scope("GET", "/no/existe")), "unmatched")
+
+    def test_exposition_format(self):
+        self.client.get("/movies")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",route="/movies",status="200"}', response.text)
+        self.assertIn("db_pool_checkout_wait_seconds", response.text)
+
+    def test_inference_fallbacks_are_counted(self):
+        before = sample("inference_random_fallback_total", endpoint="predict_batch")
+        with patch.object(SentimentModel.client, "post", AsyncMock(side_effect=ConnectionError("caído"))):
+            labels = asyncio.run(SentimentModel.analyze_sentiments(["a", "b", "c"]))
+        self.assertEqual(len(labels), 3)
+        self.assertEqual(sample("inference_random_fallback_total", endpoint="predict_batch"), before + 3)
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy import event, inspect, text
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from main import app
+from auth import authenticator
+from cache import response_cache
+from db import get_session, User, Movie, Comment
+from db.migrations import MIGRATIONS, apply_migrations, get_schema_version
+from auth import hash_password
+
+def full_scans(conn, statement, parameters):
+    """Devuelve las tablas que el plan de una consulta recorre completas."""
+    if conn.dialect.name == "sqlite":
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in plan if row[-1].startswith("SCAN ") and "INDEX" not in row[-1]]
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all()
+    return [row["table"] for row in rows if row["type"] == "ALL"]
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+
+    def create_legacy_schema(self):
+        # Esquema anterior a los índices: mismas tablas sin índices secundarios
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(100) NOT NULL, email VARCHAR(255) NOT NULL, password VARCHAR(255) NOT NULL)"))
+            conn.execute(text("CREATE TABLE movie (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL, director VARCHAR(255) NOT NULL, year INTEGER NOT NULL, genre VARCHAR(100) NOT NULL)"))
+            conn.execute(text("CREATE TABLE comment (id INTEGER PRIMARY KEY, movie_id INTEGER NOT NULL REFERENCES movie(id), user_id INTEGER NOT NULL REFERENCES user(id), text VARCHAR NOT NULL, sentiment VARCHAR NOT NULL)"))
+
+    def test_migrations_add_indexes_to_existing_tables(self):
+        self.create_legacy_schema()
+        with self.engine.begin() as conn:
+            applied = apply_migrations(conn)
+        self.assertEqual(applied, [m.version for m in MIGRATIONS])
+        inspector = inspect(self.engine)
+        user_indexes = {i["name"]: i for i in inspector.get_indexes("user")}
+        self.assertTrue(user_indexes["ix_user_username"]["unique"])
+        self.assertIn("ix_movie_title", {i["name"] for i in inspector.get_indexes("movie")})
+        self.assertEqual(
+            {i["name"] for i in inspector.get_indexes("comment")},
+            {"ix_comment_movie_id", "ix_comment_user_id"}
+        )
+        self.assertIn("movie_sentiment", inspector.get_table_names())
+        self.assertIn("sentiment_source", {c["name"] for c in inspector.get_columns("comment")})
+
+    def test_migrations_are_applied_once(self):
+        SQLModel.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            self.assertEqual(get_schema_version(conn), 0)
+            apply_migrations(conn)
+        with self.engine.begin() as conn:
+            self.assertEqual(apply_migrations(conn), [])
+            self.assertEqual(get_schema_version(conn), MIGRATIONS[-1].version)
+
+    def test_unique_username_migration_rejects_duplicates(self):
+        self.create_legacy_schema()
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT INTO user (username, email, password) VALUES ('Alice', 'a', 'p'), ('Alice', 'b', 'p')"))
+        with self.assertRaises(RuntimeError):
+            with self.engine.begin() as conn:
+                apply_migrations(conn)
+
+class TestQueryPlans(unittest.TestCase):
+    """Ejecuta los endpoints más usados y comprueba con EXPLAIN que ninguna consulta recorre una tabla completa."""
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        SQLModel.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            apply_migrations(conn)
+        self.session = Session(self.engine)
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+        app.dependency_overrides[get_session] = get_session_override
+
+        self.patcher = patch.object(authenticator, "__call__", MagicMock(return_value=True))
+        self.patcher.start()
+
+        app.lifespan = AsyncMock(return_value=None)
+        # Cada prueba usa una base de datos nueva: no deben servirse respuestas de otra
+        response_cache.clear()
+        self.client = TestClient(app)
+        self.seed_db()
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.patcher.stop()
+        self.session.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def seed_db(self):
+        password = hash_password("secret")
+        self.session.add_all([User(username=f"user{i}", email=f"user{i}@example.com", password=password) for i in range(1, 51)])
+        self.session.add_all([Movie(title=f"Movie {i}", director="Director", year=2000, genre="Drama") for i in range(1, 51)])
+        self.session.add_all([
+            Comment(text=f"Comment {i}", sentiment="neutral", movie_id=1 + i % 50, user_id=1 + i % 49)
+            for i in range(500)
+        ])
+        self.session.commit()
+
+    def capture_statements(self, method, url, **kwargs):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+        event.listen(self.async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            self.client.request(method, url, **kwargs)
+        finally:
+            event.remove(self.async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        self.assertTrue(statements)
+        return statements
+
+    def assert_no_full_scans(self, method, url, **kwargs):
+        statements = self.capture_statements(method, url, **kwargs)
+        with self.engine.connect() as conn:
+            for statement, parameters in statements:
+                self.assertEqual(full_scans(conn, statement, parameters), [], statement)
+
+    def test_login_by_username(self):
+        self.assert_no_full_scans("POST", "/login", json={"username": "user7", "password": "wrong"})
+
+    def test_comments_by_movie(self):
+        self.assert_no_full_scans("GET", "/movies/7/comments")
+
+    def test_comments_by_user(self):
+        self.assert_no_full_scans("GET", "/users/7/comments")
+    def test_movie_sentiment(self):
+        self.assert_no_full_scans("GET", "/movies/7/sentiment")
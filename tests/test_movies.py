@@ -1,23 +1,33 @@
+import os
+import tempfile
 import unittest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, create_engine, Session
-from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from main import app
 from auth import authenticator
+from cache import response_cache
 from db import get_session, Movie
+from search import TrigramIndex
 
 class TestMoviesEndpoints(unittest.TestCase):
 
     def setUp(self):
-        engine = create_engine(
-            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
-        )
+        # SQLite temporal compartido entre la sesión síncrona de las pruebas
+        # y el motor asíncrono (aiosqlite) que usa la aplicación
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{self.db_path}")
         SQLModel.metadata.create_all(engine)
         self.session = Session(engine)
-        def get_session_override():
-            yield self.session
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
         app.dependency_overrides[get_session] = get_session_override
 
         self.mock_auth = MagicMock()
@@ -26,11 +36,16 @@ class TestMoviesEndpoints(unittest.TestCase):
         self.patcher.start()
 
         app.lifespan = AsyncMock(return_value=None)
+        # Cada prueba usa una base de datos nueva: no deben servirse respuestas de otra
+        response_cache.clear()
         self.client = TestClient(app)
 
     def tearDown(self):
         app.dependency_overrides.clear()
         self.patcher.stop()
+        self.session.close()
+        self.session.get_bind().dispose()
+        os.remove(self.db_path)
     
     def seed_db(self):
         with self.session as session:
@@ -61,6 +76,26 @@ class TestMoviesEndpoints(unittest.TestCase):
         self.assertEqual(movies[2]['id'], 3)
         self.assertEqual(movies[2]['title'], 'Interstellar')
 
+    def test_get_movies_paginated(self):
+        self.seed_db()
+        response = self.client.get("/movies?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.json()], [1, 2])
+        cursor = response.headers.get("X-Next-Cursor")
+        self.assertIsNotNone(cursor)
+        response = self.client.get(f"/movies?limit=2&cursor={cursor}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in response.json()], [3])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_get_movies_invalid_cursor(self):
+        self.seed_db()
+        response = self.client.get("/movies?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+        response = self.client.get("/movies?limit=0")
+        self.assertEqual(response.status_code, 422)
+
     def test_get_movie(self):
         self.seed_db()
         response = self.client.get("/movies/1")
@@ -89,6 +124,13 @@ class TestMoviesEndpoints(unittest.TestCase):
         self.assertEqual(movie['id'], 1)
         self.assertEqual(movie['title'], 'Inception')
 
+    def test_search_movie_limit(self):
+        self.seed_db()
+        response = self.client.get("/movies/search?title=in&limit=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.client.get("/movies/search?title=in&limit=0").status_code, 422)
+
     def test_search_movie_no_results(self):
         self.seed_db()
         response = self.client.get("/movies/search?title=Tenet")
@@ -96,6 +138,22 @@ class TestMoviesEndpoints(unittest.TestCase):
         self.assertIsInstance(response.json(), list)
         self.assertEqual(len(response.json()), 0)
 
+    def test_search_movie_with_index(self):
+        self.seed_db()
+        index = TrigramIndex()
+        index.rebuild([(1, "Inception"), (2, "The Matrix"), (3, "Interstellar")])
+        with patch("controlers.movie_controller.title_index", index):
+            response = self.client.get("/movies/search?title=IN")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([m['id'] for m in response.json()], [1, 3])
+            response = self.client.post("/movies", json={"title": "Tenet", "director": "Christopher Nolan", "year": 2020, "genre": "Sci-Fi"})
+            self.assertEqual(response.status_code, 201)
+            response = self.client.get("/movies/search?title=tene")
+            self.assertEqual(response.json(), [{"id": 4, "title": "Tenet"}])
+            self.client.delete("/movies/1")
+            response = self.client.get("/movies/search?title=cept")
+            self.assertEqual(response.json(), [])
+
     def test_create_movie(self):
         response = self.client.post("/movies", json={"title": "Tenet", "director": "Christopher Nolan", "year": 2020, "genre": "Sci-Fi"})
         self.assertEqual(response.status_code, 201)
@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+HAS_BACKENDS = all(importlib.util.find_spec(module) for module in ("torch", "transformers", "onnxruntime", "onnx"))
+
+@unittest.skipUnless(HAS_BACKENDS, "torch, transformers, onnx y onnxruntime son necesarios")
+class TestOnnxBackendParity(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from benchmarks.backends import build_tiny_model, sample_texts
+        from inference.backends import TorchBackend
+        cls.workdir = tempfile.TemporaryDirectory()
+        cls.model = build_tiny_model(os.path.join(cls.workdir.name, "tiny"))
+        cls.cache_dir = os.path.join(cls.workdir.name, "onnx")
+        cls.texts = sample_texts(200)
+        torch_backend = TorchBackend(cls.model)
+        cls.reference = [p for i in range(0, len(cls.texts), 16) for p in torch_backend(cls.texts[i:i + 16])]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.workdir.cleanup()
+
+    def predict(self, backend):
+        return [p for i in range(0, len(self.texts), 16) for p in backend(self.texts[i:i + 16])]
+
+    def test_reference_is_not_trivial(self):
+        # Si el modelo diera siempre la misma etiqueta la comparación no demostraría nada
+        self.assertGreaterEqual(len(Counter(p["label"] for p in self.reference)), 2)
+
+    def test_fp32_matches_torch(self):
+        from benchmarks.backends import parity
+        from inference.backends import load_backend
+        result = parity(self.reference, self.predict(load_backend("onnx", self.model, cache_dir=self.cache_dir)))
+        self.assertEqual(result["agreement"], 1.0)
+        self.assertLess(result["max_score_diff"], 1e-4)
+
+    def test_int8_within_tolerance(self):
+        from benchmarks.backends import parity
+        from inference.backends import load_backend
+        result = parity(self.reference, self.predict(load_backend("onnx-int8", self.model, cache_dir=self.cache_dir)))
+        self.assertGreaterEqual(result["agreement"], 0.95)
+        self.assertLess(result["max_score_diff"], 0.05)
+
+    def test_export_is_reused(self):
+        import torch
+        from inference.backends import load_backend
+        load_backend("onnx-int8", self.model, cache_dir=self.cache_dir)
+        with patch.object(torch.onnx, "export") as export:
+            backend = load_backend("onnx-int8", self.model, cache_dir=self.cache_dir)
+        export.assert_not_called()
+        self.assertEqual(backend.name, "onnx-int8")
+
+    def test_unknown_backend(self):
+        from inference.backends import load_backend
+        with self.assertRaises(ValueError):
+            load_backend("tensorrt", self.model)
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import unittest
+import bcrypt
+from unittest.mock import patch
+
+from auth import PasswordHasher, PasswordQueueFull, verify_password
+from auth import password as password_module
+
+class TestPasswordHasher(unittest.TestCase):
+
+    def setUp(self):
+        self.hasher = PasswordHasher(workers=1, max_queue=1)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+
+    def test_hash_and_verify_off_loop(self):
+        async def run():
+            with patch.object(password_module, "BCRYPT_ROUNDS", 4):
+                hashed = await self.hasher.hash("secret")
+            return hashed, await self.hasher.verify("secret", hashed), await self.hasher.verify("nope", hashed)
+
+        hashed, valid, invalid = asyncio.run(run())
+        self.assertTrue(hashed.startswith("$2b$04$"))
+        self.assertTrue(valid)
+        self.assertFalse(invalid)
+        stats = self.hasher.stats()
+        self.assertEqual(stats["hash"]["count"], 1)
+        self.assertEqual(stats["verify"]["count"], 2)
+        self.assertGreater(stats["verify"]["max_ms"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_rejects_when_queue_is_full(self):
+        release = threading.Event()
+        hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(4)).decode()
+
+        def slow_verify(plain, stored):
+            release.wait(5)
+            return verify_password(plain, stored)
+
+        async def run():
+            with patch.object(password_module, "verify_password", slow_verify):
+                # Un hilo ocupado y una operación en cola llenan el pool
+                running = [asyncio.create_task(self.hasher.verify("secret", hashed)) for _ in range(2)]
+                await asyncio.sleep(0.05)
+                self.assertEqual(self.hasher.stats()["queued"], 1)
+                with self.assertRaises(PasswordQueueFull):
+                    await self.hasher.verify("secret", hashed)
+                release.set()
+                return await asyncio.gather(*running)
+
+        self.assertEqual(asyncio.run(run()), [True, True])
+        self.assertEqual(self.hasher.stats()["rejected"], 1)
@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import patch
+
+from inference import inference_service, prefork
+from inference.prefork import parse_cpu_list, plan_affinity, worker_cache_path
+
+class TestPreforkAffinity(unittest.TestCase):
+
+    def test_parse_cpu_list(self):
+        self.assertEqual(parse_cpu_list("0,2,4-6"), [0, 2, 4, 5, 6])
+        self.assertEqual(parse_cpu_list(" 3 "), [3])
+
+    def test_auto_splits_cpus(self):
+        self.assertEqual(plan_affinity("auto", 2, [0, 1, 2, 3, 4]), [[0, 1, 2], [3, 4]])
+        self.assertEqual(plan_affinity("auto", 1, [0, 1]), [[0, 1]])
+
+    def test_auto_more_workers_than_cpus(self):
+        self.assertEqual(plan_affinity("auto", 3, [0, 1]), [[0], [1], [0]])
+
+    def test_none_and_explicit(self):
+        self.assertEqual(plan_affinity("none", 2, [0, 1]), [None, None])
+        self.assertEqual(plan_affinity("0-1;2-3", 2, [0, 1, 2, 3]), [[0, 1], [2, 3]])
+        with self.assertRaises(ValueError):
+            plan_affinity("0-1;2-3", 3, [0, 1, 2, 3])
+
+class TestPreforkPreload(unittest.TestCase):
+
+    def test_worker_cache_path(self):
+        self.assertEqual(worker_cache_path("cache/predictions.json", 1), "cache/predictions.worker1.json")
+        self.assertIsNone(worker_cache_path(None, 0))
+
+    @patch.object(inference_service, "BACKEND", "torch")
+    @patch.object(inference_service, "load_model")
+    def test_cuda_model_is_loaded_by_each_worker(self, load_model):
+        with patch.object(prefork, "cuda_available", return_value=True):
+            self.assertFalse(prefork.preload_model())
+        load_model.assert_not_called()
+        with patch.object(prefork, "cuda_available", return_value=False), patch("gc.freeze"):
+            self.assertTrue(prefork.preload_model())
+        load_model.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from main import app
+from auth import authenticator
+from cache import response_cache
+from db import get_session, User, Movie, Comment
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        SQLModel.metadata.create_all(self.engine)
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+        app.dependency_overrides[get_session] = get_session_override
+
+        self.patcher = patch.object(authenticator, "__call__", MagicMock(return_value=True))
+        self.patcher.start()
+        app.lifespan = AsyncMock(return_value=None)
+        response_cache.clear()
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            session.add_all([
+                User(username="Alice", email="alice@example.com", password="password123"),
+                Movie(id=1, title="Inception", director="Christopher Nolan", year=2010, genre="Sci-Fi"),
+                Movie(id=2, title="The Matrix", director="Lana Wachowski, Lilly Wachowski", year=1999, genre="Sci-Fi"),
+                Comment(text="Great movie", sentiment="positive", movie_id=1, user_id=1)
+            ])
+            session.commit()
+
+        self.statements = []
+        event.listen(self.async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+
+    def tearDown(self):
+        event.remove(self.async_engine.sync_engine, "before_cursor_execute", self.count_statement)
+        app.dependency_overrides.clear()
+        self.patcher.stop()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def count_statement(self, *args):
+        self.statements.append(args[2])
+
+    def test_repeated_reads_skip_the_database(self):
+        first = self.client.get("/movies/1")
+        queries = len(self.statements)
+        second = self.client.get("/movies/1")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(len(self.statements), queries)
+        self.assertEqual(second.headers["etag"], first.headers["etag"])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/movies").headers["etag"]
+        response = self.client.get("/movies", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+        self.assertEqual(self.client.get("/movies", headers={"If-None-Match": '"otro"'}).status_code, 200)
+
+    def test_query_params_are_part_of_the_key(self):
+        page = self.client.get("/movies?limit=1")
+        self.assertEqual(len(page.json()), 1)
+        self.assertIn("x-next-cursor", page.headers)
+        # El cursor de paginación también se sirve desde la caché
+        self.assertEqual(self.client.get("/movies?limit=1").headers["x-next-cursor"], page.headers["x-next-cursor"])
+        self.assertEqual(len(self.client.get("/movies").json()), 2)
+
+    def test_writes_invalidate_cached_responses(self):
+        etag = self.client.get("/movies").headers["etag"]
+        self.client.post("/movies", json={"title": "Dune", "director": "Denis Villeneuve", "year": 2021, "genre": "Sci-Fi"})
+        response = self.client.get("/movies", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+        self.assertEqual(len(self.client.get("/movies/1/comments").json()), 1)
+        with patch('ia.SentimentModel.analyze_sentiment', AsyncMock(return_value="negative")):
+            self.client.post("/movies/1/comments", json={"user_id": 1, "text": "Not for me"})
+        self.assertEqual(len(self.client.get("/movies/1/comments").json()), 2)
+
+        self.client.delete("/movies/2")
+        self.assertEqual(self.client.get("/movies/2").status_code, 404)
+        self.assertEqual([m["id"] for m in self.client.get("/movies").json()], [1, 3])
+        stats = self.client.get("/stats/responses").json()
+        self.assertGreater(stats["invalidations"], 0)
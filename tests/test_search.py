@@ -0,0 +1,57 @@
+import unittest
+
+from search import TrigramIndex
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.rebuild([
+            (1, "Inception"),
+            (2, "The Matrix"),
+            (3, "Interstellar"),
+            (4, "Star Wars"),
+            (5, "Starship Troopers"),
+            (6, "A Star Is Born"),
+        ])
+
+    def test_case_insensitive_substring(self):
+        self.assertEqual(self.index.search("CEPT"), [(1, "Inception")])
+        self.assertEqual(self.index.search("matr"), [(2, "The Matrix")])
+        self.assertEqual(self.index.search("Tenet"), [])
+
+    def test_ranking(self):
+        # Primero los títulos que empiezan por la consulta, luego inicio de palabra y después el resto
+        self.index.add(7, "Lodestar")
+        self.assertEqual(
+            [movie_id for movie_id, _ in self.index.search("star")],
+            [4, 5, 6, 7]
+        )
+        self.assertEqual(self.index.search("star", limit=1), [(4, "Star Wars")])
+
+    def test_short_queries(self):
+        self.assertEqual({movie_id for movie_id, _ in self.index.search("ix")}, {2})
+        self.assertEqual(len(self.index.search("")), 6)
+
+    def test_incremental_updates(self):
+        self.index.add(7, "Tenet")
+        self.assertEqual(self.index.search("ten"), [(7, "Tenet")])
+        self.index.remove(7)
+        self.assertEqual(self.index.search("ten"), [])
+        self.index.add(1, "Memento")
+        self.assertEqual(self.index.search("incep"), [])
+        self.assertEqual(self.index.search("mement"), [(1, "Memento")])
+
+    def test_matches_linear_scan(self):
+        titles = [(i, f"Movie {i} {'Saga' if i % 7 == 0 else 'Story'} part {i % 13}") for i in range(1, 5001)]
+        index = TrigramIndex()
+        index.rebuild(titles)
+        for query in ["saga", "part 1", "Movie 42", "story part 12", "zzz", "ie 49"]:
+            expected = {movie_id for movie_id, title in titles if query.lower() in title.lower()}
+            self.assertEqual({movie_id for movie_id, _ in index.search(query)}, expected, query)
+
+    def test_not_ready_until_built(self):
+        index = TrigramIndex()
+        self.assertFalse(index.ready)
+        index.rebuild([])
+        self.assertTrue(index.ready)
\ No newline at end of file
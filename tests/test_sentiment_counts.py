@@ -0,0 +1,140 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from main import app
+from auth import authenticator
+from cache import response_cache
+from db import get_session, User, Movie, Comment, MovieSentiment
+from db.sentiment_counts import recompute_sentiment_counts
+from ia import SentimentWorker
+
+class TestMovieSentimentCounts(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+        app.dependency_overrides[get_session] = get_session_override
+
+        self.patcher = patch.object(authenticator, "__call__", MagicMock(return_value=True))
+        self.patcher.start()
+        app.lifespan = AsyncMock(return_value=None)
+        # Cada prueba usa una base de datos nueva: no deben servirse respuestas de otra
+        response_cache.clear()
+        self.client = TestClient(app)
+
+        with self.session as session:
+            session.add_all([
+                User(username="Alice", email="alice@example.com", password="password123"),
+                Movie(id=1, title="Inception", director="Christopher Nolan", year=2010, genre="Sci-Fi"),
+                Movie(id=2, title="The Matrix", director="Lana Wachowski, Lilly Wachowski", year=1999, genre="Sci-Fi")
+            ])
+            session.commit()
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.patcher.stop()
+        self.session.close()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def counts(self, movie_id):
+        with Session(self.engine) as session:
+            return session.get(MovieSentiment, movie_id)
+
+    @patch('ia.SentimentModel.analyze_sentiment')
+    def test_add_comment_updates_counters(self, mock_analyze_sentiment):
+        for label in ["positive", "positive", "negative", "neutral"]:
+            mock_analyze_sentiment.return_value = label
+            response = self.client.post("/movies/1/comments", json={"user_id": 1, "text": "texto"})
+            self.assertEqual(response.status_code, 201)
+        response = self.client.get("/movies/1/sentiment")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "movie_id": 1, "positive": 2, "negative": 1, "neutral": 1, "pending": 0, "total": 4,
+            "positive_ratio": 0.5, "negative_ratio": 0.25, "neutral_ratio": 0.25
+        })
+
+    def test_movie_without_comments_and_not_found(self):
+        response = self.client.get("/movies/2/sentiment")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 0)
+        self.assertEqual(response.json()["positive_ratio"], 0.0)
+        response = self.client.get("/movies/3/sentiment")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Movie not found"})
+
+    @patch('controlers.comment_controller.sentiment_worker')
+    @patch('controlers.comment_controller.SENTIMENT_MODE', 'async')
+    def test_background_labelling_moves_pending_counts(self, mock_worker):
+        for _ in range(3):
+            self.assertEqual(self.client.post("/movies/1/comments", json={"user_id": 1, "text": "texto"}).status_code, 202)
+        self.assertEqual(self.counts(1).pending, 3)
+
+        @asynccontextmanager
+        async def session_context():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+
+        with patch('ia.sentiment_worker.get_session_context', session_context):
+            # Se repite un comentario ya etiquetado: no debe contarse dos veces
+            asyncio.run(SentimentWorker._store([(1, "positive"), (2, "negative")]))
+            asyncio.run(SentimentWorker._store([(1, "negative")]))
+        counts = self.counts(1)
+        self.assertEqual((counts.positive, counts.negative, counts.pending), (1, 1, 1))
+
+    @patch('ia.SentimentModel.analyze_sentiment')
+    def test_delete_movie_removes_counters(self, mock_analyze_sentiment):
+        mock_analyze_sentiment.return_value = "positive"
+        self.client.post("/movies/1/comments", json={"user_id": 1, "text": "texto"})
+        self.assertIsNotNone(self.counts(1))
+        self.assertEqual(self.client.delete("/movies/1").status_code, 200)
+        self.assertIsNone(self.counts(1))
+
+    def test_recompute_repairs_counters(self):
+        with self.session as session:
+            session.add_all([
+                Comment(text="a", sentiment="positive", movie_id=1, user_id=1),
+                Comment(text="b", sentiment="Negative", movie_id=1, user_id=1),
+                Comment(text="c", sentiment="pending", movie_id=2, user_id=1),
+                MovieSentiment(movie_id=1, positive=40)
+            ])
+            session.commit()
+        with self.engine.begin() as conn:
+            self.assertEqual(recompute_sentiment_counts(conn, [1]), 1)
+        counts = self.counts(1)
+        self.assertEqual((counts.positive, counts.negative, counts.neutral), (1, 1, 0))
+        self.assertIsNone(self.counts(2))
+        with self.engine.begin() as conn:
+            recompute_sentiment_counts(conn)
+        self.assertEqual(self.counts(2).pending, 1)
+
+class TestSentimentWorkerFallback(unittest.IsolatedAsyncioTestCase):
+
+    async def test_random_labels_stay_pending(self):
+        worker = SentimentWorker(workers=1, batch_size=2)
+        predictions = [("positive", "remote"), ("neutral", "random_fallback")]
+        with patch('ia.SentimentModel.classify_sentiments', AsyncMock(return_value=predictions)), \
+                patch.object(SentimentWorker, '_load_pending', AsyncMock(return_value=[(1, "a"), (2, "b")])), \
+                patch.object(SentimentWorker, '_store', AsyncMock()) as store:
+            await worker.start()
+            while worker.stats()["queue_depth"]:
+                await asyncio.sleep(0.01)
+            await worker.stop()
+        store.assert_awaited_once_with([(1, "positive")])
+        self.assertEqual((worker.processed, worker.failed), (1, 1))
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from main import app
+from auth import authenticator
+from cache import response_cache
+from db import get_session, Movie
+from utils import SQLProfiler, SQLProfilerMiddleware, sql_profiler
+from utils.sql_profiler import statement_shape
+
+class TestStatementShape(unittest.TestCase):
+
+    def test_values_are_normalized(self):
+        self.assertEqual(
+            statement_shape("SELECT * FROM movie\n WHERE id = 3 AND title = 'It''s'"),
+            "SELECT * FROM movie WHERE id = ? AND title = ?"
+        )
+        self.assertEqual(
+            statement_shape("SELECT * FROM movie WHERE id IN (?, ?, ?)"),
+            statement_shape("SELECT * FROM movie WHERE id IN (%s, %s)")
+        )
+        self.assertEqual(statement_shape("SELECT anon_1.id FROM t1 AS anon_1 LIMIT :param_1"), "SELECT anon_1.id FROM t1 AS anon_1 LIMIT ?")
+
+class TestSQLProfiler(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+        SQLModel.metadata.create_all(self.engine)
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
+        app.dependency_overrides[get_session] = get_session_override
+
+        self.patcher = patch.object(authenticator, "__call__", MagicMock(return_value=True))
+        self.patcher.start()
+        app.lifespan = AsyncMock(return_value=None)
+        response_cache.clear()
+        sql_profiler.clear()
+        self.client = TestClient(app)
+
+        with Session(self.engine) as session:
+            session.add_all([Movie(id=i, title=f"Movie {i}", director="D", year=2000, genre="Drama") for i in range(1, 13)])
+            session.commit()
+
+    def tearDown(self):
+        app.dependency_overrides.clear()
+        self.patcher.stop()
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_server_timing_header(self):
+        response = self.client.get("/movies/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.headers["server-timing"], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+
+    def test_slow_requests_endpoint(self):
+        self.client.get("/movies/1")
+        self.client.get("/movies")
+        response = self.client.get("/stats/slow-requests?limit=1")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["slowest"]), 1)
+        entry = data["slowest"][0]
+        self.assertIn(entry["route"], ("/movies/{id}", "/movies"))
+        self.assertGreaterEqual(entry["statements"], 1)
+        self.assertFalse(entry["n_plus_one"])
+        self.assertEqual(self.client.get("/stats/slow-requests?limit=0").status_code, 422)
+
+    def test_slow_requests_requires_token(self):
+        self.patcher.stop()
+        try:
+            self.assertEqual(self.client.get("/stats/slow-requests").status_code, 403)
+        finally:
+            self.patcher.start()
+
+    def test_repeated_statement_logs_warning(self):
+        profiler = SQLProfiler(history=10, repeat_threshold=5)
+        loop_app = FastAPI()
+        loop_app.add_middleware(SQLProfilerMiddleware, profiler=profiler, enabled=True)
+
+        @loop_app.get("/loop")
+        async def loop():
+            async with AsyncSession(self.async_engine) as session:
+                for movie_id in range(1, 13):
+                    await session.exec(text(f"SELECT title FROM movie WHERE id = {movie_id}"))
+            return {}
+
+        with self.assertLogs("sql_profiler", level="WARNING") as logs:
+            response = TestClient(loop_app).get("/loop")
+        self.assertIn('desc="12 queries"', response.headers["server-timing"])
+        self.assertIn("repetida 12 veces", logs.output[0])
+        entry = profiler.slowest()[0]
+        self.assertTrue(entry["n_plus_one"])
+        self.assertEqual(entry["top_statements"][0], {"statement": "SELECT title FROM movie WHERE id = ?", "count": 12})
+        self.assertEqual(profiler.stats()["repeat_warnings"], 1)
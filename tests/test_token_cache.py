@@ -0,0 +1,68 @@
+import asyncio
+import time
+import unittest
+from datetime import timedelta
+from fastapi import HTTPException
+from starlette.requests import Request
+from unittest.mock import patch
+
+from auth import create_jwt_token, rotate_secret_key, token_cache
+from auth import jwt as jwt_module
+from auth.jwt import JWTBearer
+from auth.token_cache import VerifiedTokenCache
+
+def bearer_request(token):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"authorization", f"Bearer {token}".encode())]}
+    return Request(scope)
+
+class TestVerifiedTokenCache(unittest.TestCase):
+
+    def test_entries_expire_at_token_exp(self):
+        cache = VerifiedTokenCache(max_entries=10, max_ttl_seconds=300)
+        cache.put("a", {"sub": "1", "exp": time.time() + 60})
+        cache.put("b", {"sub": "2", "exp": time.time() - 1})
+        self.assertEqual(cache.get("a")["sub"], "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 1)
+        with patch("auth.token_cache.time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_lru_eviction_and_flush(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        exp = time.time() + 60
+        cache.put("a", {"exp": exp})
+        cache.put("b", {"exp": exp})
+        cache.get("a")
+        cache.put("c", {"exp": exp})
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.flush()
+        self.assertEqual(len(cache), 0)
+
+class TestJWTBearerCache(unittest.TestCase):
+
+    def setUp(self):
+        token_cache.flush()
+        self.bearer = JWTBearer()
+        self.secret = jwt_module.SECRET_KEY
+
+    def tearDown(self):
+        rotate_secret_key(self.secret)
+
+    def test_repeated_token_skips_signature_check(self):
+        token = create_jwt_token({"sub": "1", "username": "Alice"})
+        with patch.object(jwt_module.jwt, "decode", wraps=jwt_module.jwt.decode) as decode:
+            for _ in range(5):
+                payload = asyncio.run(self.bearer(bearer_request(token)))
+                self.assertEqual(payload["username"], "Alice")
+        self.assertEqual(decode.call_count, 1)
+
+    def test_rotated_secret_rejects_cached_tokens(self):
+        token = create_jwt_token({"sub": "1", "username": "Alice"}, timedelta(minutes=5))
+        asyncio.run(self.bearer(bearer_request(token)))
+        rotate_secret_key("otra_clave")
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(self.bearer(bearer_request(token)))
+        self.assertEqual(ctx.exception.status_code, 403)
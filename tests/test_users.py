@@ -1,7 +1,11 @@
+import os
+import tempfile
 import unittest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel, create_engine, Session
-from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from main import app
@@ -11,13 +15,17 @@ from db import get_session, User
 class TestUserEndpoints(unittest.TestCase):
 
     def setUp(self):
-        engine = create_engine(
-            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
-        )
+        # SQLite temporal compartido entre la sesión síncrona de las pruebas
+        # y el motor asíncrono (aiosqlite) que usa la aplicación
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{self.db_path}")
         SQLModel.metadata.create_all(engine)
         self.session = Session(engine)
-        def get_session_override():
-            yield self.session
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{self.db_path}", poolclass=NullPool)
+        async def get_session_override():
+            async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+                yield session
         app.dependency_overrides[get_session] = get_session_override
         
         self.mock_auth = MagicMock()
@@ -31,6 +39,9 @@ class TestUserEndpoints(unittest.TestCase):
     def tearDown(self):
         app.dependency_overrides.clear()
         self.patcher.stop()
+        self.session.close()
+        self.session.get_bind().dispose()
+        os.remove(self.db_path)
     
     def seed_db(self):
         with self.session as session:
@@ -63,6 +74,16 @@ class TestUserEndpoints(unittest.TestCase):
         self.assertIsInstance(user, dict)
         self.assertEqual(user, {"id": 3, "username": "Charlie"})
 
+    def test_get_users_paginated(self):
+        self.seed_db()
+        response = self.client.get("/users?limit=1")
+        self.assertEqual(response.json(), [{"id": 1, "username": "Alice"}])
+        response = self.client.get(f"/users?limit=1&cursor={response.headers['X-Next-Cursor']}")
+        self.assertEqual(response.json(), [{"id": 2, "username": "Bob"}])
+        response = self.client.get(f"/users?limit=5&cursor={response.headers['X-Next-Cursor']}")
+        self.assertEqual(response.json(), [{"id": 3, "username": "Charlie"}])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
     def test_get_user(self):
         self.seed_db()
         response = self.client.get("/users/1")